@@ -3,10 +3,13 @@ from .models import Cellar, Tank, CrushedJuiceAllocation, TankHistory
 
 @admin.register(Cellar)
 class CellarAdmin(admin.ModelAdmin):
-    list_display = ('name', 'location', 'capacity')
+    list_display = ('name', 'location', 'capacity', 'total_current_volume', 'available_capacity')
     search_fields = ('name', 'location', 'notes')
     readonly_fields = ('created_by', 'created_at', 'updated_at')
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_volume_stats()
+
     def save_model(self, request, obj, form, change):
         if not change:
             obj.created_by = request.user
@@ -39,8 +42,15 @@ class CrushedJuiceAllocationAdmin(admin.ModelAdmin):
 
 @admin.register(TankHistory)
 class TankHistoryAdmin(admin.ModelAdmin):
-    list_display = ('tank', 'operation_type', 'date', 'volume')
+    list_display = ('tank', 'sequence', 'operation_type', 'date', 'volume')
     list_filter = ('operation_type', 'date', 'tank__cellar')
     search_fields = ('notes', 'tank__name')
     date_hierarchy = 'date'
     readonly_fields = ('created_by', 'created_at')
+
+    def has_change_permission(self, request, obj=None):
+        # The history is an append-only ledger
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
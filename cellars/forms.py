@@ -1,4 +1,5 @@
 from django import forms
+from core.forms import TenantFormMixin
 from django.core.exceptions import ValidationError
 from django.db import models
 from .models import Cellar, Tank, CrushedJuiceAllocation
@@ -61,7 +62,7 @@ class TankForm(forms.ModelForm):
             instance.save()
         return instance
 
-class CrushedJuiceAllocationForm(forms.ModelForm):
+class CrushedJuiceAllocationForm(TenantFormMixin, forms.ModelForm):
     class Meta:
         model = CrushedJuiceAllocation
         fields = ['harvest', 'tank', 'allocated_volume', 'allocation_date', 'notes']
@@ -91,7 +92,7 @@ class CrushedJuiceAllocationForm(forms.ModelForm):
 
         return cleaned_data
 
-class TankTransferForm(forms.Form):
+class TankTransferForm(TenantFormMixin, forms.Form):
     source_tank = forms.ModelChoiceField(
         queryset=Tank.objects.all(),
         label="From Tank",
@@ -1,10 +1,204 @@
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
 from django.core.management.base import BaseCommand
-from django.db.models import Sum
-from cellars.models import Tank
+from django.db import connections, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, FloatField, OuterRef, Subquery, Sum
+from django.db.models.functions import Round
+from django.utils import timezone
+from cellars.models import Tank, TankHistory, CrushedJuiceAllocation
+from cellars.services import lock_tanks, update_tank_volumes
+from core.db_routers import tenant_db
+from core.models import tenant_context
 from harvests.models import HarvestAllocation
+from organizations.models import Organization
+from packaging.models import Bottling
+
+# Allow small rounding differences from the float allocation volumes
+TOLERANCE = Decimal('0.01')
+
+# History entries that aren't backed by an allocation or bottling record
+MOVEMENT_OPERATIONS = ['transfer_in', 'transfer_out', 'adjustment']
+
+# Notes of the adjustments --fix records. They bring the ledger in line with
+# the corrected volume and aren't records the volume is checked against.
+CORRECTION_NOTES = 'Volume corrected to match its records by check_tank_volumes'
+
+def _tank_total(queryset, expression):
+    """Return a subquery summing the expression over the queryset per outer tank."""
+    return Subquery(
+        queryset.filter(tank=OuterRef('pk')).order_by().values('tank').annotate(
+            total=Sum(expression)
+        ).values('total')[:1]
+    )
+
+def _to_decimal(value):
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'))
+
+def _with_expected_volume(tanks):
+    """Annotate tanks with the totals their expected volume is built from."""
+    return tanks.annotate(
+        harvest_allocated=_tank_total(HarvestAllocation.objects, 'allocated_volume'),
+        juice_allocated=_tank_total(CrushedJuiceAllocation.objects, 'allocated_volume'),
+        moved=_tank_total(
+            TankHistory.objects.filter(operation_type__in=MOVEMENT_OPERATIONS).exclude(
+                operation_type='adjustment', notes=CORRECTION_NOTES
+            ),
+            'volume'
+        ),
+        # Each run is rounded to 0.01 L like bottled_litres(), which is what
+        # record_bottling() took from the tank
+        bottled=_tank_total(
+            Bottling.objects,
+            Round(
+                ExpressionWrapper(F('quantity') * F('bottle__volume') / 1000, output_field=FloatField()), 2,
+                output_field=DecimalField(max_digits=14, decimal_places=2)
+            )
+        ),
+    )
+
+def _expected_volume(tank):
+    """Return the volume an annotated tank's records add up to."""
+    return (
+        _to_decimal(tank.harvest_allocated)
+        + _to_decimal(tank.juice_allocated)
+        + _to_decimal(tank.moved)
+        - _to_decimal(tank.bottled)
+    )
+
+def check_tanks(tanks, chunk_size, fix=False):
+    """
+    Compare tank volumes with the volume their records add up to.
+
+    The expected volume is the sum of harvest and crushed juice allocations and
+    transfers and adjustments, minus the bottled wine. Each chunk of tanks is
+    checked with one query, and the fixes of a chunk are applied by
+    _apply_fixes().
+
+    Args:
+        tanks: Tank queryset to check
+        chunk_size: Number of tanks to check per query
+        fix: Set mismatching tanks to their expected volume
+
+    Returns:
+        list: A dict per discrepancy
+    """
+    tanks = _with_expected_volume(tanks).order_by('pk')
+
+    discrepancies = []
+    last_pk = 0
+    while True:
+        chunk = list(tanks.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            return discrepancies
+        last_pk = chunk[-1].pk
+
+        found = []
+        for tank in chunk:
+            expected = _expected_volume(tank)
+            if abs(expected - tank.current_volume) <= TOLERANCE:
+                continue
+            found.append({
+                'tank_id': tank.pk,
+                'tank': tank.name,
+                'cellar_id': tank.cellar_id,
+                'organization_id': tank.organization_id,
+                'current_volume': str(tank.current_volume),
+                'expected_volume': str(expected),
+                'difference': str(expected - tank.current_volume),
+                # The database rejects volumes outside the tank, so leave those
+                # to be investigated by hand
+                'fixed': fix and 0 <= expected <= tank.capacity,
+            })
+
+        fixable = [discrepancy for discrepancy in found if discrepancy['fixed']]
+        if fixable:
+            applied = _apply_fixes(fixable)
+            for discrepancy in fixable:
+                discrepancy['fixed'] = discrepancy['tank_id'] in applied
+        discrepancies.extend(found)
+
+def _apply_fixes(discrepancies):
+    """
+    Set tanks to the volume their records add up to and log the correction.
+
+    The tanks of each organization are locked and their expected volume is
+    recomputed under the lock, so movements committed since the check are
+    kept. The differences are applied with update_tank_volumes(), which keeps
+    the cellar rollups right, and recorded as adjustments in the ledger.
+
+    Args:
+        discrepancies: Discrepancy dicts of the tanks to fix
+
+    Returns:
+        dict: Applied volume change keyed by tank ID
+    """
+    by_organization = {}
+    for discrepancy in discrepancies:
+        by_organization.setdefault(discrepancy['organization_id'], []).append(discrepancy['tank_id'])
+
+    applied = {}
+    today = timezone.now().date()
+    organizations = Organization.objects.in_bulk(by_organization)
+    for organization_id, tank_ids in by_organization.items():
+        organization = organizations.get(organization_id)
+        with tenant_context(organization), transaction.atomic(using=tenant_db(organization)):
+            tanks = lock_tanks(tank_ids)
+            deltas = {}
+            for tank in _with_expected_volume(Tank.objects.filter(pk__in=tank_ids)):
+                expected = _expected_volume(tank)
+                locked = tanks[tank.pk]
+                if abs(expected - locked.current_volume) > TOLERANCE and 0 <= expected <= locked.capacity:
+                    deltas[tank.pk] = expected - locked.current_volume
+            update_tank_volumes(tanks, deltas, None)
+            TankHistory.objects.append([
+                TankHistory(
+                    organization_id=tanks[pk].organization_id,
+                    tank_id=pk,
+                    operation_type='adjustment',
+                    date=today,
+                    volume=delta,
+                    notes=CORRECTION_NOTES,
+                    created_by=None
+                )
+                for pk, delta in deltas.items()
+            ])
+        applied.update(deltas)
+    return applied
+
+def check_organization(organization, cellar_ids, chunk_size, fix=False):
+    """
+    Check the tanks of one organization with check_tanks().
+
+    The check runs in the organization's tenant context, so its queries go to
+    the database the organization's tanks live in.
+
+    Args:
+        organization: Organization whose tanks to check
+        cellar_ids: Optional list of cellar IDs to limit the check to
+        chunk_size: Number of tanks to check per query
+        fix: Set mismatching tanks to their expected volume
+
+    Returns:
+        list: A dict per discrepancy
+    """
+    with tenant_context(organization):
+        tanks = Tank.objects.filter(organization=organization)
+        if cellar_ids:
+            tanks = tanks.filter(cellar_id__in=cellar_ids)
+        return check_tanks(tanks, chunk_size, fix)
+
+def _check_shard(organization_id, cellar_ids, chunk_size, fix):
+    """Check the tanks of one organization in a worker process."""
+    try:
+        organization = Organization.objects.get(pk=organization_id)
+        return check_organization(organization, cellar_ids, chunk_size, fix)
+    finally:
+        connections.close_all()
 
 class Command(BaseCommand):
-    help = 'Check and optionally fix tank volumes based on their allocations'
+    help = 'Check and optionally fix tank volumes based on their allocations, transfers and bottlings'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -12,41 +206,92 @@ class Command(BaseCommand):
             action='store_true',
             help='Fix incorrect tank volumes',
         )
+        parser.add_argument(
+            '--organization',
+            type=int,
+            action='append',
+            dest='organizations',
+            help='Only check tanks of the given organization ID (may be repeated)',
+        )
+        parser.add_argument(
+            '--cellar',
+            type=int,
+            action='append',
+            dest='cellars',
+            help='Only check tanks in the given cellar ID (may be repeated)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Number of tanks checked per query (default: 2000)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes to check organizations in parallel (default: 1)',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the discrepancies as JSON',
+        )
 
     def handle(self, *args, **options):
-        fix_volumes = options['fix']
-        tanks = Tank.objects.all()
-        
-        for tank in tanks:
-            # Calculate total allocated volume
-            allocated_volume = HarvestAllocation.objects.filter(
-                tank=tank
-            ).aggregate(
-                total=Sum('allocated_volume')
-            )['total'] or 0
-            
-            allocated_volume = float(allocated_volume)
-            current_volume = float(tank.current_volume)
-            
-            if abs(allocated_volume - current_volume) > 0.01:  # Allow small float differences
-                self.stdout.write(
-                    self.style.WARNING(
-                        f'Tank {tank.name}: Current volume ({current_volume}L) '
-                        f'differs from allocations ({allocated_volume}L)'
-                    )
+        organizations = Organization.objects.order_by('pk')
+        if options['organizations']:
+            organizations = organizations.filter(pk__in=options['organizations'])
+
+        if options['workers'] > 1:
+            discrepancies = self.check_in_parallel(list(organizations.values_list('pk', flat=True)), options)
+        else:
+            discrepancies = [
+                discrepancy
+                for organization in organizations
+                for discrepancy in check_organization(
+                    organization, options['cellars'], options['chunk_size'], options['fix']
                 )
-                
-                if fix_volumes:
-                    tank.current_volume = allocated_volume
-                    tank.save()
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'Fixed tank {tank.name}: Set volume to {allocated_volume}L'
-                        )
-                    )
-            else:
+            ]
+        discrepancies.sort(key=lambda discrepancy: discrepancy['tank_id'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(discrepancies, indent=2))
+            return
+
+        for discrepancy in discrepancies:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Tank {discrepancy['tank']}: Current volume ({discrepancy['current_volume']}L) "
+                    f"differs from its records ({discrepancy['expected_volume']}L)"
+                )
+            )
+            if discrepancy['fixed']:
                 self.stdout.write(
                     self.style.SUCCESS(
-                        f'Tank {tank.name}: Volume correct ({current_volume}L)'
+                        f"Fixed tank {discrepancy['tank']}: Set volume to {discrepancy['expected_volume']}L"
                     )
                 )
+
+        if discrepancies:
+            self.stdout.write(self.style.ERROR(f'{len(discrepancies)} tank volume discrepancies found'))
+        else:
+            self.stdout.write(self.style.SUCCESS('All tank volumes match their records'))
+
+    def check_in_parallel(self, organization_ids, options):
+        """Check each organization's tanks in a separate process."""
+        # Worker processes must open their own database connections
+        connections.close_all()
+        # Forked workers inherit the configured app registry; spawned ones
+        # would start without django.setup() and fail on the first query
+        with ProcessPoolExecutor(
+            max_workers=options['workers'], mp_context=multiprocessing.get_context('fork')
+        ) as pool:
+            results = pool.map(
+                _check_shard,
+                organization_ids,
+                [options['cellars']] * len(organization_ids),
+                [options['chunk_size']] * len(organization_ids),
+                [options['fix']] * len(organization_ids),
+            )
+            return [discrepancy for shard in results for discrepancy in shard]
@@ -0,0 +1,53 @@
+from django.core.management.base import BaseCommand
+from cellars.models import Cellar, CellarVolumeSummary
+from core.models import tenant_context
+from organizations.models import Organization
+
+class Command(BaseCommand):
+    help = 'Rebuild the cellar volume rollups from the tank table and verify them'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cellar',
+            type=int,
+            action='append',
+            dest='cellars',
+            help='Only rebuild the given cellar ID (may be repeated)',
+        )
+        parser.add_argument(
+            '--verify-only',
+            action='store_true',
+            help='Report rollup discrepancies without rebuilding',
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = 0
+        discrepancies = []
+        for organization in Organization.objects.order_by('pk'):
+            # Route the queries to the organization's database and limit them
+            # to its cellars, as other organizations may share the database
+            with tenant_context(organization):
+                cellars = Cellar.objects.filter(organization=organization)
+                if options['cellars']:
+                    cellars = cellars.filter(pk__in=options['cellars'])
+                cellar_ids = list(cellars.values_list('pk', flat=True))
+                if not options['verify_only']:
+                    rebuilt += CellarVolumeSummary.objects.rebuild(cellar_ids)
+                discrepancies.extend(CellarVolumeSummary.objects.verify(cellar_ids))
+
+        if not options['verify_only']:
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt volume rollups for {rebuilt} cellars'))
+
+        for discrepancy in discrepancies:
+            tank_type = discrepancy['tank_type'] or 'all tanks'
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Cellar {discrepancy['cellar_id']} ({tank_type}): rollup has "
+                    f"{discrepancy['stored']}, tanks add up to {discrepancy['expected']}"
+                )
+            )
+
+        if discrepancies:
+            self.stdout.write(self.style.ERROR(f'{len(discrepancies)} rollup discrepancies found'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Volume rollups match the tanks'))
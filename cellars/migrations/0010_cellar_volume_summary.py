@@ -0,0 +1,76 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:04
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def build_volume_summaries(apps, schema_editor):
+    Cellar = apps.get_model('cellars', 'Cellar')
+    Tank = apps.get_model('cellars', 'Tank')
+    CellarVolumeSummary = apps.get_model('cellars', 'CellarVolumeSummary')
+    TankTypeVolumeSummary = apps.get_model('cellars', 'TankTypeVolumeSummary')
+
+    summaries = {
+        cellar_id: CellarVolumeSummary(cellar_id=cellar_id)
+        for cellar_id in Cellar.objects.values_list('pk', flat=True)
+    }
+    breakdown = []
+    rows = Tank.objects.order_by().values('cellar_id', 'tank_type').annotate(
+        tank_count=Count('id'),
+        total_capacity=Sum('capacity'),
+        total_volume=Sum('current_volume')
+    )
+    for row in rows:
+        summary = summaries[row['cellar_id']]
+        summary.tank_count += row['tank_count']
+        summary.total_capacity += row['total_capacity']
+        summary.total_volume += row['total_volume']
+        breakdown.append(TankTypeVolumeSummary(**row))
+
+    CellarVolumeSummary.objects.bulk_create(summaries.values())
+    TankTypeVolumeSummary.objects.bulk_create(breakdown)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cellars', '0009_cellar_organization_cellar_updated_by_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CellarVolumeSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tank_count', models.IntegerField(default=0, help_text='Number of tanks in the cellar')),
+                ('total_capacity', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Total tank capacity in liters', max_digits=14)),
+                ('total_volume', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Total current volume in liters', max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True, help_text='When the rollup was last rebuilt')),
+                ('cellar', models.OneToOneField(help_text='Cellar that the rollup belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='volume_summary', to='cellars.cellar')),
+            ],
+            options={
+                'verbose_name': 'Cellar Volume Summary',
+                'verbose_name_plural': 'Cellar Volume Summaries',
+            },
+        ),
+        migrations.CreateModel(
+            name='TankTypeVolumeSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tank_type', models.CharField(choices=[('stainless_steel', 'Stainless Steel'), ('oak_barrel', 'Oak Barrel'), ('concrete', 'Concrete'), ('fiberglass', 'Fiberglass')], help_text='Type of tank', max_length=20)),
+                ('tank_count', models.IntegerField(default=0, help_text='Number of tanks of this type')),
+                ('total_capacity', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Total capacity of tanks of this type in liters', max_digits=14)),
+                ('total_volume', models.DecimalField(decimal_places=2, default=Decimal('0.00'), help_text='Total current volume of tanks of this type in liters', max_digits=14)),
+                ('cellar', models.ForeignKey(help_text='Cellar that the rollup belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='tank_type_summaries', to='cellars.cellar')),
+            ],
+            options={
+                'verbose_name': 'Tank Type Volume Summary',
+                'verbose_name_plural': 'Tank Type Volume Summaries',
+                'ordering': ['cellar', 'tank_type'],
+                'unique_together': {('cellar', 'tank_type')},
+            },
+        ),
+        migrations.RunPython(build_volume_summaries, migrations.RunPython.noop),
+    ]
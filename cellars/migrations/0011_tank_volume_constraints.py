@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cellars', '0010_cellar_volume_summary'),
+        ('organizations', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='tank',
+            constraint=models.CheckConstraint(condition=models.Q(('current_volume__gte', 0)), name='tank_volume_non_negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='tank',
+            constraint=models.CheckConstraint(condition=models.Q(('current_volume__lte', models.F('capacity'))), name='tank_volume_within_capacity'),
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Sum
+from django.utils import timezone
+
+
+def backfill_ledger(apps, schema_editor):
+    """
+    Number the existing history entries per tank and reconcile each tank's
+    ledger with its current volume.
+    """
+    Tank = apps.get_model('cellars', 'Tank')
+    TankHistory = apps.get_model('cellars', 'TankHistory')
+
+    entries = TankHistory.objects.order_by('tank_id', 'date', 'created_at', 'pk')
+    last_sequence = {}
+    batch = []
+    for entry in entries.only('pk', 'tank_id').iterator():
+        entry.sequence = last_sequence.get(entry.tank_id, 0) + 1
+        last_sequence[entry.tank_id] = entry.sequence
+        batch.append(entry)
+    TankHistory.objects.bulk_update(batch, ['sequence'], batch_size=1000)
+
+    # Older code paths didn't always write history, so record the difference
+    # as an adjustment to make the ledger add up to the stored volume
+    ledger_totals = dict(
+        TankHistory.objects.order_by().values('tank_id').annotate(
+            total=Sum('volume')
+        ).values_list('tank_id', 'total')
+    )
+    adjustments = []
+    for tank in Tank.objects.exclude(created_by=None).iterator():
+        difference = tank.current_volume - (ledger_totals.get(tank.pk) or 0)
+        if difference:
+            last_sequence[tank.pk] = last_sequence.get(tank.pk, 0) + 1
+            adjustments.append(TankHistory(
+                tank_id=tank.pk,
+                organization_id=tank.organization_id,
+                operation_type='adjustment',
+                date=timezone.now().date(),
+                volume=difference,
+                sequence=last_sequence[tank.pk],
+                notes='Ledger reconciled with current tank volume',
+                created_by_id=tank.created_by_id
+            ))
+    TankHistory.objects.bulk_create(adjustments, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cellars', '0011_tank_volume_constraints'),
+        ('harvests', '0010_harvest_organization_harvestallocation_organization_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TankSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(help_text='Last date covered by the snapshot')),
+                ('volume', models.DecimalField(decimal_places=2, help_text='Tank volume in liters at the end of the date', max_digits=10)),
+                ('sequence', models.PositiveIntegerField(help_text='Ledger sequence number when the snapshot was taken')),
+                ('created_at', models.DateTimeField(auto_now=True, help_text='When the snapshot was taken')),
+                ('tank', models.ForeignKey(help_text='Tank that the snapshot belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='cellars.tank')),
+            ],
+            options={
+                'verbose_name': 'Tank Snapshot',
+                'verbose_name_plural': 'Tank Snapshots',
+                'ordering': ['tank', '-date'],
+                'unique_together': {('tank', 'date')},
+            },
+        ),
+        migrations.AlterModelOptions(
+            name='tankhistory',
+            options={'ordering': ['-date', '-sequence'], 'verbose_name': 'Tank History', 'verbose_name_plural': 'Tank Histories'},
+        ),
+        migrations.AddField(
+            model_name='tankhistory',
+            name='allocation',
+            field=models.ForeignKey(blank=True, help_text='Harvest allocation that caused the operation', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tank_history', to='harvests.harvestallocation'),
+        ),
+        migrations.AddField(
+            model_name='tankhistory',
+            name='sequence',
+            field=models.PositiveIntegerField(editable=False, help_text="Position of the entry in the tank's ledger", null=True),
+        ),
+        migrations.AlterField(
+            model_name='tankhistory',
+            name='operation_type',
+            field=models.CharField(choices=[('allocation', 'Allocation from Harvest'), ('transfer_in', 'Transfer In'), ('transfer_out', 'Transfer Out'), ('bottling', 'Bottling'), ('adjustment', 'Adjustment')], help_text='Type of operation', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='tankhistory',
+            name='volume',
+            field=models.DecimalField(decimal_places=2, help_text='Volume change in liters (positive for in, negative for out)', max_digits=10),
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cellars', '0012_tank_ledger'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tankhistory',
+            name='sequence',
+            field=models.PositiveIntegerField(editable=False, help_text="Position of the entry in the tank's ledger"),
+        ),
+        migrations.AddIndex(
+            model_name='tankhistory',
+            index=models.Index(fields=['tank', 'date'], name='tank_history_tank_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tankhistory',
+            constraint=models.UniqueConstraint(fields=('tank', 'sequence'), name='tank_history_unique_sequence'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cellars', '0013_tank_ledger_sequence'),
+        ('harvests', '0011_harvest_list_indexes'),
+        ('organizations', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cellar',
+            index=models.Index(fields=['organization', 'name'], name='cellar_org_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tank',
+            index=models.Index(fields=['organization', 'cellar', 'name'], name='tank_org_cellar_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tankhistory',
+            index=models.Index(fields=['organization', '-date', '-sequence'], name='tank_history_org_date_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+
+def reconcile_ownerless_tanks(apps, schema_editor):
+    """
+    Give tanks without a creator the opening adjustment that 0012 skipped, so
+    their ledger adds up to their current volume.
+    """
+    Tank = apps.get_model('cellars', 'Tank')
+    TankHistory = apps.get_model('cellars', 'TankHistory')
+    TankSnapshot = apps.get_model('cellars', 'TankSnapshot')
+
+    tanks = list(Tank.objects.filter(created_by=None))
+    totals = {
+        row['tank_id']: row
+        for row in TankHistory.objects.filter(tank__in=tanks).order_by().values('tank_id').annotate(
+            total=Sum('volume'), last_sequence=Max('sequence')
+        )
+    }
+    today = timezone.now().date()
+    adjustments = []
+    for tank in tanks:
+        row = totals.get(tank.pk, {})
+        difference = tank.current_volume - (row.get('total') or 0)
+        if difference:
+            adjustments.append(TankHistory(
+                tank_id=tank.pk,
+                organization_id=tank.organization_id,
+                operation_type='adjustment',
+                date=today,
+                volume=difference,
+                sequence=(row.get('last_sequence') or 0) + 1,
+                notes='Ledger reconciled with current tank volume',
+                created_by=None
+            ))
+    TankHistory.objects.bulk_create(adjustments, batch_size=1000)
+    TankSnapshot.objects.filter(tank_id__in=[entry.tank_id for entry in adjustments], date__gte=today).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cellars', '0014_tenant_indexes'),
+        ('harvests', '0013_vintage_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tankhistory',
+            name='allocation',
+            field=models.ForeignKey(blank=True, db_constraint=False, help_text='Harvest allocation that caused the operation', null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='tank_history', to='harvests.harvestallocation'),
+        ),
+        migrations.AlterField(
+            model_name='tankhistory',
+            name='created_by',
+            field=models.ForeignKey(blank=True, help_text='User who created the history entry', null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(reconcile_ownerless_tanks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cellars', '0015_ledger_system_entries'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='tankhistory',
+            name='created_by',
+            field=models.ForeignKey(blank=True, help_text='User who created the history entry', null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -1,14 +1,48 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from django.db.models import Sum
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Sum, Value, DecimalField, Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.core.validators import MinValueValidator
 from harvests.models import Harvest
 from decimal import Decimal
-from core.models import TenantModel
+from core.db_routers import tenant_db
+from core.models import TenantManager, TenantModel, TenantQuerySet
 
 User = get_user_model()
 
+class CellarQuerySet(TenantQuerySet):
+    """
+    QuerySet for cellars with helpers for tank volume statistics.
+    """
+
+    def with_volume_stats(self):
+        """
+        Annotate each cellar with the summed capacity and volume of its tanks.
+
+        The totals are computed in the same grouped query that loads the cellars,
+        so Cellar.capacity, Cellar.total_current_volume and Cellar.available_capacity
+        can be read without any further queries.
+        """
+        zero = Value(Decimal('0.00'), output_field=DecimalField(max_digits=12, decimal_places=2))
+        return self.annotate(
+            tanks_capacity=Coalesce(Sum('tanks__capacity'), zero),
+            tanks_volume=Coalesce(Sum('tanks__current_volume'), zero),
+        )
+
+    def with_volume_summary(self):
+        """
+        Join each cellar's CellarVolumeSummary rollup row.
+
+        The volume properties read the rollup instead of re-summing the tanks,
+        which keeps list pages cheap for cellars holding thousands of barrels.
+        """
+        return self.select_related('volume_summary')
+
 class Cellar(TenantModel):
     """
     Model for managing wine cellars.
@@ -49,16 +83,41 @@ class Cellar(TenantModel):
         help_text="When the cellar was last updated"
     )
 
+    objects = TenantManager.from_queryset(CellarQuerySet)()
+
     def __str__(self):
         return self.name
 
+    def _volume_totals(self):
+        """
+        Return a (capacity, volume) tuple for the cellar's tanks.
+
+        Uses the values annotated by CellarQuerySet.with_volume_stats() or the rollup
+        joined by CellarQuerySet.with_volume_summary() when present, and falls back to
+        a single aggregate query otherwise.
+        """
+        if 'tanks_capacity' in self.__dict__ and 'tanks_volume' in self.__dict__:
+            return self.tanks_capacity, self.tanks_volume
+        if Cellar.volume_summary.is_cached(self):
+            try:
+                summary = self.volume_summary
+            except CellarVolumeSummary.DoesNotExist:
+                summary = None
+            if summary is not None:
+                return summary.total_capacity, summary.total_volume
+        totals = self.tanks.aggregate(
+            capacity=Sum('capacity'),
+            volume=Sum('current_volume')
+        )
+        return totals['capacity'] or Decimal('0.00'), totals['volume'] or Decimal('0.00')
+
     @property
     def capacity(self):
         """
         Calculate total capacity of the cellar by summing all tank capacities.
         Returns the total capacity in liters.
         """
-        return self.tanks.aggregate(total=Sum('capacity'))['total'] or Decimal('0.00')
+        return self._volume_totals()[0]
 
     @property
     def total_current_volume(self):
@@ -66,7 +125,7 @@ class Cellar(TenantModel):
         Calculate total current volume in the cellar by summing all tank volumes.
         Returns the total volume in liters.
         """
-        return self.tanks.aggregate(total=Sum('current_volume'))['total'] or Decimal('0.00')
+        return self._volume_totals()[1]
 
     @property
     def available_capacity(self):
@@ -74,18 +133,22 @@ class Cellar(TenantModel):
         Calculate available capacity in the cellar.
         Returns the available capacity in liters.
         """
-        return self.capacity - self.total_current_volume
+        capacity, volume = self._volume_totals()
+        return capacity - volume
 
     class Meta:
         """
         Metadata for the Cellar model.
 
-        This includes the ordering of cellar instances, the verbose name, and the
-        plural verbose name.
+        This includes the ordering of cellar instances, the verbose name, the
+        plural verbose name and the index behind the organization's cellar list.
         """
         ordering = ['name']
         verbose_name = 'Cellar'
         verbose_name_plural = 'Cellars'
+        indexes = [
+            models.Index(fields=['organization', 'name'], name='cellar_org_name_idx'),
+        ]
 
 class Tank(TenantModel):
     """
@@ -175,13 +238,51 @@ class Tank(TenantModel):
             raise ValidationError("Current volume cannot exceed tank capacity")
 
         if self.pk:  # Only check for existing tanks
-            old_instance = Tank.objects.get(pk=self.pk)
-            if self.capacity < old_instance.current_volume:
+            # Compare against the volume loaded from the database, querying only
+            # when the instance wasn't loaded with it
+            loaded_state = getattr(self, '_rollup_state', None)
+            if loaded_state is not None:
+                old_volume = loaded_state[3]
+            else:
+                old_volume = Tank.objects.filter(pk=self.pk).values_list(
+                    'current_volume', flat=True
+                ).first() or 0
+            if self.capacity < old_volume:
                 raise ValidationError("Tank capacity cannot be reduced below current volume")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._rollup_state = instance._get_rollup_state()
+        return instance
+
+    def _get_rollup_state(self):
+        """
+        Return the (cellar_id, tank_type, capacity, current_volume) values that the
+        cellar volume rollup is built from, or None if any of them is deferred.
+        """
+        deferred = self.get_deferred_fields()
+        if deferred & {'cellar_id', 'tank_type', 'capacity', 'current_volume'}:
+            return None
+        return (self.cellar_id, self.tank_type, self.capacity, self.current_volume)
+
     def save(self, *args, **kwargs):
-        self.full_clean()
-        super().save(*args, **kwargs)
+        # The volume CHECK constraints are enforced by the database and mirrored in
+        # clean(), so skip the extra validation queries for them here
+        self.full_clean(validate_constraints=False)
+        is_new = self._state.adding
+        old_state = None if is_new else getattr(self, '_rollup_state', None)
+        if not is_new and old_state is None:
+            old_state = Tank.objects.filter(pk=self.pk).values_list(
+                'cellar_id', 'tank_type', 'capacity', 'current_volume'
+            ).first()
+
+        # Keep the cellar rollup in the same transaction as the tank row
+        with transaction.atomic(using=tenant_db(self.organization_id)):
+            super().save(*args, **kwargs)
+            new_state = self._get_rollup_state()
+            CellarVolumeSummary.objects.apply_tank_change(old_state, new_state)
+        self._rollup_state = new_state
 
     @property
     def available_space(self):
@@ -192,6 +293,22 @@ class Tank(TenantModel):
         """
         return float(self.capacity - self.current_volume)
 
+    def volume_as_of(self, date):
+        """
+        Return the volume the tank held at the end of the given date.
+
+        Reads the latest ledger snapshot on or before the date and adds the
+        history entries recorded after it, so the cost depends on the number of
+        entries since the snapshot rather than on the whole history.
+
+        Args:
+            date: Date to compute the volume for
+
+        Returns:
+            Decimal: Volume in liters according to the tank's history ledger
+        """
+        return TankSnapshot.objects.volume_as_of(self.pk, date)
+
     def update_volume(self, volume_change):
         """
         Update the current volume of the tank.
@@ -216,12 +333,332 @@ class Tank(TenantModel):
         Metadata for the Tank model.
 
         This includes the ordering of tank instances, the verbose name, the plural
-        verbose name, and a unique constraint on the cellar and name fields.
+        verbose name, a unique constraint on the cellar and name fields, the
+        index behind the organization's tank list, and database CHECK
+        constraints that keep the volume within the capacity.
         """
         ordering = ['cellar', 'name']
         verbose_name = 'Tank'
         verbose_name_plural = 'Tanks'
         unique_together = ['cellar', 'name']
+        indexes = [
+            models.Index(fields=['organization', 'cellar', 'name'], name='tank_org_cellar_name_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(current_volume__gte=0),
+                name='tank_volume_non_negative'
+            ),
+            models.CheckConstraint(
+                condition=models.Q(current_volume__lte=F('capacity')),
+                name='tank_volume_within_capacity'
+            ),
+        ]
+
+class CellarVolumeSummaryManager(models.Manager):
+    """
+    Manager that maintains the denormalized cellar volume rollups.
+
+    Every change is applied as an F() expression UPDATE so concurrent writers
+    never overwrite each other's totals.
+    """
+
+    def apply_delta(self, cellar_id, tank_type, tanks=0, capacity=0, volume=0, create=True):
+        """
+        Add the given deltas to a cellar's rollup and its tank type breakdown.
+
+        Args:
+            cellar_id: ID of the cellar whose rollup changes
+            tank_type: Tank type whose breakdown row changes
+            tanks: Change in the number of tanks
+            capacity: Change in total capacity in liters
+            volume: Change in total volume in liters
+            create: Create missing rollup rows; disabled for deletes, where the
+                cellar itself may already be gone
+        """
+        if not (tanks or capacity or volume):
+            return
+        changes = {
+            'tank_count': F('tank_count') + tanks,
+            'total_capacity': F('total_capacity') + capacity,
+            'total_volume': F('total_volume') + volume,
+        }
+        self._update_row(self.model, {'cellar_id': cellar_id}, changes, create)
+        self._update_row(
+            TankTypeVolumeSummary,
+            {'cellar_id': cellar_id, 'tank_type': tank_type},
+            changes,
+            create
+        )
+
+    def apply_volume_deltas(self, deltas):
+        """
+        Apply several volume changes at once, merging them per rollup row.
+
+        Volume moved between tanks of the same cellar and tank type nets out
+        to zero and costs no queries.
+
+        Args:
+            deltas: Dict mapping (cellar_id, tank_type) to a volume change in liters
+        """
+        by_cellar = {}
+        for (cellar_id, tank_type), volume in deltas.items():
+            by_cellar[cellar_id] = by_cellar.get(cellar_id, 0) + volume
+            if volume:
+                self._update_row(
+                    TankTypeVolumeSummary,
+                    {'cellar_id': cellar_id, 'tank_type': tank_type},
+                    {'total_volume': F('total_volume') + volume},
+                    True
+                )
+        for cellar_id, volume in by_cellar.items():
+            if volume:
+                self._update_row(
+                    self.model,
+                    {'cellar_id': cellar_id},
+                    {'total_volume': F('total_volume') + volume},
+                    True
+                )
+
+    @staticmethod
+    def _update_row(model, lookup, changes, create):
+        """Apply an F() expression update to one rollup row, creating it if missing."""
+        rows = model.objects.filter(**lookup)
+        if not rows.update(**changes) and create:
+            model.objects.get_or_create(**lookup)
+            rows.update(**changes)
+
+    def apply_tank_change(self, old_state, new_state):
+        """
+        Apply the rollup deltas between two Tank rollup states.
+
+        Args:
+            old_state: (cellar_id, tank_type, capacity, current_volume) before the
+                change, or None for a new tank
+            new_state: The same tuple after the change, or None for a deleted tank
+        """
+        if old_state and new_state and old_state[:2] == new_state[:2]:
+            cellar_id, tank_type, capacity, volume = new_state
+            self.apply_delta(
+                cellar_id, tank_type,
+                capacity=capacity - old_state[2],
+                volume=volume - old_state[3]
+            )
+            return
+        if old_state:
+            cellar_id, tank_type, capacity, volume = old_state
+            self.apply_delta(
+                cellar_id, tank_type,
+                tanks=-1, capacity=-capacity, volume=-volume,
+                create=False
+            )
+        if new_state:
+            cellar_id, tank_type, capacity, volume = new_state
+            self.apply_delta(cellar_id, tank_type, tanks=1, capacity=capacity, volume=volume)
+
+    def expected_totals(self, cellar_ids=None):
+        """
+        Recompute the rollups from the Tank table in one grouped query.
+
+        Returns:
+            dict: Maps (cellar_id, tank_type) to (tank_count, capacity, volume)
+        """
+        tanks = Tank.objects.all()
+        if cellar_ids is not None:
+            tanks = tanks.filter(cellar_id__in=cellar_ids)
+        rows = tanks.order_by().values('cellar_id', 'tank_type').annotate(
+            tank_count=Count('id'),
+            total_capacity=Sum('capacity'),
+            total_volume=Sum('current_volume')
+        )
+        return {
+            (row['cellar_id'], row['tank_type']): (
+                row['tank_count'], row['total_capacity'], row['total_volume']
+            )
+            for row in rows
+        }
+
+    def rebuild(self, cellar_ids=None):
+        """
+        Rebuild the rollups from scratch.
+
+        Args:
+            cellar_ids: Optional list of cellar IDs to limit the rebuild to
+
+        Returns:
+            int: Number of cellar rollups written
+        """
+        cellars = Cellar.objects.all()
+        if cellar_ids is not None:
+            cellars = cellars.filter(pk__in=cellar_ids)
+        cellar_ids = list(cellars.values_list('pk', flat=True))
+
+        summaries = {
+            cellar_id: self.model(cellar_id=cellar_id)
+            for cellar_id in cellar_ids
+        }
+        breakdown = []
+        for (cellar_id, tank_type), (count, capacity, volume) in self.expected_totals(cellar_ids).items():
+            summary = summaries[cellar_id]
+            summary.tank_count += count
+            summary.total_capacity += capacity
+            summary.total_volume += volume
+            breakdown.append(TankTypeVolumeSummary(
+                cellar_id=cellar_id,
+                tank_type=tank_type,
+                tank_count=count,
+                total_capacity=capacity,
+                total_volume=volume
+            ))
+
+        with transaction.atomic(using=tenant_db()):
+            self.filter(cellar_id__in=cellar_ids).delete()
+            TankTypeVolumeSummary.objects.filter(cellar_id__in=cellar_ids).delete()
+            self.bulk_create(summaries.values())
+            TankTypeVolumeSummary.objects.bulk_create(breakdown)
+        return len(summaries)
+
+    def verify(self, cellar_ids=None):
+        """
+        Compare the stored rollups with totals recomputed from the tanks.
+
+        Returns:
+            list: One dict per mismatching (cellar, tank type) pair; a tank type
+            of None refers to the cellar totals
+        """
+        expected = self.expected_totals(cellar_ids)
+        for (cellar_id, _), (count, capacity, volume) in list(expected.items()):
+            tanks, total_capacity, total_volume = expected.get((cellar_id, None), (0, 0, 0))
+            expected[(cellar_id, None)] = (
+                tanks + count, total_capacity + capacity, total_volume + volume
+            )
+
+        stored_rows = TankTypeVolumeSummary.objects.all()
+        summaries = self.all()
+        if cellar_ids is not None:
+            stored_rows = stored_rows.filter(cellar_id__in=cellar_ids)
+            summaries = summaries.filter(cellar_id__in=cellar_ids)
+        stored = {
+            (row.cellar_id, row.tank_type): (row.tank_count, row.total_capacity, row.total_volume)
+            for row in stored_rows
+        }
+        stored.update({
+            (row.cellar_id, None): (row.tank_count, row.total_capacity, row.total_volume)
+            for row in summaries
+        })
+        empty = (0, Decimal('0.00'), Decimal('0.00'))
+
+        discrepancies = []
+        for key in sorted(set(expected) | set(stored), key=str):
+            if expected.get(key, empty) != stored.get(key, empty):
+                discrepancies.append({
+                    'cellar_id': key[0],
+                    'tank_type': key[1],
+                    'expected': expected.get(key, empty),
+                    'stored': stored.get(key, empty),
+                })
+        return discrepancies
+
+class CellarVolumeSummary(models.Model):
+    """
+    Denormalized rollup of tank capacity and volume for one cellar.
+
+    Maintained in the same transaction as every change to a tank's volume,
+    capacity, type or cellar. The per tank type breakdown lives in
+    TankTypeVolumeSummary. Use the rebuild_volume_summaries command to rebuild
+    and verify the rollups from scratch.
+    """
+
+    cellar = models.OneToOneField(
+        Cellar,
+        on_delete=models.CASCADE,
+        related_name='volume_summary',
+        help_text="Cellar that the rollup belongs to"
+    )
+    tank_count = models.IntegerField(
+        default=0,
+        help_text="Number of tanks in the cellar"
+    )
+    total_capacity = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Total tank capacity in liters"
+    )
+    total_volume = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Total current volume in liters"
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When the rollup was last rebuilt"
+    )
+
+    objects = CellarVolumeSummaryManager()
+
+    def __str__(self):
+        return f"{self.cellar_id}: {self.total_volume}L of {self.total_capacity}L in {self.tank_count} tanks"
+
+    @property
+    def available_capacity(self):
+        """Return the unused capacity of the cellar in liters."""
+        return self.total_capacity - self.total_volume
+
+    @property
+    def breakdown(self):
+        """Return the per tank type rollups keyed by tank type."""
+        return {
+            row.tank_type: row
+            for row in TankTypeVolumeSummary.objects.filter(cellar_id=self.cellar_id)
+        }
+
+    class Meta:
+        verbose_name = 'Cellar Volume Summary'
+        verbose_name_plural = 'Cellar Volume Summaries'
+
+class TankTypeVolumeSummary(models.Model):
+    """
+    Per tank type breakdown of a cellar's volume rollup.
+    """
+
+    cellar = models.ForeignKey(
+        Cellar,
+        on_delete=models.CASCADE,
+        related_name='tank_type_summaries',
+        help_text="Cellar that the rollup belongs to"
+    )
+    tank_type = models.CharField(
+        max_length=20,
+        choices=Tank.TANK_TYPES,
+        help_text="Type of tank"
+    )
+    tank_count = models.IntegerField(
+        default=0,
+        help_text="Number of tanks of this type"
+    )
+    total_capacity = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Total capacity of tanks of this type in liters"
+    )
+    total_volume = models.DecimalField(
+        max_digits=14,
+        decimal_places=2,
+        default=Decimal('0.00'),
+        help_text="Total current volume of tanks of this type in liters"
+    )
+
+    def __str__(self):
+        return f"{self.cellar_id} ({self.get_tank_type_display()}): {self.total_volume}L"
+
+    class Meta:
+        ordering = ['cellar', 'tank_type']
+        verbose_name = 'Tank Type Volume Summary'
+        verbose_name_plural = 'Tank Type Volume Summaries'
+        unique_together = ['cellar', 'tank_type']
 
 class CrushedJuiceAllocation(models.Model):
     """
@@ -333,12 +770,74 @@ class CrushedJuiceAllocation(models.Model):
         verbose_name = 'Crushed Juice Allocation'
         verbose_name_plural = 'Crushed Juice Allocations'
 
+class TankHistoryManager(TenantManager):
+    """
+    Manager for appending entries to the tank history ledger.
+
+    Every entry gets the next per-tank sequence number while the tank row is
+    locked, and a snapshot is checkpointed every TANK_SNAPSHOT_INTERVAL entries.
+    """
+
+    def append(self, entries):
+        """
+        Append several entries to the ledger with a single INSERT.
+
+        Args:
+            entries: Unsaved TankHistory instances
+
+        Returns:
+            list: The created entries
+        """
+        entries = list(entries)
+        if not entries:
+            return []
+        # Errors abort the caller's transaction anyway, so skip the savepoint
+        with transaction.atomic(using=tenant_db(entries[0].organization_id), savepoint=False):
+            self._assign_sequences(entries)
+            created = self.bulk_create(entries)
+            self._after_append(created)
+        return created
+
+    def _assign_sequences(self, entries):
+        """Lock the tanks of the entries and number the entries per tank."""
+        last_sequence = self.filter(tank=OuterRef('pk')).order_by('-sequence').values('sequence')[:1]
+        next_sequence = {
+            pk: (last or 0) + 1
+            for pk, last in Tank.objects.select_for_update().filter(
+                pk__in={entry.tank_id for entry in entries}
+            ).order_by('pk').annotate(last_sequence=Subquery(last_sequence)).values_list(
+                'pk', 'last_sequence'
+            )
+        }
+        for entry in entries:
+            entry.sequence = next_sequence[entry.tank_id]
+            next_sequence[entry.tank_id] += 1
+
+    def _after_append(self, entries):
+        """Drop snapshots made stale by back-dated entries and checkpoint new ones."""
+        earliest = {}
+        for entry in entries:
+            if entry.tank_id not in earliest or entry.date < earliest[entry.tank_id]:
+                earliest[entry.tank_id] = entry.date
+        stale = Q()
+        for tank_id, date in earliest.items():
+            stale |= Q(tank_id=tank_id, date__gte=date)
+        TankSnapshot.objects.filter(stale).delete()
+
+        interval = getattr(settings, 'TANK_SNAPSHOT_INTERVAL', 100)
+        for entry in entries:
+            if entry.sequence % interval == 0:
+                # Snapshot the day before, which the entry itself doesn't touch
+                TankSnapshot.objects.checkpoint(entry.tank_id, entry.date - timedelta(days=1), entry.sequence)
+
 class TankHistory(TenantModel):
     """
     Model for managing tank history.
 
     This model tracks information about the history of a tank, including the type
-    of operation, the date, the volume change, and any relevant notes.
+    of operation, the date, the volume change, and any relevant notes. Entries
+    form an append-only ledger of signed volume changes, numbered per tank, from
+    which the tank's volume on any date can be computed.
     """
 
     # Operation type choices
@@ -347,6 +846,7 @@ class TankHistory(TenantModel):
         ('transfer_in', 'Transfer In'),
         ('transfer_out', 'Transfer Out'),
         ('bottling', 'Bottling'),
+        ('adjustment', 'Adjustment'),
     ]
 
     # Basic history information
@@ -367,9 +867,12 @@ class TankHistory(TenantModel):
     volume = models.DecimalField(
         max_digits=10,
         decimal_places=2,
-        validators=[MinValueValidator(0)],
         help_text="Volume change in liters (positive for in, negative for out)"
     )
+    sequence = models.PositiveIntegerField(
+        editable=False,
+        help_text="Position of the entry in the tank's ledger"
+    )
     source = models.ForeignKey(
         'Tank',
         on_delete=models.SET_NULL,
@@ -393,16 +896,31 @@ class TankHistory(TenantModel):
         blank=True,
         help_text="Harvest associated with the operation"
     )
+    # Kept after the allocation is deleted, so the entries reversing it still
+    # match the allocation they belong to
+    allocation = models.ForeignKey(
+        'harvests.HarvestAllocation',
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name='tank_history',
+        help_text="Harvest allocation that caused the operation"
+    )
     notes = models.TextField(
         blank=True,
         null=True,
         help_text="Additional notes about the operation"
     )
 
-    # Relationship with the user who created the history entry
+    # Relationship with the user who created the history entry; empty for
+    # entries written by the system, e.g. ledger reconciliations, and for
+    # entries of deleted users, as deleting a user must not rewrite the ledger
     created_by = models.ForeignKey(
         User,
-        on_delete=models.CASCADE,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
         help_text="User who created the history entry"
     )
 
@@ -412,6 +930,25 @@ class TankHistory(TenantModel):
         help_text="When the history entry was created"
     )
 
+    objects = TankHistoryManager()
+
+    def save(self, *args, **kwargs):
+        """
+        Append the entry to the tank's ledger.
+
+        Raises:
+            ValidationError: If the entry already exists, as the ledger is append-only
+        """
+        if not self._state.adding:
+            raise ValidationError("Tank history entries are append-only")
+        with transaction.atomic(using=tenant_db(self.organization_id), savepoint=False):
+            TankHistory.objects._assign_sequences([self])
+            super().save(*args, **kwargs)
+            TankHistory.objects._after_append([self])
+
+    def delete(self, *args, **kwargs):
+        raise ValidationError("Tank history entries are append-only")
+
     def __str__(self):
         if self.operation_type == 'allocation':
             return f"{self.date}: Allocated {self.volume}L from harvest to {self.tank}"
@@ -427,8 +964,138 @@ class TankHistory(TenantModel):
         """
         Metadata for the TankHistory model.
 
-        This includes the ordering of history instances and the verbose name.
+        This includes the ordering of history instances, the verbose name, the
+        unique per-tank sequence and the indexes used for as-of-date queries and
+        the organization's history.
         """
-        ordering = ['-date', '-created_at']
+        ordering = ['-date', '-sequence']
         verbose_name = 'Tank History'
         verbose_name_plural = 'Tank Histories'
+        constraints = [
+            models.UniqueConstraint(fields=['tank', 'sequence'], name='tank_history_unique_sequence'),
+        ]
+        indexes = [
+            models.Index(fields=['tank', 'date'], name='tank_history_tank_date_idx'),
+            models.Index(fields=['organization', '-date', '-sequence'], name='tank_history_org_date_idx'),
+        ]
+
+class TankSnapshotManager(models.Manager):
+    """
+    Manager for the tank ledger snapshots.
+    """
+
+    def volume_as_of(self, tank_id, date):
+        """
+        Compute a tank's volume at the end of a date from its ledger.
+
+        Args:
+            tank_id: ID of the tank
+            date: Date to compute the volume for
+
+        Returns:
+            Decimal: Volume in liters
+        """
+        snapshot = self.filter(tank_id=tank_id, date__lte=date).order_by('-date').values_list(
+            'date', 'volume'
+        ).first()
+        entries = TankHistory.objects.filter(tank_id=tank_id, date__lte=date)
+        volume = Decimal('0')
+        if snapshot:
+            entries = entries.filter(date__gt=snapshot[0])
+            volume = snapshot[1]
+        return volume + (entries.aggregate(total=Sum('volume'))['total'] or 0)
+
+    def volumes_as_of(self, date, tanks=None):
+        """
+        Compute the volume of many tanks at the end of a date in a single query.
+
+        Args:
+            date: Date to compute the volumes for
+            tanks: Optional Tank queryset to limit the result to; all tanks if omitted
+
+        Returns:
+            dict: Volume in liters keyed by tank ID
+        """
+        tanks = Tank.objects.all() if tanks is None else tanks
+        latest = self.filter(tank=OuterRef('pk'), date__lte=date).order_by('-date')
+        rows = tanks.order_by().annotate(
+            snapshot_date=Subquery(latest.values('date')[:1]),
+            snapshot_volume=Subquery(latest.values('volume')[:1])
+        ).annotate(
+            tail_volume=Sum(
+                'history__volume',
+                filter=Q(history__date__lte=date) & (
+                    Q(snapshot_date__isnull=True) | Q(history__date__gt=F('snapshot_date'))
+                )
+            )
+        ).values_list('pk', 'snapshot_volume', 'tail_volume')
+        return {
+            pk: (snapshot_volume or Decimal('0')) + (tail_volume or Decimal('0'))
+            for pk, snapshot_volume, tail_volume in rows
+        }
+
+    def checkpoint(self, tank_id, date, sequence):
+        """
+        Store the tank's volume at the end of a date as a snapshot.
+
+        Args:
+            tank_id: ID of the tank
+            date: Date the snapshot covers, inclusive
+            sequence: Ledger sequence number at the time of the snapshot
+
+        Returns:
+            TankSnapshot: The created or updated snapshot
+        """
+        snapshot, _ = self.update_or_create(
+            tank_id=tank_id,
+            date=date,
+            defaults={'volume': self.volume_as_of(tank_id, date), 'sequence': sequence}
+        )
+        return snapshot
+
+class TankSnapshot(models.Model):
+    """
+    Checkpoint of a tank's ledger volume.
+
+    Holds the sum of all history entries of the tank dated on or before the
+    snapshot date. Snapshots are derived data: they are dropped whenever an entry
+    is back-dated into the period they cover and recreated at the next checkpoint.
+    """
+
+    tank = models.ForeignKey(
+        Tank,
+        on_delete=models.CASCADE,
+        related_name='snapshots',
+        help_text="Tank that the snapshot belongs to"
+    )
+    date = models.DateField(
+        help_text="Last date covered by the snapshot"
+    )
+    volume = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        help_text="Tank volume in liters at the end of the date"
+    )
+    sequence = models.PositiveIntegerField(
+        help_text="Ledger sequence number when the snapshot was taken"
+    )
+    created_at = models.DateTimeField(
+        auto_now=True,
+        help_text="When the snapshot was taken"
+    )
+
+    objects = TankSnapshotManager()
+
+    def __str__(self):
+        return f"{self.tank_id} on {self.date}: {self.volume}L"
+
+    class Meta:
+        ordering = ['tank', '-date']
+        verbose_name = 'Tank Snapshot'
+        verbose_name_plural = 'Tank Snapshots'
+        unique_together = ['tank', 'date']
+
+@receiver(post_delete, sender=Tank)
+def remove_tank_from_volume_summary(sender, instance, **kwargs):
+    """Subtract a deleted tank from its cellar's volume rollup."""
+    CellarVolumeSummary.objects.apply_tank_change(instance._get_rollup_state(), None)
@@ -0,0 +1,225 @@
+"""
+Services for moving wine between tanks.
+
+These functions apply tank volume changes as single-statement F() expression
+updates inside one transaction, however many tanks are involved. Tanks are
+locked with SELECT ... FOR UPDATE in primary key order, so concurrent
+operations on overlapping tanks queue up instead of deadlocking or losing
+updates.
+"""
+
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Case, DecimalField, F, Value, When
+from django.utils import timezone
+from core.cache import invalidate
+from core.db_routers import tenant_db
+from .models import Tank, TankHistory, CellarVolumeSummary
+
+def lock_tanks(tank_ids):
+    """
+    Lock the given tanks for update in a deterministic order.
+
+    Must be called inside a transaction.
+
+    Args:
+        tank_ids: IDs of the tanks to lock
+
+    Returns:
+        dict: Locked Tank instances keyed by ID
+    """
+    tanks = Tank.objects.select_for_update().filter(pk__in=set(tank_ids)).order_by('pk')
+    locked = {tank.pk: tank for tank in tanks}
+    missing = set(tank_ids) - set(locked)
+    if missing:
+        raise ValidationError(f"Tanks not found: {', '.join(str(pk) for pk in sorted(missing))}")
+    return locked
+
+def transfer(source_tank, target_tank, volume, date, user, notes=None):
+    """
+    Transfer wine from one tank to another.
+
+    Both tanks are locked, the transfer is validated against the locked volumes,
+    and the volume changes, history rows and cellar rollups are written in one
+    transaction.
+
+    Args:
+        source_tank: Tank (or tank ID) the wine is taken from
+        target_tank: Tank (or tank ID) the wine is moved into
+        volume: Volume to transfer in liters
+        date: Date of the transfer
+        user: User performing the transfer
+        notes: Optional notes stored on both history entries
+
+    Returns:
+        tuple: The (transfer_out, transfer_in) TankHistory entries
+
+    Raises:
+        ValidationError: If the tanks are the same, the volume is not positive,
+            the source holds too little wine or the target has too little space
+    """
+    return tuple(transfer_many([(source_tank, target_tank, volume)], date, user, notes))
+
+def transfer_many(legs, date, user, notes=None):
+    """
+    Move wine along several source -> target legs in one operation.
+
+    Used for blending and racking, where several tanks are drained into several
+    others. All tanks involved are locked once and every leg is validated against
+    that snapshot before anything is written. A tank can't give more wine than
+    it holds before the blend, since all legs are applied at once; capacity is
+    checked on the net change, so a full tank may receive as much as it gives.
+
+    The writes are one UPDATE ... CASE for all tanks, one bulk_create for the
+    history rows and one update per affected rollup row, so the query count
+    does not grow with the number of legs.
+
+    Args:
+        legs: Iterable of (source_tank, target_tank, volume) tuples, where the
+            tanks may be Tank instances or tank IDs
+        date: Date of the transfers
+        user: User performing the transfers
+        notes: Optional notes stored on all history entries
+
+    Returns:
+        list: TankHistory entries, a transfer_out and transfer_in pair per leg
+
+    Raises:
+        ValidationError: If a leg is invalid, the tanks belong to different
+            organizations, a tank would give more wine than it holds, or a
+            tank would end up above its capacity
+    """
+    parsed = []
+    passed_tanks = []
+    for source_tank, target_tank, volume in legs:
+        source_id = getattr(source_tank, 'pk', source_tank)
+        target_id = getattr(target_tank, 'pk', target_tank)
+        volume = Decimal(str(volume))
+        if source_id == target_id:
+            raise ValidationError("Source and target tanks must be different")
+        if volume <= 0:
+            raise ValidationError("Transfer volume must be greater than 0")
+        parsed.append((source_id, target_id, volume))
+        passed_tanks.extend(tank for tank in (source_tank, target_tank) if isinstance(tank, Tank))
+    if not parsed:
+        raise ValidationError("At least one transfer is required")
+
+    deltas = {}
+    outgoing = {}
+    for source_id, target_id, volume in parsed:
+        deltas[source_id] = deltas.get(source_id, 0) - volume
+        deltas[target_id] = deltas.get(target_id, 0) + volume
+        outgoing[source_id] = outgoing.get(source_id, 0) + volume
+
+    try:
+        with transaction.atomic(using=tenant_db()):
+            tanks = lock_tanks(deltas)
+            if len({tank.organization_id for tank in tanks.values()}) > 1:
+                raise ValidationError("All tanks must belong to the same organization")
+            _validate_deltas(tanks, deltas, outgoing)
+
+            update_tank_volumes(tanks, deltas, user)
+
+            history = []
+            for source_id, target_id, volume in parsed:
+                source, target = tanks[source_id], tanks[target_id]
+                history.append(TankHistory(
+                    organization_id=source.organization_id,
+                    tank_id=source_id,
+                    operation_type='transfer_out',
+                    date=date,
+                    volume=-volume,
+                    destination_id=target_id,
+                    notes=notes,
+                    created_by=user
+                ))
+                history.append(TankHistory(
+                    organization_id=target.organization_id,
+                    tank_id=target_id,
+                    operation_type='transfer_in',
+                    date=date,
+                    volume=volume,
+                    source_id=source_id,
+                    notes=notes,
+                    created_by=user
+                ))
+            history = TankHistory.objects.append(history)
+    except IntegrityError as e:
+        # The tank volume CHECK constraints are the last line of defence
+        raise ValidationError(f"Transfer would violate tank volume limits: {e}")
+
+    # Keep the caller's instances in step with the database
+    for tank in passed_tanks:
+        tank.current_volume = tanks[tank.pk].current_volume + deltas[tank.pk]
+        tank._rollup_state = tank._get_rollup_state()
+    return history
+
+def update_tank_volumes(tanks, deltas, user):
+    """
+    Apply volume deltas to locked tanks and their cellar rollups.
+
+    All tanks are written with one UPDATE ... CASE, and the rollups with one
+    update per affected (cellar, tank type) row. Must be called inside the
+    transaction that locked the tanks, after the deltas were validated.
+
+    Args:
+        tanks: Locked Tank instances keyed by ID
+        deltas: Net volume change in liters keyed by tank ID
+        user: User making the change
+    """
+    changed = {pk: delta for pk, delta in deltas.items() if delta}
+    if not changed:
+        return
+    Tank.objects.filter(pk__in=changed).update(
+        current_volume=F('current_volume') + Case(
+            *[When(pk=pk, then=Value(delta)) for pk, delta in changed.items()],
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        ),
+        updated_at=timezone.now(),
+        updated_by=user
+    )
+
+    rollup_deltas = {}
+    for pk, delta in changed.items():
+        key = (tanks[pk].cellar_id, tanks[pk].tank_type)
+        rollup_deltas[key] = rollup_deltas.get(key, 0) + delta
+    CellarVolumeSummary.objects.apply_volume_deltas(rollup_deltas)
+    for organization_id in {tanks[pk].organization_id for pk in changed}:
+        invalidate(Tank, organization_id)
+
+def _validate_deltas(tanks, deltas, outgoing=None):
+    """
+    Check that applying the volume deltas keeps every tank within its limits.
+
+    Args:
+        tanks: Locked Tank instances keyed by ID
+        deltas: Net volume change in liters keyed by tank ID
+        outgoing: Optional total volume leaving each tank keyed by tank ID. It
+            may not exceed the locked volume even if wine flows back in, as
+            all legs are applied at once.
+
+    Raises:
+        ValidationError: Listing every tank that would be overdrawn or overfilled
+    """
+    errors = []
+    for pk, delta in deltas.items():
+        tank = tanks[pk]
+        taken = (outgoing or {}).get(pk, 0)
+        if taken > tank.current_volume:
+            errors.append(
+                f"Transfer volume ({taken} L) cannot exceed tank {tank.name}'s current volume "
+                f"({tank.current_volume} L)"
+            )
+        elif tank.current_volume + delta < 0:
+            errors.append(
+                f"Transfer volume ({-delta} L) cannot exceed tank {tank.name}'s current volume "
+                f"({tank.current_volume} L)"
+            )
+        elif tank.current_volume + delta > tank.capacity:
+            errors.append(
+                f"Transfer volume ({delta} L) exceeds tank {tank.name}'s available space "
+                f"({tank.capacity - tank.current_volume} L)"
+            )
+    if errors:
+        raise ValidationError(errors)
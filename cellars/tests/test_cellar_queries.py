@@ -0,0 +1,89 @@
+"""
+Query-count regression tests for cellar views.
+"""
+
+import pytest
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from cellars.models import Cellar, Tank, CellarVolumeSummary
+
+def create_cellars(organization, user, count):
+    """Create ``count`` cellars with two tanks each."""
+    cellars = Cellar.objects.bulk_create([
+        Cellar(
+            name=f'Cellar {i:04d}',
+            location='Test Location',
+            organization=organization,
+            created_by=user
+        )
+        for i in range(count)
+    ])
+    Tank.objects.bulk_create([
+        Tank(
+            cellar=cellar,
+            name=f'Tank {j}',
+            capacity=Decimal('1000.00'),
+            current_volume=Decimal('250.00'),
+            organization=organization,
+            created_by=user
+        )
+        for cellar in cellars
+        for j in range(2)
+    ])
+    # bulk_create bypasses Tank.save, so build the volume rollups explicitly
+    CellarVolumeSummary.objects.rebuild([cellar.pk for cellar in cellars])
+    return cellars
+
+def count_list_queries(client):
+    """Render the cellar list and return the number of queries it took."""
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(reverse('cellars:list_cellars'))
+    assert response.status_code == 200
+    return len(queries)
+
+@pytest.mark.django_db
+class TestCellarVolumeStats:
+    """Test cases for CellarQuerySet.with_volume_stats()."""
+
+    def test_annotated_values_match_aggregates(self, tenant_client, organization):
+        """Annotated totals should equal the per-instance aggregates."""
+        _, user = tenant_client
+        create_cellars(organization, user, 1)
+        Cellar.objects.create(
+            name='Empty Cellar',
+            location='Test Location',
+            organization=organization,
+            created_by=user
+        )
+
+        for cellar in Cellar.objects.with_volume_stats():
+            plain = Cellar.objects.get(pk=cellar.pk)
+            assert cellar.capacity == plain.capacity
+            assert cellar.total_current_volume == plain.total_current_volume
+            assert cellar.available_capacity == plain.available_capacity
+
+    def test_annotated_properties_do_not_query(self, tenant_client, organization, django_assert_num_queries):
+        """Reading the volume properties of an annotated cellar should not hit the database."""
+        _, user = tenant_client
+        create_cellars(organization, user, 1)
+        cellar = Cellar.objects.with_volume_stats().get()
+
+        with django_assert_num_queries(0):
+            assert cellar.capacity == Decimal('2000.00')
+            assert cellar.total_current_volume == Decimal('500.00')
+            assert cellar.available_capacity == Decimal('1500.00')
+
+    def test_list_query_count_is_constant(self, tenant_client, organization):
+        """The cellar list should take the same number of queries for 1 or 500 cellars."""
+        client, user = tenant_client
+        create_cellars(organization, user, 1)
+        count_list_queries(client)  # Warm the tenant cache
+        single = count_list_queries(client)
+
+        create_cellars(organization, user, 499)
+        many = count_list_queries(client)
+
+        assert Cellar.objects.count() == 500
+        assert single == many
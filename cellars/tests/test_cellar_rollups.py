@@ -0,0 +1,131 @@
+"""
+Tests for the denormalized cellar volume rollups.
+"""
+
+import pytest
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from django.urls import reverse
+from cellars.models import Cellar, Tank, CellarVolumeSummary, TankTypeVolumeSummary
+
+@pytest.fixture
+def cellar(tenant_client, organization):
+    """Create a test cellar."""
+    _, user = tenant_client
+    return Cellar.objects.create(
+        name='Test Cellar',
+        location='Test Location',
+        organization=organization,
+        created_by=user
+    )
+
+@pytest.fixture
+def make_tank(cellar):
+    """Return a factory for tanks in the test cellar."""
+    def make(name, capacity=1000, current_volume=0, tank_type='stainless_steel'):
+        return Tank.objects.create(
+            cellar=cellar,
+            name=name,
+            tank_type=tank_type,
+            capacity=Decimal(capacity),
+            current_volume=Decimal(current_volume),
+            organization=cellar.organization,
+            created_by=cellar.created_by
+        )
+    return make
+
+def summary_of(cellar):
+    return CellarVolumeSummary.objects.get(cellar=cellar)
+
+@pytest.mark.django_db
+class TestCellarVolumeSummary:
+    """Test cases for CellarVolumeSummary maintenance."""
+
+    def test_tank_creation_updates_rollup(self, cellar, make_tank):
+        make_tank('T1', capacity=1000, current_volume=200)
+        make_tank('B1', capacity=225, current_volume=100, tank_type='oak_barrel')
+
+        summary = summary_of(cellar)
+        assert summary.tank_count == 2
+        assert summary.total_capacity == Decimal('1225.00')
+        assert summary.total_volume == Decimal('300.00')
+        assert summary.breakdown['oak_barrel'].total_volume == Decimal('100.00')
+        assert CellarVolumeSummary.objects.verify() == []
+
+    def test_update_volume_applies_delta(self, cellar, make_tank):
+        tank = make_tank('T1', capacity=1000, current_volume=200)
+        tank.update_volume(Decimal('150.50'))
+        tank.update_volume(-50)
+
+        summary = summary_of(cellar)
+        assert summary.total_volume == Decimal('300.50')
+        assert summary.available_capacity == Decimal('699.50')
+        assert CellarVolumeSummary.objects.verify() == []
+
+    def test_tank_type_change_moves_breakdown(self, cellar, make_tank):
+        tank = make_tank('T1', capacity=1000, current_volume=200)
+        tank.tank_type = 'concrete'
+        tank.save()
+
+        breakdown = summary_of(cellar).breakdown
+        assert breakdown['stainless_steel'].tank_count == 0
+        assert breakdown['concrete'].tank_count == 1
+        assert breakdown['concrete'].total_volume == Decimal('200.00')
+        assert CellarVolumeSummary.objects.verify() == []
+
+    def test_tank_deletion_updates_rollup(self, cellar, make_tank):
+        make_tank('T1', capacity=1000, current_volume=200)
+        tank = make_tank('T2', capacity=500)
+        tank.delete()
+
+        summary = summary_of(cellar)
+        assert summary.tank_count == 1
+        assert summary.total_capacity == Decimal('1000.00')
+        assert CellarVolumeSummary.objects.verify() == []
+
+    def test_cellar_deletion_removes_rollup(self, cellar, make_tank):
+        make_tank('T1', capacity=1000, current_volume=0)
+        cellar.delete()
+
+        assert not CellarVolumeSummary.objects.exists()
+        assert not TankTypeVolumeSummary.objects.exists()
+
+    def test_transfer_keeps_rollup_consistent(self, tenant_client, cellar, make_tank):
+        client, _ = tenant_client
+        source = make_tank('Source', capacity=1000, current_volume=600)
+        target = make_tank('Target', capacity=1000, current_volume=0)
+
+        response = client.post(reverse('cellars:transfer_wine'), {
+            'source_tank': source.id,
+            'target_tank': target.id,
+            'volume': '250',
+            'transfer_date': '2025-09-20',
+        })
+
+        assert response.status_code == 302
+        assert summary_of(cellar).total_volume == Decimal('600.00')
+        assert CellarVolumeSummary.objects.verify() == []
+
+    def test_cellar_reads_rollup(self, cellar, make_tank, django_assert_num_queries):
+        make_tank('T1', capacity=1000, current_volume=200)
+        annotated = Cellar.objects.with_volume_summary().get(pk=cellar.pk)
+
+        with django_assert_num_queries(0):
+            assert annotated.capacity == Decimal('1000.00')
+            assert annotated.available_capacity == Decimal('800.00')
+
+    def test_rebuild_command_repairs_drift(self, cellar, make_tank):
+        make_tank('T1', capacity=1000, current_volume=200)
+        # Bulk updates bypass Tank.save and leave the rollup stale
+        Tank.objects.filter(cellar=cellar).update(current_volume=Decimal('900.00'))
+        assert CellarVolumeSummary.objects.verify() != []
+
+        out = StringIO()
+        call_command('rebuild_volume_summaries', '--verify-only', stdout=out)
+        assert 'discrepancies found' in out.getvalue()
+
+        out = StringIO()
+        call_command('rebuild_volume_summaries', stdout=out)
+        assert 'match the tanks' in out.getvalue()
+        assert summary_of(cellar).total_volume == Decimal('900.00')
@@ -0,0 +1,247 @@
+"""
+Tests for the tank transfer services.
+"""
+
+import threading
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import OperationalError, connection, close_old_connections
+from django.test.utils import CaptureQueriesContext
+from cellars import services
+from cellars.models import Cellar, Tank, TankHistory, CellarVolumeSummary
+
+@pytest.fixture
+def cellar(tenant_client, organization):
+    """Create a test cellar."""
+    _, user = tenant_client
+    return Cellar.objects.create(
+        name='Test Cellar',
+        location='Test Location',
+        organization=organization,
+        created_by=user
+    )
+
+@pytest.fixture
+def make_tank(cellar):
+    """Return a factory for tanks in the test cellar."""
+    def make(name, capacity=1000, current_volume=0):
+        return Tank.objects.create(
+            cellar=cellar,
+            name=name,
+            capacity=Decimal(capacity),
+            current_volume=Decimal(current_volume),
+            organization=cellar.organization,
+            created_by=cellar.created_by
+        )
+    return make
+
+@pytest.mark.django_db
+class TestTransfer:
+    """Test cases for services.transfer()."""
+
+    def test_transfer_moves_volume(self, cellar, make_tank):
+        source = make_tank('Source', current_volume=600)
+        target = make_tank('Target')
+
+        out_entry, in_entry = services.transfer(source, target, '250.50', date(2025, 9, 20), cellar.created_by)
+
+        source.refresh_from_db()
+        target.refresh_from_db()
+        assert source.current_volume == Decimal('349.50')
+        assert target.current_volume == Decimal('250.50')
+        assert out_entry.volume == Decimal('-250.50')
+        assert out_entry.destination == target
+        assert in_entry.source == source
+        assert in_entry.organization_id == cellar.organization_id
+        assert CellarVolumeSummary.objects.verify() == []
+
+    def test_transfer_query_count(self, cellar, make_tank, django_assert_max_num_queries):
+        source = make_tank('Source', current_volume=600)
+        target = make_tank('Target')
+
+        with django_assert_max_num_queries(8):
+            services.transfer(source.pk, target.pk, 100, date(2025, 9, 20), cellar.created_by)
+
+    @pytest.mark.parametrize('volume', ['0', '-5', '601'])
+    def test_transfer_rejects_invalid_volume(self, cellar, make_tank, volume):
+        source = make_tank('Source', current_volume=600)
+        target = make_tank('Target')
+
+        with pytest.raises(ValidationError):
+            services.transfer(source, target, volume, date(2025, 9, 20), cellar.created_by)
+        assert not TankHistory.objects.exists()
+
+    def test_transfer_rejects_overfilling_target(self, cellar, make_tank):
+        source = make_tank('Source', current_volume=600)
+        target = make_tank('Target', capacity=500, current_volume=400)
+
+        with pytest.raises(ValidationError):
+            services.transfer(source, target, 200, date(2025, 9, 20), cellar.created_by)
+        target.refresh_from_db()
+        assert target.current_volume == Decimal('400.00')
+
+    def test_transfer_rejects_same_tank(self, cellar, make_tank):
+        source = make_tank('Source', current_volume=600)
+
+        with pytest.raises(ValidationError):
+            services.transfer(source, source, 100, date(2025, 9, 20), cellar.created_by)
+
+@pytest.mark.django_db
+class TestTransferMany:
+    """Test cases for services.transfer_many()."""
+
+    def test_blend_moves_volume(self, cellar, make_tank):
+        sources = [make_tank(f'Source {i}', current_volume=500) for i in range(3)]
+        targets = [make_tank(f'Target {i}') for i in range(2)]
+        legs = [
+            (sources[0], targets[0], 300),
+            (sources[1], targets[0], 200),
+            (sources[1], targets[1], 100),
+            (sources[2].pk, targets[1].pk, '450.25'),
+        ]
+
+        history = services.transfer_many(legs, date(2025, 9, 20), cellar.created_by)
+
+        volumes = dict(Tank.objects.values_list('name', 'current_volume'))
+        assert volumes == {
+            'Source 0': Decimal('200.00'),
+            'Source 1': Decimal('200.00'),
+            'Source 2': Decimal('49.75'),
+            'Target 0': Decimal('500.00'),
+            'Target 1': Decimal('550.25'),
+        }
+        assert len(history) == 8
+        assert [entry.operation_type for entry in history[:2]] == ['transfer_out', 'transfer_in']
+        assert TankHistory.objects.filter(organization=cellar.organization).count() == 8
+        assert sources[1].current_volume == Decimal('200.00')
+        assert CellarVolumeSummary.objects.verify() == []
+
+    def test_query_count_does_not_grow_with_legs(self, cellar, make_tank):
+        sources = [make_tank(f'Source {i}', current_volume=1000) for i in range(20)]
+        targets = [make_tank(f'Target {i}', capacity=5000) for i in range(5)]
+        user = cellar.created_by
+
+        with CaptureQueriesContext(connection) as small:
+            services.transfer_many([(sources[0], targets[0], 10)], date(2025, 9, 20), user)
+        legs = [(source, targets[i % 5], 10) for i, source in enumerate(sources)]
+        with CaptureQueriesContext(connection) as large:
+            services.transfer_many(legs, date(2025, 9, 20), user)
+
+        assert len(large.captured_queries) == len(small.captured_queries)
+        assert CellarVolumeSummary.objects.verify() == []
+
+    def test_limits_are_checked_on_net_change(self, cellar, make_tank):
+        first = make_tank('First', capacity=500, current_volume=500)
+        second = make_tank('Second', capacity=500, current_volume=500)
+        empty = make_tank('Empty', capacity=500)
+
+        # Second is full, but gives away as much as it receives
+        services.transfer_many(
+            [(first, second, 200), (second, empty, 200)],
+            date(2025, 9, 20),
+            cellar.created_by
+        )
+
+        second.refresh_from_db()
+        empty.refresh_from_db()
+        assert second.current_volume == Decimal('500.00')
+        assert empty.current_volume == Decimal('200.00')
+
+    def test_overdrawing_across_legs_writes_nothing(self, cellar, make_tank):
+        source = make_tank('Source', current_volume=600)
+        first = make_tank('First')
+        second = make_tank('Second')
+
+        with pytest.raises(ValidationError):
+            services.transfer_many(
+                [(source, first, 400), (source, second, 400)],
+                date(2025, 9, 20),
+                cellar.created_by
+            )
+        source.refresh_from_db()
+        assert source.current_volume == Decimal('600.00')
+        assert not TankHistory.objects.exists()
+
+    def test_outgoing_legs_cannot_exceed_the_locked_volume(self, cellar, make_tank):
+        blend = make_tank('Blend', current_volume=100)
+        first = make_tank('First', current_volume=200)
+        second = make_tank('Second')
+
+        # The net change of Blend is only -100, but it can't send out 300 L
+        with pytest.raises(ValidationError, match="cannot exceed tank Blend's current volume"):
+            services.transfer_many(
+                [(blend, second, 300), (first, blend, 200)],
+                date(2025, 9, 20),
+                cellar.created_by
+            )
+        blend.refresh_from_db()
+        assert blend.current_volume == Decimal('100.00')
+        assert not TankHistory.objects.exists()
+
+    def test_rejects_tanks_of_other_organizations(self, cellar, make_tank):
+        from organizations.models import Organization
+        other = Organization.objects.create(
+            name='Other Winery', slug='other-winery', address='Other Address', tax_number='98765432109',
+            contact_email='other@example.com', contact_phone='111111', created_by=cellar.created_by
+        )
+        other_cellar = Cellar.objects.create(
+            name='Other Cellar', location='Elsewhere', organization=other, created_by=cellar.created_by
+        )
+        source = make_tank('Source', current_volume=500)
+        foreign = Tank.objects.create(
+            cellar=other_cellar, name='Foreign', capacity=Decimal('1000'), organization=other,
+            created_by=cellar.created_by
+        )
+
+        with pytest.raises(ValidationError, match='same organization'):
+            services.transfer_many([(source, foreign, 100)], date(2025, 9, 20), cellar.created_by)
+        source.refresh_from_db()
+        assert source.current_volume == Decimal('500.00')
+        assert not TankHistory.objects.exists()
+
+    def test_rejects_empty_legs(self, cellar):
+        with pytest.raises(ValidationError):
+            services.transfer_many([], date(2025, 9, 20), cellar.created_by)
+
+@pytest.mark.skipif(
+    connection.vendor != 'postgresql',
+    reason='Needs row locks; SQLite rejects concurrent writers outright'
+)
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_transfers_do_not_lose_volume(cellar, make_tank):
+    """50 concurrent transfers must conserve the total volume."""
+    source = make_tank('Source', capacity=1000, current_volume=1000)
+    target = make_tank('Target', capacity=1000)
+    user = cellar.created_by
+    succeeded = []
+    failed = []
+    barrier = threading.Barrier(50)
+
+    def run_transfer():
+        try:
+            barrier.wait()
+            services.transfer(source.pk, target.pk, 10, date(2025, 9, 20), user)
+            succeeded.append(True)
+        except (ValidationError, OperationalError) as e:
+            failed.append(e)
+        finally:
+            close_old_connections()
+
+    threads = [threading.Thread(target=run_transfer) for _ in range(50)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    source.refresh_from_db()
+    target.refresh_from_db()
+    moved = Decimal(10 * len(succeeded))
+    assert succeeded
+    # The locks queue the transfers up instead of rejecting them
+    assert len(succeeded) == 50, failed
+    assert source.current_volume == Decimal('1000.00') - moved
+    assert target.current_volume == moved
+    assert TankHistory.objects.filter(tank=target, operation_type='transfer_in').count() == len(succeeded)
+    assert CellarVolumeSummary.objects.verify() == []
@@ -0,0 +1,183 @@
+"""
+Tests for the check_tank_volumes management command.
+"""
+
+import json
+import pytest
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from django.core.management import call_command
+from cellars import services
+from cellars.management.commands.check_tank_volumes import CORRECTION_NOTES, _apply_fixes
+from cellars.models import Cellar, Tank, TankHistory, CellarVolumeSummary
+from packaging.models import Bottle, Bottling
+from packaging.services import record_bottlings
+
+@pytest.fixture
+def cellar(tenant_client, organization):
+    """Create a test cellar."""
+    _, user = tenant_client
+    return Cellar.objects.create(
+        name='Test Cellar',
+        location='Test Location',
+        organization=organization,
+        created_by=user
+    )
+
+@pytest.fixture
+def make_tank(cellar):
+    """Return a factory for tanks whose volume is backed by an adjustment entry."""
+    def make(name, current_volume=0, recorded_volume=None, target_cellar=None):
+        tank_cellar = target_cellar or cellar
+        tank = Tank.objects.create(
+            cellar=tank_cellar,
+            name=name,
+            capacity=Decimal('1000'),
+            current_volume=Decimal(current_volume),
+            organization=tank_cellar.organization,
+            created_by=tank_cellar.created_by
+        )
+        if recorded_volume:
+            TankHistory.objects.create(
+                tank=tank,
+                organization=tank.organization,
+                operation_type='adjustment',
+                date=date(2025, 9, 1),
+                volume=Decimal(recorded_volume),
+                created_by=tank.created_by
+            )
+        return tank
+    return make
+
+def run(*args):
+    out = StringIO()
+    call_command('check_tank_volumes', *args, stdout=out)
+    return out.getvalue()
+
+@pytest.mark.django_db
+class TestCheckTankVolumes:
+    """Test cases for the check_tank_volumes command."""
+
+    def test_transfers_and_bottlings_are_accounted_for(self, cellar, make_tank):
+        source = make_tank('Source', current_volume=500, recorded_volume=500)
+        target = make_tank('Target')
+        services.transfer(source, target, 200, date(2025, 9, 2), cellar.created_by)
+        bottled = make_tank('Bottled', current_volume=425, recorded_volume=500)
+        bottle = Bottle.objects.create(
+            name='Test Bottle',
+            bottle_type='bordeaux',
+            volume=750,
+            height=300,
+            diameter=80,
+            weight=500,
+            glass_color='clear',
+            organization=cellar.organization,
+            created_by=cellar.created_by
+        )
+        # Bottled wine was already taken out of the tank
+        Bottling.objects.bulk_create([Bottling(
+            tank=bottled,
+            bottle=bottle,
+            bottling_date=date(2025, 9, 3),
+            quantity=100,
+            organization=cellar.organization,
+            created_by=cellar.created_by
+        )])
+
+        output = run('--fix')
+
+        assert 'All tank volumes match their records' in output
+        assert Tank.objects.get(pk=source.pk).current_volume == Decimal('300.00')
+
+    def test_recorded_bottlings_match_to_the_centilitre(self, cellar, make_tank):
+        tank = make_tank('Bottled', current_volume=100, recorded_volume=100)
+        bottle = Bottle.objects.create(
+            name='Half Bottle', bottle_type='bordeaux', volume=375, height=250, diameter=65, weight=350,
+            glass_color='green', stock=100, organization=cellar.organization, created_by=cellar.created_by
+        )
+        # Each run takes 1.125 L rounded to 1.13 L, 0.05 L more than unrounded
+        record_bottlings([
+            Bottling(tank=tank, bottle=bottle, bottling_date=date(2025, 9, 3), quantity=3, created_by=cellar.created_by)
+            for _ in range(10)
+        ], cellar.created_by)
+
+        assert json.loads(run('--json')) == []
+        tank.refresh_from_db()
+        assert tank.current_volume == Decimal('88.70')
+
+    def test_fix_bulk_updates_tanks_and_rollups(self, cellar, make_tank, django_assert_max_num_queries):
+        tanks = [make_tank(f'Drifted {i}', current_volume=100, recorded_volume=60) for i in range(5)]
+        make_tank('Correct', current_volume=60, recorded_volume=60)
+
+        # The organizations, one SELECT per chunk, then the organization, the
+        # tank locks, the recheck, the volume update, the rollup changes and
+        # the ledger entries
+        with django_assert_max_num_queries(14):
+            output = run('--fix', '--json', '--chunk-size', '10')
+
+        discrepancies = json.loads(output)
+        assert [d['tank_id'] for d in discrepancies] == [tank.pk for tank in tanks]
+        assert all(d['fixed'] and d['expected_volume'] == '60.00' for d in discrepancies)
+        assert set(Tank.objects.values_list('current_volume', flat=True)) == {Decimal('60.00')}
+        assert CellarVolumeSummary.objects.verify() == []
+
+    def test_unfixable_volumes_are_only_reported(self, make_tank):
+        tank = make_tank('Overdrawn', current_volume=0, recorded_volume=-50)
+
+        output = run('--fix')
+
+        assert '1 tank volume discrepancies found' in output
+        assert 'Fixed tank' not in output
+        tank.refresh_from_db()
+        assert tank.current_volume == Decimal('0.00')
+
+    def test_filters_by_cellar_and_organization(self, cellar, organization, make_tank):
+        other_cellar = Cellar.objects.create(
+            name='Other Cellar',
+            location='Elsewhere',
+            organization=organization,
+            created_by=cellar.created_by
+        )
+        make_tank('Drifted', current_volume=100)
+        other = make_tank('Other', current_volume=100, target_cellar=other_cellar)
+
+        discrepancies = json.loads(run('--json', '--cellar', str(other_cellar.pk)))
+        assert [d['tank_id'] for d in discrepancies] == [other.pk]
+        assert json.loads(run('--json', '--organization', str(organization.pk + 1))) == []
+        assert len(json.loads(run('--json', '--organization', str(organization.pk), '--chunk-size', '1'))) == 2
+
+    def test_workers_check_organizations_in_parallel(self, make_tank):
+        drifted = make_tank('Drifted', current_volume=100, recorded_volume=60)
+        make_tank('Correct', current_volume=60, recorded_volume=60)
+
+        discrepancies = json.loads(run('--json', '--workers', '2'))
+
+        assert [(d['tank_id'], d['expected_volume']) for d in discrepancies] == [(drifted.pk, '60.00')]
+
+    def test_fix_is_recorded_in_the_ledger(self, make_tank):
+        tank = make_tank('Drifted', current_volume=100, recorded_volume=60)
+
+        run('--fix')
+
+        correction = tank.history.get(notes=CORRECTION_NOTES)
+        assert (correction.operation_type, correction.volume, correction.created_by) == (
+            'adjustment', Decimal('-40.00'), None
+        )
+        # The correction isn't counted as a record, so the tank stays fixed
+        assert 'All tank volumes match their records' in run('--fix')
+        tank.refresh_from_db()
+        assert tank.current_volume == Decimal('60.00')
+
+    def test_fix_keeps_movements_committed_after_the_check(self, cellar, make_tank):
+        tank = make_tank('Drifted', current_volume=100, recorded_volume=60)
+        other = make_tank('Other')
+        [discrepancy] = json.loads(run('--json'))
+        # Wine moved out between the check and the fix
+        services.transfer(tank, other, 10, date(2025, 9, 2), cellar.created_by)
+
+        assert _apply_fixes([discrepancy]) == {tank.pk: Decimal('-40.00')}
+
+        tank.refresh_from_db()
+        assert tank.current_volume == Decimal('50.00')
+        assert CellarVolumeSummary.objects.verify() == []
@@ -0,0 +1,172 @@
+"""
+Tests for the tank history ledger and its snapshots.
+"""
+
+import importlib
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+from cellars import services
+from cellars.models import Cellar, Tank, TankHistory, TankSnapshot
+
+@pytest.fixture
+def cellar(tenant_client, organization):
+    """Create a test cellar."""
+    _, user = tenant_client
+    return Cellar.objects.create(
+        name='Test Cellar',
+        location='Test Location',
+        organization=organization,
+        created_by=user
+    )
+
+@pytest.fixture
+def make_tank(cellar):
+    """Return a factory for tanks in the test cellar."""
+    def make(name, capacity=10000):
+        return Tank.objects.create(
+            cellar=cellar,
+            name=name,
+            capacity=Decimal(capacity),
+            organization=cellar.organization,
+            created_by=cellar.created_by
+        )
+    return make
+
+@pytest.fixture
+def record(cellar):
+    """Return a helper that appends a history entry to a tank."""
+    def add(tank, volume, day, operation_type='adjustment'):
+        return TankHistory.objects.create(
+            tank=tank,
+            organization=cellar.organization,
+            operation_type=operation_type,
+            date=day,
+            volume=Decimal(volume),
+            created_by=cellar.created_by
+        )
+    return add
+
+@pytest.mark.django_db
+class TestTankLedger:
+    """Test cases for the append-only tank history ledger."""
+
+    def test_entries_are_numbered_per_tank(self, make_tank, record):
+        first = make_tank('First')
+        second = make_tank('Second')
+
+        entries = [
+            record(first, 100, date(2025, 9, 1)),
+            record(second, 50, date(2025, 9, 1)),
+            record(first, -20, date(2025, 8, 1)),
+        ]
+
+        assert [entry.sequence for entry in entries] == [1, 1, 2]
+
+    def test_entries_are_append_only(self, make_tank, record):
+        entry = record(make_tank('Tank'), 100, date(2025, 9, 1))
+
+        entry.volume = Decimal('200')
+        with pytest.raises(ValidationError):
+            entry.save()
+        with pytest.raises(ValidationError):
+            entry.delete()
+        assert TankHistory.objects.get().volume == Decimal('100.00')
+
+    def test_entries_outlive_their_creator(self, organization, make_tank, create_user):
+        tank = make_tank('Tank')
+        cellar_hand = create_user(username='cellarhand', email='cellarhand@example.com')
+        entry = TankHistory.objects.create(
+            tank=tank, organization=organization, operation_type='adjustment', date=date(2025, 9, 1),
+            volume=Decimal('100'), created_by=cellar_hand
+        )
+
+        cellar_hand.delete()
+
+        entry = TankHistory.objects.get(pk=entry.pk)
+        assert (entry.volume, entry.created_by) == (Decimal('100.00'), None)
+
+    def test_volume_as_of(self, make_tank, record):
+        tank = make_tank('Tank')
+        record(tank, 500, date(2025, 9, 1))
+        record(tank, -150, date(2025, 9, 10))
+        record(tank, '25.50', date(2025, 9, 20))
+
+        assert tank.volume_as_of(date(2025, 8, 31)) == Decimal('0')
+        assert tank.volume_as_of(date(2025, 9, 1)) == Decimal('500.00')
+        assert tank.volume_as_of(date(2025, 9, 15)) == Decimal('350.00')
+        assert tank.volume_as_of(date(2025, 12, 31)) == Decimal('375.50')
+
+    def test_snapshots_bound_the_scanned_entries(self, settings, make_tank, record, django_assert_num_queries):
+        settings.TANK_SNAPSHOT_INTERVAL = 5
+        tank = make_tank('Tank')
+        start = date(2025, 1, 1)
+        for day in range(12):
+            record(tank, 10, start + timedelta(days=day))
+
+        snapshots = list(TankSnapshot.objects.filter(tank=tank).order_by('date'))
+        assert [(s.date, s.volume, s.sequence) for s in snapshots] == [
+            (start + timedelta(days=3), Decimal('40.00'), 5),
+            (start + timedelta(days=8), Decimal('90.00'), 10),
+        ]
+        with django_assert_num_queries(2):
+            assert tank.volume_as_of(start + timedelta(days=10)) == Decimal('110.00')
+
+    def test_backdated_entry_invalidates_snapshots(self, settings, make_tank, record):
+        settings.TANK_SNAPSHOT_INTERVAL = 5
+        tank = make_tank('Tank')
+        start = date(2025, 1, 1)
+        for day in range(6):
+            record(tank, 10, start + timedelta(days=day))
+        assert TankSnapshot.objects.filter(tank=tank).exists()
+
+        record(tank, -5, start)
+
+        assert not TankSnapshot.objects.filter(tank=tank).exists()
+        assert tank.volume_as_of(start + timedelta(days=3)) == Decimal('35.00')
+
+    def test_volumes_as_of_matches_single_tank_queries(self, settings, make_tank, record, django_assert_num_queries):
+        settings.TANK_SNAPSHOT_INTERVAL = 3
+        tanks = [make_tank(f'Tank {i}') for i in range(4)]
+        start = date(2025, 1, 1)
+        for i, tank in enumerate(tanks):
+            for day in range(i * 3):
+                record(tank, 10 + i, start + timedelta(days=day))
+        as_of = start + timedelta(days=5)
+
+        with django_assert_num_queries(1):
+            volumes = TankSnapshot.objects.volumes_as_of(as_of)
+
+        assert volumes == {tank.pk: tank.volume_as_of(as_of) for tank in tanks}
+        assert volumes[tanks[0].pk] == Decimal('0')
+
+    def test_transfers_append_to_the_ledger(self, cellar, make_tank, record):
+        source = make_tank('Source')
+        target = make_tank('Target')
+        record(source, 300, date(2025, 9, 1), 'allocation')
+        source.update_volume(300)
+
+        services.transfer(source, target, 120, date(2025, 9, 2), cellar.created_by)
+
+        assert list(source.history.order_by('sequence').values_list('sequence', 'volume')) == [
+            (1, Decimal('300.00')),
+            (2, Decimal('-120.00')),
+        ]
+        assert target.history.get().sequence == 1
+        assert source.volume_as_of(date(2025, 9, 2)) == source.current_volume
+        assert target.volume_as_of(date(2025, 9, 2)) == target.current_volume
+
+    def test_migration_reconciles_tanks_without_creator(self, make_tank, record):
+        migration = importlib.import_module('cellars.migrations.0015_ledger_system_entries')
+        tank = make_tank('Ownerless')
+        record(tank, 100, date(2025, 9, 1))
+        Tank.objects.filter(pk=tank.pk).update(created_by=None, current_volume=Decimal('250'))
+
+        migration.reconcile_ownerless_tanks(apps, None)
+
+        entry = tank.history.order_by('-sequence').first()
+        assert (entry.sequence, entry.volume, entry.created_by) == (2, Decimal('150.00'), None)
+        assert tank.volume_as_of(timezone.now().date()) == Decimal('250.00')
@@ -3,6 +3,7 @@ from django.views.generic import ListView, DetailView, CreateView, UpdateView, D
 from django.urls import reverse_lazy
 from django.shortcuts import get_object_or_404, render
 from django.http import JsonResponse, HttpResponseRedirect
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db.models import F, ExpressionWrapper, DecimalField, Q, Sum, Value, FloatField
 from django.db.models.functions import Coalesce
 from core.utils.exceptions import (
@@ -14,6 +15,7 @@ from core.utils.exceptions import (
 )
 from .models import Cellar, Tank, CrushedJuiceAllocation, TankHistory
 from .forms import TankForm
+from . import services
 import logging
 from django import forms
 from django.contrib import messages
@@ -29,7 +31,9 @@ class CellarListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         try:
-            return super().get_queryset().order_by(*self.ordering)
+            return super().get_queryset().with_volume_summary().prefetch_related(
+                'tanks'
+            ).order_by(*self.ordering)
         except Exception as e:
             log_error(e, self.request)
             raise
@@ -52,7 +56,7 @@ class CellarDetailView(LoginRequiredMixin, DetailView):
         try:
             pk = self.kwargs.get(self.pk_url_kwarg)
             obj = get_object_or_404(
-                self.model.objects.prefetch_related('tanks'),
+                self.model.objects.with_volume_stats().prefetch_related('tanks'),
                 pk=pk
             )
             return obj
@@ -422,32 +426,15 @@ class TankTransferView(LoginRequiredMixin, FormView):
             volume = form.cleaned_data['volume']
             transfer_date = form.cleaned_data['transfer_date']
 
-            # Create history entries for both tanks
-            TankHistory.objects.create(
-                tank=source_tank,
-                operation_type='transfer_out',
-                date=transfer_date,
-                volume=-volume,
-                destination=target_tank,
-                created_by=self.request.user
-            )
-
-            TankHistory.objects.create(
-                tank=target_tank,
-                operation_type='transfer_in',
-                date=transfer_date,
-                volume=volume,
-                source=source_tank,
-                created_by=self.request.user
+            # Locks both tanks and applies the volumes, history and rollups atomically
+            services.transfer(
+                source_tank,
+                target_tank,
+                volume,
+                transfer_date,
+                self.request.user
             )
 
-            # Update tank volumes
-            source_tank.current_volume = source_tank.current_volume - volume
-            target_tank.current_volume = target_tank.current_volume + volume
-
-            source_tank.save()
-            target_tank.save()
-
             logger.info("Wine transfer completed", extra={
                 'user': self.request.user.username,
                 'source_tank_id': source_tank.id,
@@ -457,7 +444,7 @@ class TankTransferView(LoginRequiredMixin, FormView):
             })
 
             return super().form_valid(form)
-        except ValidationError as e:
+        except (ValidationError, DjangoValidationError) as e:
             form.add_error(None, e)
             return self.form_invalid(form)
         except Exception as e:
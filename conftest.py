@@ -9,6 +9,13 @@ from django.contrib.contenttypes.models import ContentType
 
 User = get_user_model()
 
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Start every test with empty caches, as database IDs are reused between tests."""
+    from django.core.cache import caches
+    for cache in caches.all():
+        cache.clear()
+
 @pytest.fixture
 def test_password():
     """Return a test password."""
@@ -43,3 +50,36 @@ def add_model_permissions():
         user.user_permissions.add(*permissions)
         return permissions
     return add_permissions
+
+@pytest.fixture
+def organization(db, create_user):
+    """Create an active organization."""
+    from organizations.models import Organization
+    owner = create_user(username='orgowner', email='owner@example.com')
+    return Organization.objects.create(
+        name='Test Winery',
+        slug='test-winery',
+        address='Test Address',
+        tax_number='12345678901',
+        contact_email='winery@example.com',
+        contact_phone='000000',
+        created_by=owner
+    )
+
+@pytest.fixture
+def tenant_client(db, client, create_user, test_password, organization):
+    """Create a member of the test organization, log in and select the organization."""
+    from organizations.models import OrganizationUser
+    user = create_user(username='tenantuser', email='tenant@example.com')
+    OrganizationUser.objects.create(
+        organization=organization,
+        user=user,
+        role='owner',
+        is_primary=True,
+        created_by=user
+    )
+    client.login(username=user.username, password=test_password)
+    session = client.session
+    session['organization_id'] = str(organization.id)
+    session.save()
+    return client, user
@@ -10,4 +10,8 @@ class CoreConfig(AppConfig):
         Perform initialization tasks when the app is ready.
         This is a good place to register signals or perform other setup.
         """
-        pass
+        import core.checks  # noqa: F401
+        from core.cache import connect_invalidation
+        from core.signals import connect_mirroring
+        connect_mirroring()
+        connect_invalidation()
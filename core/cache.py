@@ -0,0 +1,198 @@
+"""
+Tenant-aware data cache.
+
+Cached values live in the cache named by settings.TENANT_CACHE_ALIAS, which
+must be shared by all workers (e.g. Redis) for invalidations to reach every
+process; the LocMemCache of development settings is per process, and
+core.checks warns about it when DEBUG is off. Keys are prefixed with the organization they belong to
+and carry the current generation of every model the value was computed from.
+Saving or deleting an instance of a tenant model bumps the generation of that
+model for its organization, so every key built from it changes at once and the
+stale entries are never read again; they simply expire.
+
+Querysets updated with update() or other bulk operations that don't send
+signals must call invalidate() themselves.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_missing = object()
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+def get_cache():
+    """Return the cache that holds tenant data."""
+    return caches[getattr(settings, 'TENANT_CACHE_ALIAS', 'default')]
+
+def _organization_id(organization):
+    if organization is None:
+        from core.models import get_current_organization
+        organization = get_current_organization()
+    return getattr(organization, 'pk', organization)
+
+def generation_key(model, organization_id):
+    """Return the cache key of a model's generation counter for an organization."""
+    return f'gen:{model._meta.label_lower}:{organization_id}'
+
+def get_generations(models, organization_id):
+    """
+    Return the current generations of several models with one cache lookup.
+
+    Counters that don't exist yet, or were evicted, are started from the
+    current time, so they can't fall back to a generation used before.
+
+    Args:
+        models: Model classes
+        organization_id: ID of the organization
+
+    Returns:
+        list: A generation per model
+    """
+    cache = get_cache()
+    keys = [generation_key(model, organization_id) for model in models]
+    found = cache.get_many(keys)
+    generations = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key, 0)
+        generations.append(found[key])
+    return generations
+
+def _bump(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+
+def invalidate(model, organization):
+    """
+    Invalidate every cached value of an organization that depends on a model.
+
+    The generation is bumped right away and, inside a transaction, again when
+    it commits, so a value cached from the not yet committed data in between
+    isn't kept either.
+
+    Args:
+        model: Model class whose data changed
+        organization: Organization instance or ID
+    """
+    from core.db_routers import tenant_db
+
+    organization_id = getattr(organization, 'pk', organization)
+    key = generation_key(model, organization_id)
+    _bump(key)
+    using = tenant_db(organization_id)
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(lambda: _bump(key), using=using)
+
+def tenant_cache_key(name, *parts, organization=None, depends_on=()):
+    """
+    Build the cache key of a value of an organization.
+
+    Args:
+        name: Name of the cached value, e.g. 'vineyard_detail'
+        *parts: Further parts of the key, e.g. an object ID
+        organization: Organization instance or ID; the current request's
+            organization if omitted
+        depends_on: Model classes the value is computed from
+
+    Returns:
+        str: The cache key
+    """
+    organization_id = _organization_id(organization)
+    key = ':'.join(str(part) for part in ('tenant', organization_id, name, *parts))
+    if depends_on:
+        generations = get_generations(depends_on, organization_id)
+        key += ':' + '.'.join(str(generation) for generation in generations)
+    return key
+
+def record_lookup(name, hit):
+    """
+    Count a cache hit or miss and pass it on to settings.CACHE_METRICS_HOOK.
+
+    The hook is the dotted path of a callable taking the name of the value and
+    whether it was a hit, e.g. to send the counts to a metrics server.
+    """
+    with _stats_lock:
+        _stats[name]['hits' if hit else 'misses'] += 1
+    hook = getattr(settings, 'CACHE_METRICS_HOOK', None)
+    if hook:
+        try:
+            import_string(hook)(name, hit)
+        except Exception as e:
+            logger.warning(f"Cache metrics hook failed: {e}")
+
+def get_cache_stats():
+    """
+    Return the hits and misses counted by this process.
+
+    Returns:
+        dict: Hits, misses and hit rate keyed by the name of the value
+    """
+    with _stats_lock:
+        return {
+            name: {
+                **counts,
+                'hit_rate': counts['hits'] / (counts['hits'] + counts['misses']),
+            }
+            for name, counts in _stats.items()
+        }
+
+def reset_cache_stats():
+    """Forget the hits and misses counted so far."""
+    with _stats_lock:
+        _stats.clear()
+
+def get_or_set(name, compute, *parts, organization=None, depends_on=(), timeout=None):
+    """
+    Return a cached value of an organization, computing it on a miss.
+
+    Args:
+        name: Name of the cached value
+        compute: Callable without arguments that returns the value
+        *parts: Further parts of the key
+        organization: Organization instance or ID; the current request's
+            organization if omitted
+        depends_on: Model classes the value is computed from
+        timeout: Seconds to keep the value, TENANT_DATA_CACHE_TIMEOUT if omitted
+
+    Returns:
+        The cached or computed value
+    """
+    cache = get_cache()
+    key = tenant_cache_key(name, *parts, organization=organization, depends_on=depends_on)
+    value = cache.get(key, _missing)
+    record_lookup(name, value is not _missing)
+    if value is _missing:
+        value = compute()
+        if timeout is None:
+            timeout = getattr(settings, 'TENANT_DATA_CACHE_TIMEOUT', 300)
+        cache.set(key, value, timeout)
+    return value
+
+def _invalidate_instance(sender, instance, **kwargs):
+    invalidate(sender, instance.__dict__.get('organization_id'))
+
+def connect_invalidation():
+    """Bump the generation of every tenant model when one of its instances changes."""
+    from django.apps import apps
+    from core.models import TenantModel
+
+    for model in apps.get_models():
+        if issubclass(model, TenantModel):
+            uid = f'invalidate_cache_{model._meta.label_lower}'
+            post_save.connect(_invalidate_instance, sender=model, dispatch_uid=uid)
+            post_delete.connect(_invalidate_instance, sender=model, dispatch_uid=uid)
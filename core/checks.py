@@ -0,0 +1,57 @@
+"""
+System checks for the settings of the core app.
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# Backends whose incr() is a get followed by a set, so concurrent increments
+# can be lost
+NON_ATOMIC_CACHE_BACKENDS = {
+    'django.core.cache.backends.filebased.FileBasedCache',
+    'django.core.cache.backends.db.DatabaseCache',
+}
+
+@register(Tags.caches)
+def check_counter_caches(app_configs, **kwargs):
+    """
+    Check that the caches holding counters increment them atomically.
+
+    core.cache bumps generation counters and the rate limiter counts hits with
+    incr(); a lost increment leaves stale values in the cache or lets requests
+    through.
+    """
+    errors = []
+    for setting in ('TENANT_CACHE_ALIAS', 'RATELIMIT_CACHE'):
+        alias = getattr(settings, setting, 'default')
+        backend = settings.CACHES.get(alias, {}).get('BACKEND')
+        if backend in NON_ATOMIC_CACHE_BACKENDS:
+            errors.append(Error(
+                f"{setting} points at the '{alias}' cache, whose backend {backend} can't increment atomically.",
+                hint="Use django.core.cache.backends.redis.RedisCache, or LocMemCache for a single process.",
+                id='core.E001',
+            ))
+    return errors
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Warn when the cache of core.cache only lives in one process outside of
+    development.
+
+    Generations are bumped in the cache of the process that saved the
+    instance, so with LocMemCache the other workers keep serving stale values
+    until they expire.
+    """
+    if settings.DEBUG:
+        return []
+    alias = getattr(settings, 'TENANT_CACHE_ALIAS', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend != 'django.core.cache.backends.locmem.LocMemCache':
+        return []
+    return [Warning(
+        f"TENANT_CACHE_ALIAS points at the '{alias}' cache, whose backend {backend} isn't shared between "
+        "worker processes.",
+        hint="Use django.core.cache.backends.redis.RedisCache unless the site runs in a single process.",
+        id='core.W001',
+    )]
@@ -1,33 +1,213 @@
+"""
+Database routing for tenant data.
+
+Organizations are mapped to database aliases by settings.TENANT_DATABASES, so
+large tenants can be given a database of their own. Tenant data is routed to
+the alias of its organization: the organization of the instance being saved or
+read through, else the organization of the current request. Shared data
+(users, sessions, organizations) stays in 'default' and is mirrored into the
+other tenant databases by core.signals, so foreign keys to it hold everywhere.
+
+Reads of tenant data go to a replica of the alias
+(settings.TENANT_DATABASE_REPLICAS) unless the alias was written to within
+TENANT_REPLICA_LAG seconds, in which case they stick to the primary so a user
+always reads their own writes. Shared data is always read from 'default'.
+"""
+
+import random
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+# Apps whose tables are shared by all tenants and live in 'default'
+DEFAULT_SHARED_APPS = ['admin', 'auth', 'contenttypes', 'sessions', 'messages', 'organizations']
+
+# Time of the last write per alias, for the current request or job
+_last_writes = ContextVar('db_last_writes', default=None)
+
+class TenantDatabaseRegistry:
+    """
+    Maps organizations to database aliases and aliases to their replicas.
+
+    Args:
+        databases: Alias keyed by organization ID or slug
+        replicas: List of replica aliases keyed by primary alias
+        default: Alias of organizations without an entry
+    """
+
+    def __init__(self, databases=None, replicas=None, default='default'):
+        self.databases = {str(key): alias for key, alias in (databases or {}).items()}
+        self.replicas = {alias: list(aliases) for alias, aliases in (replicas or {}).items()}
+        self.default = default
+        self.primary_of = {
+            replica: alias for alias, aliases in self.replicas.items() for replica in aliases
+        }
+        self.has_slugs = any(not key.isdigit() for key in self.databases)
+        self._slugs = {}
+
+    def alias_for(self, organization):
+        """
+        Return the database alias of an organization.
+
+        Args:
+            organization: Organization instance, ID or None
+
+        Returns:
+            str: The database alias
+        """
+        if organization is None:
+            return self.default
+        organization_id = getattr(organization, 'pk', organization)
+        alias = self.databases.get(str(organization_id))
+        if alias is None and self.has_slugs:
+            slug = getattr(organization, 'slug', None) or self._slug_of(organization_id)
+            alias = self.databases.get(slug)
+        return alias or self.default
+
+    def _slug_of(self, organization_id):
+        """
+        Look up the slug of an organization routed by ID, for entries keyed by
+        slug. Found slugs are kept, so each organization is looked up once.
+        """
+        if organization_id is None:
+            return None
+        if organization_id not in self._slugs:
+            from organizations.models import Organization
+            slug = Organization.objects.using(self.default).filter(pk=organization_id).values_list(
+                'slug', flat=True
+            ).first()
+            if slug is None:
+                # Not created yet; look again next time
+                return None
+            self._slugs[organization_id] = slug
+        return self._slugs[organization_id]
+
+    def primaries(self):
+        """Return the aliases holding tenant data."""
+        return {self.default, *self.databases.values()}
+
+    def is_replica(self, alias):
+        return alias in self.primary_of
+
+_registry = None
+
+def get_registry():
+    """Return the registry built from the current settings."""
+    global _registry
+    if _registry is None:
+        _registry = TenantDatabaseRegistry(
+            getattr(settings, 'TENANT_DATABASES', {}),
+            getattr(settings, 'TENANT_DATABASE_REPLICAS', {}),
+        )
+    return _registry
+
+@receiver(setting_changed)
+def _reset_registry(setting, **kwargs):
+    global _registry
+    if setting in ('TENANT_DATABASES', 'TENANT_DATABASE_REPLICAS'):
+        _registry = None
+
+def tenant_db(organization=None):
+    """
+    Return the database alias for tenant writes.
+
+    Use it for transactions around tenant data, e.g.
+    transaction.atomic(using=tenant_db(tank.organization_id)), so the
+    transaction is opened on the database the data lives in.
+
+    Args:
+        organization: Organization instance or ID; the current request's
+            organization if omitted
+
+    Returns:
+        str: The database alias
+    """
+    if organization is None:
+        from core.models import get_current_organization
+        organization = get_current_organization()
+    return get_registry().alias_for(organization)
+
+def record_write(alias):
+    """Remember that the alias was just written to."""
+    writes = dict(_last_writes.get() or {})
+    writes[alias] = time.time()
+    _last_writes.set(writes)
+
+def get_recent_writes():
+    """Return the write times per alias that are still within the replication lag."""
+    horizon = time.time() - getattr(settings, 'TENANT_REPLICA_LAG', 5)
+    return {alias: at for alias, at in (_last_writes.get() or {}).items() if at > horizon}
+
+def set_recent_writes(writes):
+    """Restore write times, e.g. from the session of a new request."""
+    _last_writes.set(dict(writes or {}))
+
 class TenantRouter:
     """
     Database router that handles tenant-specific database operations.
     """
+    def _is_shared(self, model):
+        return model._meta.app_label in getattr(settings, 'TENANT_SHARED_APPS', DEFAULT_SHARED_APPS)
+
+    def _primary_for(self, model, hints):
+        if self._is_shared(model):
+            return get_registry().default
+        instance = hints.get('instance')
+        if instance is not None:
+            organization_id = instance.__dict__.get('organization_id')
+            if organization_id is not None:
+                return get_registry().alias_for(organization_id)
+            # Instances without an organization of their own (e.g. snapshots)
+            # live with the row they were loaded from or attached to
+            if instance._state.db is not None:
+                return get_registry().primary_of.get(instance._state.db, instance._state.db)
+        return tenant_db()
+
     def db_for_read(self, model, **hints):
         """
-        Point all read operations to the appropriate database.
-        For now, we're using a single database, but this can be extended
-        to support multiple databases per tenant.
+        Read from a replica of the tenant's database, or from the primary if it
+        was written to within the replication lag.
+
+        Shared data is always read from 'default': sessions are loaded before
+        ReplicaStickinessMiddleware can restore the recent writes, so a lagging
+        replica could log a user out or switch their organization right after
+        they logged in or switched.
         """
-        return 'default'
+        alias = self._primary_for(model, hints)
+        if self._is_shared(model):
+            return alias
+        replicas = get_registry().replicas.get(alias)
+        if not replicas or alias in get_recent_writes():
+            return alias
+        return random.choice(replicas)
 
     def db_for_write(self, model, **hints):
         """
-        Point all write operations to the appropriate database.
-        For now, we're using a single database, but this can be extended
-        to support multiple databases per tenant.
+        Write to the tenant's primary database.
         """
-        return 'default'
+        alias = self._primary_for(model, hints)
+        record_write(alias)
+        return alias
 
     def allow_relation(self, obj1, obj2, **hints):
         """
         Allow relations only if both objects are in the same organization.
         """
-        if hasattr(obj1, 'organization') and hasattr(obj2, 'organization'):
-            return obj1.organization_id == obj2.organization_id
-        return True
+        # Compare the raw foreign key values; accessing obj.organization would
+        # fetch the organization row for every relation that is assigned. They
+        # are read from __dict__ as an instance being initialised may not have
+        # them yet. An instance without an organization takes it from its parent
+        # on save.
+        organization_ids = (obj1.__dict__.get('organization_id'), obj2.__dict__.get('organization_id'))
+        if None in organization_ids:
+            return True
+        return organization_ids[0] == organization_ids[1]
 
     def allow_migrate(self, db, app_label, model_name=None, **hints):
         """
-        Make sure all migrations are run on the appropriate database.
+        Migrate every primary database with the full schema, so shared rows can
+        be mirrored into tenant databases; replicas get theirs by replication.
         """
-        return True
+        return not get_registry().is_replica(db)
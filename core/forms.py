@@ -1,14 +1,22 @@
 from django import forms
+from core.models import get_current_organization
 
 class TenantFormMixin:
     """
     Mixin to handle organization-based filtering in forms.
+
+    Choice querysets of form fields are built when the form class is created,
+    outside of any request, so the TenantManager can't scope them. They are
+    filtered here to the organization passed to the form, or else the
+    organization of the current request.
     """
     def __init__(self, *args, **kwargs):
-        self.organization = kwargs.pop('organization', None)
+        self.organization = kwargs.pop('organization', None) or get_current_organization()
         super().__init__(*args, **kwargs)
         
         # Filter foreign key fields by organization
+        if self.organization is None:
+            return
         for field_name, field in self.fields.items():
             if isinstance(field, forms.ModelChoiceField):
                 model = field.queryset.model
@@ -0,0 +1,88 @@
+import statistics
+import time
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from django.urls import Resolver404, resolve
+from django.utils.module_loading import import_string
+from core.middleware.rate_limiting import DEFAULT_RATELIMIT_BACKEND, RateLimitMiddleware
+
+class Command(BaseCommand):
+    help = 'Measure the per-request overhead of RateLimitMiddleware at a steady request rate'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/harvests/', help='Request path (default: /harvests/)')
+        parser.add_argument(
+            '--backend',
+            help='Dotted path of the rate limit backend (default: RATELIMIT_BACKEND)',
+        )
+        parser.add_argument(
+            '--rps',
+            type=int,
+            default=1000,
+            help='Requests per second to pace the requests at (default: 1000)',
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=5000,
+            help='Number of requests to measure (default: 5000)',
+        )
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=100,
+            help='Number of client IP addresses the requests are spread over (default: 100)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            match = resolve(options['path'])
+        except Resolver404:
+            raise CommandError(f"No view for {options['path']}")
+        backend = options['backend'] or getattr(settings, 'RATELIMIT_BACKEND', DEFAULT_RATELIMIT_BACKEND)
+        try:
+            import_string(backend)
+        except ImportError as e:
+            raise CommandError(str(e))
+
+        factory = RequestFactory()
+        requests = []
+        for i in range(options['iterations']):
+            client = i % options['clients']
+            request = factory.get(options['path'], REMOTE_ADDR=f'10.0.{client // 256}.{client % 256}')
+            request.user = AnonymousUser()
+            request.resolver_match = match
+            requests.append(request)
+
+        # Limits high enough that every request is counted and none is refused
+        with override_settings(
+            RATELIMIT_ENABLE=True,
+            RATELIMIT_BACKEND=backend,
+            RATELIMIT_VIEW_LIMIT=f"{options['iterations'] + 1}/h",
+        ):
+            middleware = RateLimitMiddleware(lambda request: HttpResponse())
+            interval = 1 / options['rps']
+            timings = []
+            start = time.perf_counter()
+            for i, request in enumerate(requests):
+                # Pace the requests, so cache expiry and window changes happen as in production
+                delay = start + i * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                began = time.perf_counter()
+                if middleware.process_view(request, match.func, match.args, match.kwargs) is not None:
+                    raise CommandError('A request was rate limited')
+                timings.append(time.perf_counter() - began)
+            elapsed = time.perf_counter() - start
+
+        timings.sort()
+        self.stdout.write(
+            f"{type(middleware.backend).__name__}: {len(timings) / elapsed:.0f} requests/s, "
+            f"mean {statistics.mean(timings) * 1e6:.1f} µs, "
+            f"p50 {timings[len(timings) // 2] * 1e6:.1f} µs, "
+            f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.1f} µs per request"
+        )
@@ -0,0 +1,64 @@
+import time
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+from core.middleware.tenant_middleware import TenantMiddleware, invalidate_tenant_cache
+
+class Command(BaseCommand):
+    help = 'Measure the per-request overhead of TenantMiddleware with a cold and a warm tenant cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help='Username of an organization member')
+        parser.add_argument('--organization', type=int, required=True, help='ID of the organization')
+        parser.add_argument('--path', default='/harvests/', help='Request path (default: /harvests/)')
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=1000,
+            help='Number of requests per measurement (default: 1000)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = get_user_model().objects.get(username=options['user'])
+        except get_user_model().DoesNotExist as e:
+            raise CommandError(str(e))
+
+        factory = RequestFactory()
+        organization_id = options['organization']
+        match = resolve(options['path'])
+        middleware = TenantMiddleware(
+            lambda request: middleware.process_view(request, match.func, match.args, match.kwargs)
+            or HttpResponse()
+        )
+
+        def run(cold):
+            request = factory.get(options['path'])
+            request.user = user
+            request.session = SessionStore()
+            request.session['organization_id'] = str(organization_id)
+            request.resolver_match = match
+            if cold:
+                invalidate_tenant_cache([user.pk], organization_id)
+            middleware(request)
+            return request
+
+        if not hasattr(run(cold=True), 'organization'):
+            raise CommandError('The user is not a member of the organization')
+
+        for label, cold in [('cold cache', True), ('warm cache', False)]:
+            run(cold)
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                for _ in range(options['iterations']):
+                    run(cold)
+                elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f"{label}: {elapsed / options['iterations'] * 1e6:.1f} µs/request, "
+                f"{len(queries) / options['iterations']:.2f} queries/request"
+            )
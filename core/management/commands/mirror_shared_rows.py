@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from core.db_routers import get_registry
+from core.signals import mirror_shared_rows
+
+class Command(BaseCommand):
+    help = (
+        'Copy users, organizations and memberships from the default database into tenant databases. '
+        'Run it after adding a database to TENANT_DATABASES and migrating it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            action='append',
+            dest='databases',
+            help='Tenant database alias to seed (may be repeated); all tenant databases if omitted',
+        )
+
+    def handle(self, *args, **options):
+        registry = get_registry()
+        tenant_databases = registry.primaries() - {registry.default}
+        aliases = options['databases'] or sorted(tenant_databases)
+        for alias in aliases:
+            if alias not in connections or alias not in tenant_databases:
+                raise CommandError(f"{alias} is not a tenant database in TENANT_DATABASES")
+
+        for alias in aliases:
+            copied = mirror_shared_rows(alias)
+            summary = ', '.join(f'{count} {label}' for label, count in copied.items())
+            self.stdout.write(self.style.SUCCESS(f'Seeded {alias}: {summary}'))
+        if not aliases:
+            self.stdout.write('No tenant databases besides the default one')
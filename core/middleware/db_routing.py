@@ -0,0 +1,38 @@
+"""
+Read-your-writes middleware for database replicas.
+
+core.db_routers.TenantRouter sends reads to the primary database for
+TENANT_REPLICA_LAG seconds after a write. This middleware carries those write
+times over in the session, so the page a user is redirected to after a POST is
+also read from the primary instead of a replica that may not have the change
+yet.
+"""
+
+from core.db_routers import get_recent_writes, get_registry, set_recent_writes
+
+SESSION_KEY = '_db_writes'
+
+class ReplicaStickinessMiddleware:
+    """
+    Middleware that keeps a user's reads on the primary database after their writes.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Without replicas every read goes to the primary anyway
+        if not get_registry().replicas:
+            return self.get_response(request)
+
+        set_recent_writes(request.session.get(SESSION_KEY))
+        try:
+            response = self.get_response(request)
+            writes = get_recent_writes()
+            if writes != request.session.get(SESSION_KEY, {}):
+                if writes:
+                    request.session[SESSION_KEY] = writes
+                else:
+                    request.session.pop(SESSION_KEY, None)
+            return response
+        finally:
+            set_recent_writes(None)
@@ -3,152 +3,305 @@ Rate limiting middleware for request throttling.
 
 This module provides middleware for implementing rate limiting on views and
 login attempts to prevent abuse.
+
+Hits are counted in the cache named by RATELIMIT_CACHE with its atomic incr(),
+so concurrent requests can't lose updates. With a shared cache such as Redis
+the limits hold across all workers; the default LocMemCache is a local
+stand-in that limits each process separately. Buckets are keyed by the URL
+pattern a request resolved to instead of its raw path, so the number of keys is
+bounded by the number of routes rather than by the IDs in URLs.
 """
 
+import math
 import time
 import logging
+from dataclasses import dataclass
 from django.conf import settings
-from django.core.cache import cache
+from django.core.cache import caches
 from django.http import HttpResponse
 from django.contrib import messages
 from django.utils.deprecation import MiddlewareMixin
-from typing import Optional, Tuple, Any
+from django.utils.module_loading import import_string
+from typing import Optional, Tuple
 
 logger = logging.getLogger('vinco')
 
+DEFAULT_RATELIMIT_BACKEND = 'core.middleware.rate_limiting.SlidingWindowBackend'
+
 class HttpResponseTooManyRequests(HttpResponse):
     """Response returned when rate limit is exceeded."""
     status_code = 429
 
+@dataclass(frozen=True)
+class RateLimitResult:
+    """Outcome of counting a hit against a rate limit."""
+    allowed: bool
+    count: float
+    limit: int
+    retry_after: float = 0
+
+class RateLimitBackend:
+    """
+    Counts hits in rate limit buckets.
+
+    Subclasses implement hit(). Counters are only changed with the cache's
+    atomic add() and incr(), never with a get followed by a set.
+
+    Args:
+        cache_alias: Name of the cache that holds the counters
+    """
+
+    def __init__(self, cache_alias: str = 'default'):
+        self.cache = caches[cache_alias]
+
+    def hit(self, key: str, number: int, seconds: int, now: Optional[float] = None) -> RateLimitResult:
+        """
+        Count a hit in a bucket.
+
+        Args:
+            key: Cache key of the bucket
+            number: Number of hits allowed per period
+            seconds: Length of the period in seconds
+            now: Time of the hit, the current time if omitted
+
+        Returns:
+            RateLimitResult: Whether the hit is within the limit
+        """
+        raise NotImplementedError
+
+    def incr(self, key: str, timeout: int) -> int:
+        """
+        Atomically increment a counter, creating it if it doesn't exist.
+
+        Args:
+            key: Cache key of the counter
+            timeout: Expiry of a newly created counter in seconds
+
+        Returns:
+            int: The new value of the counter
+        """
+        try:
+            return self.cache.incr(key)
+        except ValueError:
+            # add() only succeeds for one of several concurrent requests; the
+            # others increment the counter it created
+            if self.cache.add(key, 1, timeout):
+                return 1
+            return self.cache.incr(key)
+
+class FixedWindowBackend(RateLimitBackend):
+    """
+    Allows a number of hits per calendar window, e.g. 100 between 10:00 and 11:00.
+
+    One cache operation per hit, but a client can make up to twice the limit
+    around the boundary of two windows.
+    """
+
+    def hit(self, key, number, seconds, now=None):
+        now = time.time() if now is None else now
+        window = int(now // seconds)
+        count = self.incr(f'{key}:{window}', seconds)
+        if count <= number:
+            return RateLimitResult(True, count, number)
+        return RateLimitResult(False, count, number, (window + 1) * seconds - now)
+
+class SlidingWindowBackend(RateLimitBackend):
+    """
+    Allows a number of hits in any period of the given length.
+
+    The hits of the previous window are weighted by how much of it still falls
+    into the period, which approximates a log of every hit with two counters
+    per bucket. Costs two cache operations per allowed hit and three per
+    refused one.
+    """
+
+    def hit(self, key, number, seconds, now=None):
+        now = time.time() if now is None else now
+        window, offset = divmod(now, seconds)
+        window = int(window)
+        current_key = f'{key}:{window}'
+        # Counters are kept for two windows, as the next window weighs them in
+        count = self.incr(current_key, 2 * seconds)
+        previous = self.cache.get(f'{key}:{window - 1}', 0)
+        estimate = previous * (1 - offset / seconds) + count
+        if estimate <= number:
+            return RateLimitResult(True, estimate, number)
+
+        # Refused hits aren't counted, or a client retrying too early would
+        # keep itself locked out through the next window as well
+        self.cache.decr(current_key)
+        count -= 1
+        if count < number:
+            # Wait until enough of the previous window has slid out
+            retry_after = seconds * (1 - (number - count - 1) / previous) - offset
+        else:
+            # Wait for the next window and for enough of this one to slide out
+            retry_after = seconds - offset + seconds * (1 - (number - 1) / max(count, 1))
+        return RateLimitResult(False, estimate, number, retry_after)
+
+def get_backend() -> RateLimitBackend:
+    """Return the rate limit backend configured in the settings."""
+    backend_class = import_string(getattr(settings, 'RATELIMIT_BACKEND', DEFAULT_RATELIMIT_BACKEND))
+    return backend_class(getattr(settings, 'RATELIMIT_CACHE', 'default'))
+
 class RateLimitMiddleware(MiddlewareMixin):
     """
     Middleware to implement rate limiting for views and login attempts.
-    
-    This middleware checks rate limits before processing requests and can
-    block requests that exceed configured limits.
+
+    This middleware checks rate limits before the view is called and can
+    block requests that exceed configured limits. Requests are limited:
+
+    - per view and user (per IP address for anonymous users), by RATELIMIT_VIEW_LIMIT,
+      or by the entry of the view's route in RATELIMIT_ROUTE_LIMITS; routes
+      mapped to None, such as polled or paginated endpoints, are exempt
+    - per organization across all views, by RATELIMIT_TENANT_LIMIT
+    - per IP address for login attempts, by RATELIMIT_LOGIN_LIMIT
+
+    It must come after TenantMiddleware to see the organization of a request.
     """
-    
-    def process_request(self, request) -> Optional[HttpResponse]:
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.backend = get_backend()
+
+    def process_view(self, request, view_func, view_args, view_kwargs) -> Optional[HttpResponse]:
         """
-        Check rate limits before processing the request.
-        
+        Check rate limits before calling the view.
+
         Args:
             request: The HTTP request
-            
+            view_func: The view about to be called
+            view_args: Positional arguments of the view
+            view_kwargs: Keyword arguments of the view
+
         Returns:
             HttpResponse if rate limit exceeded, None otherwise
         """
         if not getattr(settings, 'RATELIMIT_ENABLE', False):
             return None
-            
+
         ip = self.get_client_ip(request)
-        path = request.path
-        
+        route = self.get_route(request)
+
         # Check login rate limit
-        if path == '/login/':
-            if not self.check_login_rate_limit(ip):
+        if route == 'login' and request.method == 'POST':
+            result = self.check_limit(f'ratelimit:login:{ip}', getattr(settings, 'RATELIMIT_LOGIN_LIMIT', '5/h'))
+            if not result.allowed:
                 logger.warning(f"Login rate limit exceeded for IP: {ip}")
-                messages.error(request, "Too many login attempts. Please try again later.")
-                return HttpResponseTooManyRequests("Too many login attempts")
-                
+                return self.too_many_requests(request, result, "Too many login attempts")
+
         # Check view rate limit
-        if not self.check_view_rate_limit(ip, path):
-            logger.warning(f"View rate limit exceeded for IP: {ip}, path: {path}")
-            messages.error(request, "Too many requests. Please try again later.")
-            return HttpResponseTooManyRequests("Too many requests")
-            
+        view_limit = self.get_view_limit(route)
+        if view_limit:
+            user = getattr(request, 'user', None)
+            client = f'user:{user.pk}' if user is not None and user.is_authenticated else f'ip:{ip}'
+            result = self.check_limit(f'ratelimit:view:{route}:{client}', view_limit)
+            if not result.allowed:
+                logger.warning(f"View rate limit exceeded for {client}, route: {route}")
+                return self.too_many_requests(request, result, "Too many requests")
+
+        # Check tenant rate limit
+        organization = getattr(request, 'organization', None)
+        tenant_limit = getattr(settings, 'RATELIMIT_TENANT_LIMIT', None)
+        if organization is not None and tenant_limit:
+            result = self.check_limit(f'ratelimit:tenant:{organization.pk}', tenant_limit)
+            if not result.allowed:
+                logger.warning(f"Tenant rate limit exceeded for organization: {organization.pk}")
+                return self.too_many_requests(request, result, "Too many requests")
+
         return None
-        
+
+    def too_many_requests(self, request, result: RateLimitResult, message: str) -> HttpResponse:
+        """Return the response for a request over a limit."""
+        messages.error(request, f"{message}. Please try again later.")
+        response = HttpResponseTooManyRequests(message)
+        response['Retry-After'] = str(max(1, math.ceil(result.retry_after)))
+        return response
+
     def get_client_ip(self, request) -> str:
         """
         Get the client's IP address from the request.
-        
+
         Args:
             request: The HTTP request
-            
+
         Returns:
             Client IP address
         """
         x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
         if x_forwarded_for:
-            return x_forwarded_for.split(',')[0]
+            return x_forwarded_for.split(',')[0].strip()
         return request.META.get('REMOTE_ADDR')
-        
-    def check_login_rate_limit(self, ip: str) -> bool:
+
+    def get_route(self, request) -> str:
         """
-        Check if login attempts are within rate limit.
-        
+        Get the name of the URL pattern the request resolved to.
+
         Args:
-            ip: Client IP address
-            
+            request: The HTTP request
+
         Returns:
-            True if within limit, False if exceeded
+            The namespaced URL name, or the route of unnamed patterns
         """
-        limit = getattr(settings, 'RATELIMIT_LOGIN_LIMIT', '5/h')
-        return self.check_limit(f'login_rate_{ip}', limit)
-        
-    def check_view_rate_limit(self, ip: str, path: str) -> bool:
+        match = request.resolver_match
+        if match is None:
+            return 'unresolved'
+        return match.view_name if match.url_name else match.route
+
+    def get_view_limit(self, route: str) -> Optional[str]:
         """
-        Check if view requests are within rate limit.
-        
+        Get the per-view limit of a route.
+
         Args:
-            ip: Client IP address
-            path: Request path
-            
+            route: Name of the URL pattern, as returned by get_route()
+
         Returns:
-            True if within limit, False if exceeded
+            The rate limit string, or None if the route is exempt
         """
-        limit = getattr(settings, 'RATELIMIT_VIEW_LIMIT', '100/h')
-        return self.check_limit(f'view_rate_{ip}_{path}', limit)
-        
+        route_limits = getattr(settings, 'RATELIMIT_ROUTE_LIMITS', {})
+        if route in route_limits:
+            return route_limits[route]
+        return getattr(settings, 'RATELIMIT_VIEW_LIMIT', '100/h')
+
     def parse_limit(self, limit_str: str) -> Tuple[int, int]:
         """
         Parse rate limit string in format 'number/period'.
-        
+
         Args:
             limit_str: String in format 'number/period' where period is in s, m, or h
-            
+
         Returns:
             Tuple of (number, period_in_seconds)
         """
         number, period = limit_str.split('/')
         number = int(number)
-        
+
         if period.endswith('s'):
-            seconds = int(period[:-1])
+            seconds = int(period[:-1] or 1)
         elif period.endswith('m'):
-            seconds = int(period[:-1]) * 60
+            seconds = int(period[:-1] or 1) * 60
         elif period.endswith('h'):
-            seconds = int(period[:-1]) * 3600
+            seconds = int(period[:-1] or 1) * 3600
         else:
             seconds = int(period)
-            
+
         return number, seconds
-        
-    def check_limit(self, key: str, limit: str) -> bool:
+
+    def check_limit(self, key: str, limit: str) -> RateLimitResult:
         """
-        Check if the number of requests is within the rate limit.
-        
+        Count a request against a rate limit.
+
         Args:
-            key: Cache key for tracking requests
+            key: Cache key of the bucket
             limit: Rate limit string
-            
+
         Returns:
-            True if within limit, False if exceeded
+            RateLimitResult: Whether the request is within the limit
         """
         try:
             number, seconds = self.parse_limit(limit)
         except (ValueError, TypeError):
             logger.error(f"Invalid rate limit format: {limit}")
-            return True
-            
-        now = time.time()
-        timestamps = cache.get(key, [])
-        timestamps = [ts for ts in timestamps if ts > now - seconds]
-        
-        if len(timestamps) >= number:
-            return False
-            
-        timestamps.append(now)
-        cache.set(key, timestamps, timeout=seconds)
-        return True
+            return RateLimitResult(True, 0, 0)
+
+        return self.backend.hit(key, number, seconds)
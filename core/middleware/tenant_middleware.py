@@ -1,100 +1,254 @@
+"""
+Tenant resolution middleware.
+
+The organization of a request is found by the resolvers listed in
+settings.TENANT_RESOLVERS, which read it from the session, an X-Organization
+header or the subdomain. It is only resolved once a view that needs it is about
+to run, so static files, excluded paths and views marked with tenant_exempt
+never touch the database or cache. A resolution costs one indexed query when the
+cache is cold and none when it is warm. The resolved organization also scopes
+the TenantManager of every tenant model until the response is returned.
+"""
+
+import re
+from functools import wraps
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
 from django.shortcuts import redirect
-from django.urls import reverse, resolve, Resolver404
-from django.contrib.auth.models import AnonymousUser
+from django.utils.module_loading import import_string
+from core.models import reset_current_organization, set_current_organization
 from organizations.models import Organization
 import logging
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_TENANT_RESOLVERS = [
+    'core.middleware.tenant_middleware.HeaderTenantResolver',
+    'core.middleware.tenant_middleware.SessionTenantResolver',
+]
+
+# Paths that never need an organization, matched with one precompiled regex
+EXCLUDED_PREFIXES = (
+    '/static/', '/media/', '/admin/', '/login/', '/logout/', '/password_change/',
+)
+EXCLUDED_PATHS = ('/favicon.ico',)
+EXCLUDED_PATH_RE = re.compile(
+    '|'.join(
+        [re.escape(prefix) for prefix in EXCLUDED_PREFIXES]
+        + [re.escape(path) + '$' for path in EXCLUDED_PATHS]
+    )
+)
+
+def tenant_exempt(view_func):
+    """Mark a view as not needing an organization, so none is resolved for it."""
+    @wraps(view_func)
+    def wrapper(*args, **kwargs):
+        return view_func(*args, **kwargs)
+    wrapper.tenant_exempt = True
+    return wrapper
+
+def _cache_timeout():
+    return getattr(settings, 'TENANT_CACHE_TIMEOUT', 60)
+
+def tenant_cache_key(user_id, organization_id):
+    """Return the cache key of a user's access to an organization."""
+    return f'tenant:{user_id}:{organization_id}'
+
+def get_organization_for_user(user, organization_id):
+    """
+    Return the active organization if the user is a member of it.
+
+    Successful lookups are cached for TENANT_CACHE_TIMEOUT seconds, so most
+    requests resolve their organization without a query. The cache is
+    invalidated when the membership or organization changes.
+
+    Args:
+        user: The authenticated user
+        organization_id: ID of the selected organization
+
+    Returns:
+        Organization: The organization, or None if it doesn't exist, is
+            inactive or the user isn't a member
+    """
+    try:
+        organization_id = int(organization_id)
+    except (TypeError, ValueError):
+        return None
+    key = tenant_cache_key(user.pk, organization_id)
+    organization = cache.get(key)
+    if organization is not None:
+        return organization
+
+    organization = Organization.objects.filter(
+        id=organization_id,
+        organizationuser__user=user,
+        is_active=True
+    ).first()
+    if organization is not None:
+        cache.set(key, organization, _cache_timeout())
+    return organization
+
+def invalidate_tenant_cache(user_ids, organization_id):
+    """
+    Forget cached organization access of the given users.
+
+    Args:
+        user_ids: IDs of the users whose access changed
+        organization_id: ID of the organization
+    """
+    cache.delete_many([tenant_cache_key(user_id, organization_id) for user_id in user_ids])
+
+class TenantResolver:
+    """
+    Finds the organization a request is made for.
+
+    Subclasses implement get_identifier(); a resolver that returns None lets the
+    next configured resolver try.
+    """
+
+    def get_identifier(self, request):
+        """Return the organization identifier carried by the request, or None."""
+        raise NotImplementedError
+
+    def get_organization(self, request, identifier):
+        """Return the organization for the identifier if the user is a member of it."""
+        return get_organization_for_user(request.user, identifier)
+
+    def reject(self, request, identifier):
+        """
+        Handle an identifier the user has no access to.
+
+        Returns:
+            HttpResponse: Response to return instead of the view, or None to
+                send the user to the organization selection
+        """
+        logger.warning(f"Organization {identifier} not found or user has no access")
+        return None
+
+class SessionTenantResolver(TenantResolver):
+    """Resolves the organization selected on the organization selection page."""
+
+    def get_identifier(self, request):
+        return request.session.get('organization_id')
+
+    def reject(self, request, identifier):
+        super().reject(request, identifier)
+        del request.session['organization_id']
+        return None
+
+class HeaderTenantResolver(TenantResolver):
+    """Resolves the organization ID sent by API clients in an X-Organization header."""
+
+    def get_identifier(self, request):
+        return request.headers.get('X-Organization') or None
+
+    def reject(self, request, identifier):
+        super().reject(request, identifier)
+        return JsonResponse({'error': 'Organization not found'}, status=403)
+
+class SubdomainTenantResolver(TenantResolver):
+    """
+    Resolves the organization slug from the subdomain of TENANT_BASE_DOMAIN,
+    e.g. acme.vinco.example for the organization with slug 'acme'.
+    """
+
+    def get_identifier(self, request):
+        base_domain = getattr(settings, 'TENANT_BASE_DOMAIN', None)
+        if not base_domain:
+            return None
+        host = request.get_host().split(':')[0].lower()
+        suffix = f'.{base_domain.lower()}'
+        if not host.endswith(suffix):
+            return None
+        slug = host[:-len(suffix)]
+        return slug if slug and '.' not in slug else None
+
+    def get_organization(self, request, identifier):
+        # The slug is mapped to an ID, so warm lookups share the per-user cache
+        # and its invalidation. A renamed organization no longer matches its old
+        # slug and is looked up again.
+        slug_key = f'tenant:slug:{identifier}'
+        organization_id = cache.get(slug_key)
+        if organization_id is not None:
+            organization = get_organization_for_user(request.user, organization_id)
+            if organization is not None and organization.slug == identifier:
+                return organization
+
+        organization = Organization.objects.filter(
+            slug=identifier,
+            organizationuser__user=request.user,
+            is_active=True
+        ).first()
+        if organization is not None:
+            cache.set(slug_key, organization.pk, _cache_timeout())
+            cache.set(tenant_cache_key(request.user.pk, organization.pk), organization, _cache_timeout())
+        return organization
+
+    def reject(self, request, identifier):
+        super().reject(request, identifier)
+        return JsonResponse({'error': 'Organization not found'}, status=403)
+
 class TenantMiddleware:
     """
     Middleware to ensure users have selected an organization before accessing protected views.
     """
     def __init__(self, get_response):
         self.get_response = get_response
+        self.resolvers = [
+            import_string(path)()
+            for path in getattr(settings, 'TENANT_RESOLVERS', DEFAULT_TENANT_RESOLVERS)
+        ]
 
     def __call__(self, request):
         try:
-            # Skip middleware for anonymous users
-            if isinstance(request.user, AnonymousUser):
-                return self.get_response(request)
-
-            # Skip middleware for static and media files
-            if request.path.startswith(('/static/', '/media/')):
-                return self.get_response(request)
-
-            # Skip middleware for admin URLs
-            if request.path.startswith('/admin/'):
-                return self.get_response(request)
-
-            # Skip middleware for auth URLs
-            if request.path.startswith(('/login/', '/logout/', '/password_change/')):
-                return self.get_response(request)
-
-            # Skip middleware for favicon and other browser requests
-            if request.path in ['/favicon.ico']:
-                return self.get_response(request)
-
-            # Check if this is the organization selection page
-            try:
-                current_url = resolve(request.path_info)
-                if current_url.namespace == 'organizations' and current_url.url_name == 'select':
-                    return self.get_response(request)
-            except Resolver404:
-                # If URL doesn't resolve, let Django handle it
-                return self.get_response(request)
-
-            # Check if user is authenticated
-            if not request.user.is_authenticated:
-                return self.get_response(request)
-
-            # Get organization from session
-            org_id = request.session.get('organization_id')
-            logger.info(f"Organization ID from session: {org_id}")
-
-            if org_id:
-                try:
-                    # Verify organization exists and user has access
-                    organization = Organization.objects.get(
-                        id=org_id,
-                        organizationuser__user=request.user,
-                        is_active=True
-                    )
-                    logger.info(f"Found organization: {organization.name}")
-                    request.organization = organization
-                    return self.get_response(request)
-                except Organization.DoesNotExist:
-                    logger.warning(f"Organization {org_id} not found or user has no access")
-                    if 'organization_id' in request.session:
-                        del request.session['organization_id']
-                        request.session.save()
-
-            # Store the current URL to redirect back after organization selection
-            # Only store if it's not the root URL or organization select
-            if request.path not in ['/', '/organizations/select/']:
-                request.session['next'] = request.get_full_path()
-                request.session.save()
-                logger.info(f"Stored next URL in session: {request.get_full_path()}")
-
-            return redirect('organizations:select')
-
-        except Exception as e:
-            logger.error(f"Error in TenantMiddleware: {str(e)}")
             return self.get_response(request)
+        finally:
+            token = request.__dict__.pop('_tenant_token', None)
+            if token is not None:
+                reset_current_organization(token)
+
+    def resolve(self, request):
+        """
+        Return the (resolver, identifier, organization) of the request.
+
+        The first resolver that finds an identifier decides; the organization is
+        None if the user has no access to it.
+        """
+        for resolver in self.resolvers:
+            identifier = resolver.get_identifier(request)
+            if identifier:
+                return resolver, identifier, resolver.get_organization(request, identifier)
+        return None, None, None
 
     def process_view(self, request, view_func, view_args, view_kwargs):
-        # Skip middleware for admin views
-        if request.path.startswith('/admin/'):
+        # Skip static, admin, auth and browser requests and exempt views
+        if getattr(view_func, 'tenant_exempt', False) or EXCLUDED_PATH_RE.match(request.path):
             return None
 
-        # Skip middleware for organization selection views
-        if request.path.startswith('/organizations/'):
+        if not request.user.is_authenticated:
             return None
 
-        if not request.user.is_authenticated:
+        resolver, identifier, organization = self.resolve(request)
+        if organization is not None:
+            request.organization = organization
+            request._tenant_token = set_current_organization(organization)
             return None
 
-        if not hasattr(request, 'organization'):
-            return redirect('organizations:select')
+        if resolver is not None:
+            response = resolver.reject(request, identifier)
+            if response is not None:
+                return response
 
-        return None
+        # The organization selection page is the one page that works without one
+        match = request.resolver_match
+        if match and match.namespace == 'organizations' and match.url_name == 'select':
+            return None
+
+        # Store the current URL to redirect back after organization selection
+        # Only store if it's not the root URL
+        if request.path != '/':
+            request.session['next'] = request.get_full_path()
+            logger.debug(f"Stored next URL in session: {request.get_full_path()}")
+
+        return redirect('organizations:select')
@@ -1,7 +1,133 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
 from django.db import models
 from django.conf import settings
 
-# Create your models here.
+# Organization of the request being handled, set by TenantMiddleware
+_current_organization = ContextVar('current_organization', default=None)
+
+# Set while tenant managers should see the rows of all organizations
+_unscoped = ContextVar('tenant_unscoped', default=False)
+
+def get_current_organization():
+    """Return the organization of the current request, or None outside of one."""
+    return _current_organization.get()
+
+def set_current_organization(organization):
+    """
+    Scope tenant queries to the organization until the returned token is reset.
+
+    Returns:
+        Token: Token for reset_current_organization()
+    """
+    return _current_organization.set(organization)
+
+def reset_current_organization(token):
+    """Restore the organization that was current before set_current_organization()."""
+    _current_organization.reset(token)
+
+@contextmanager
+def tenant_context(organization):
+    """Scope tenant queries to the organization inside the with block."""
+    token = set_current_organization(organization)
+    try:
+        yield organization
+    finally:
+        reset_current_organization(token)
+
+@contextmanager
+def unscoped():
+    """
+    Let tenant managers return the rows of all organizations inside the with
+    block. Queries are still routed to the current organization's database.
+    """
+    token = _unscoped.set(True)
+    try:
+        yield
+    finally:
+        _unscoped.reset(token)
+
+class TenantQuerySet(models.QuerySet):
+    """Queryset of a tenant model."""
+
+    def for_organization(self, organization):
+        """Return the rows of the given organization."""
+        return self.filter(organization=organization)
+
+class TenantManager(models.Manager.from_queryset(TenantQuerySet)):
+    """
+    Default manager of tenant models.
+
+    Inside a request the queryset is filtered to the current organization, so
+    every query through the manager starts with the organization index prefix.
+    Outside of one (management commands, the shell, migrations) it returns the
+    rows of all organizations. Use TenantModel.all_objects, or an unscoped()
+    block, to query across organizations on purpose.
+
+    The filter is applied when the queryset is created, so querysets built at
+    import time (e.g. form field defaults) must be rebuilt per request.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        organization = get_current_organization()
+        if organization is not None and not _unscoped.get():
+            queryset = queryset.filter(organization_id=organization.pk)
+        return queryset
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """Fill in the organization of the whole batch, insert it and invalidate cached data."""
+        from core.cache import invalidate
+
+        objs = list(objs)
+        self.model.fill_organizations(objs)
+        created = super().bulk_create(objs, *args, **kwargs)
+        # bulk_create sends no post_save signals to invalidate the cache
+        for organization_id in {obj.organization_id for obj in objs}:
+            invalidate(self.model, organization_id)
+        return created
+
+def _primary_organization_cache_key(user_id):
+    return f'tenant:primary:{user_id}'
+
+def get_primary_organization_ids(user_ids):
+    """
+    Return the primary organization IDs of several users.
+
+    Cached per user for TENANT_CACHE_TIMEOUT seconds, so the users missing from
+    the cache cost one query between them.
+
+    Args:
+        user_ids: IDs of the users
+
+    Returns:
+        dict: Primary organization ID (or None) keyed by user ID
+    """
+    from django.core.cache import cache
+    from organizations.models import OrganizationUser
+
+    user_ids = set(user_ids)
+    keys = {_primary_organization_cache_key(user_id): user_id for user_id in user_ids}
+    # A user without a primary organization is cached as 0
+    result = {keys[key]: value or None for key, value in cache.get_many(keys).items()}
+
+    missing = user_ids - set(result)
+    if missing:
+        found = dict(
+            OrganizationUser.objects.filter(user_id__in=missing, is_primary=True)
+            .order_by('-pk').values_list('user_id', 'organization_id')
+        )
+        cache.set_many(
+            {_primary_organization_cache_key(user_id): found.get(user_id, 0) for user_id in missing},
+            getattr(settings, 'TENANT_CACHE_TIMEOUT', 60)
+        )
+        result.update({user_id: found.get(user_id) for user_id in missing})
+    return result
+
+def invalidate_primary_organization(user_id):
+    """Forget the cached primary organization of a user."""
+    from django.core.cache import cache
+    cache.delete(_primary_organization_cache_key(user_id))
 
 class BaseModel(models.Model):
     """Base model with common fields for all models."""
@@ -35,17 +161,66 @@ class TenantModel(BaseModel):
         default=None  # Default to None
     )
 
+    objects = TenantManager()
+    all_objects = models.Manager()
+
     class Meta:
         abstract = True
 
     def save(self, *args, **kwargs):
-        # If no organization is set, try to get it from the current user
-        if not self.organization and hasattr(self, 'created_by') and self.created_by:
-            from organizations.models import OrganizationUser
-            org_user = OrganizationUser.objects.filter(
-                user=self.created_by,
-                is_primary=True
-            ).first()
-            if org_user:
-                self.organization = org_user.organization
+        # If no organization is set, take it from a parent, the request or the creator
+        if self.organization_id is None:
+            self.fill_organizations([self])
         super().save(*args, **kwargs)
+
+    def _perform_unique_checks(self, unique_checks):
+        # Model.validate_unique() queries the default manager, which only sees
+        # the current organization. Check against every organization, so values
+        # unique across them fail validation instead of the insert; checks that
+        # include the organization are unaffected.
+        with unscoped():
+            return super()._perform_unique_checks(unique_checks)
+
+    def validate_constraints(self, exclude=None):
+        # UniqueConstraint.validate() queries the default manager as well
+        with unscoped():
+            super().validate_constraints(exclude=exclude)
+
+    def _get_parent_organization_id(self):
+        """Return the organization of a loaded tenant parent (e.g. the tank of a history entry)."""
+        for field in self._meta.concrete_fields:
+            if (field.is_relation and field.name != 'organization'
+                    and issubclass(field.related_model, TenantModel) and field.is_cached(self)):
+                parent = field.get_cached_value(self)
+                if parent is not None and parent.organization_id is not None:
+                    return parent.organization_id
+        return None
+
+    @classmethod
+    def fill_organizations(cls, objs):
+        """
+        Set the organization of the instances that don't have one.
+
+        It is taken from the first loaded tenant parent, else the organization
+        of the current request, else the creator's primary organization. The
+        primary organizations of all creators are looked up together, so a
+        batch costs at most one query.
+
+        Args:
+            objs: Instances of the model
+        """
+        pending = []
+        current = get_current_organization()
+        for obj in objs:
+            if obj.organization_id is not None:
+                continue
+            obj.organization_id = obj._get_parent_organization_id()
+            if obj.organization_id is None and current is not None:
+                obj.organization_id = current.pk
+            if obj.organization_id is None and obj.created_by_id is not None:
+                pending.append(obj)
+
+        if pending:
+            primary = get_primary_organization_ids(obj.created_by_id for obj in pending)
+            for obj in pending:
+                obj.organization_id = primary.get(obj.created_by_id)
@@ -0,0 +1,100 @@
+"""
+Services for the dashboard.
+
+The dashboard statistics of an organization are computed with a single query,
+one scalar subquery per figure on the organization's row, and cached per
+organization until one of the models they are computed from changes.
+"""
+
+from decimal import Decimal
+from django.db.models import Count, DecimalField, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from cellars.models import Cellar, CellarVolumeSummary, Tank
+from core.cache import get_or_set
+from core.db_routers import tenant_db
+from harvests.models import Harvest, HarvestAllocation
+from organizations.models import Organization
+from packaging.models import Bottle, Bottling, Box, Closure, Label
+from vineyards.models import Vineyard
+
+# Models the statistics are computed from; a change to any of them invalidates the cache
+DASHBOARD_MODELS = (
+    Vineyard, Harvest, HarvestAllocation, Cellar, Tank, Bottle, Label, Closure, Box, Bottling,
+)
+
+def _scalar(queryset, aggregate, output_field):
+    """Return a subquery that aggregates an organization's rows of a queryset."""
+    queryset = queryset.filter(organization=OuterRef('pk')).order_by().values('organization')
+    return Coalesce(
+        Subquery(queryset.annotate(value=aggregate).values('value'), output_field=output_field),
+        Value(0), output_field=output_field
+    )
+
+def _count(queryset):
+    return _scalar(queryset, Count('pk'), IntegerField())
+
+def _sum(queryset, field):
+    output_field = DecimalField(max_digits=14, decimal_places=2)
+    return _scalar(queryset, Sum(field, output_field=output_field), output_field)
+
+def compute_dashboard_stats(organization):
+    """
+    Compute the dashboard statistics of an organization with one query.
+
+    Args:
+        organization: Organization instance or ID
+
+    Returns:
+        dict: Counts of vineyards, harvests with juice left to allocate,
+            cellars, packaging materials and unfinished bottlings, the
+            volume and capacity of all tanks, the fill percentage and the
+            number of packaging materials below their minimum stock
+    """
+    allocated = HarvestAllocation.all_objects.filter(harvest=OuterRef('pk')).order_by().values('harvest')
+    allocated = Coalesce(
+        Subquery(allocated.annotate(total=Sum('allocated_volume')).values('total')),
+        Value(Decimal('0')), output_field=DecimalField(max_digits=10, decimal_places=2)
+    )
+    materials = {'bottle': Bottle, 'label': Label, 'closure': Closure, 'box': Box}
+
+    annotations = {
+        'vineyard_count': _count(Vineyard.all_objects.all()),
+        'active_harvests': _count(Harvest.all_objects.filter(juice_yield__gt=allocated)),
+        'cellar_count': _count(Cellar.all_objects.all()),
+        'tank_volume': _sum(CellarVolumeSummary.objects.annotate(organization=F('cellar__organization')),
+                            'total_volume'),
+        'tank_capacity': _sum(CellarVolumeSummary.objects.annotate(organization=F('cellar__organization')),
+                              'total_capacity'),
+        'bottle_stock': _sum(Bottle.all_objects.all(), 'stock'),
+        'unfinished_bottlings': _count(Bottling.all_objects.filter(status='unfinished')),
+    }
+    for name, model in materials.items():
+        annotations[f'{name}_count'] = _count(model.all_objects.all())
+        annotations[f'low_{name}_stock'] = _count(model.all_objects.filter(stock__lt=F('minimum_stock')))
+
+    organization_id = getattr(organization, 'pk', organization)
+    stats = (
+        Organization.objects.using(tenant_db(organization_id))
+        .filter(pk=organization_id).annotate(**annotations).values(*annotations).get()
+    )
+    stats['bottle_stock'] = int(stats['bottle_stock'])
+    stats['low_stock_count'] = sum(stats.pop(f'low_{name}_stock') for name in materials)
+    stats['fill_percentage'] = (
+        round(stats['tank_volume'] / stats['tank_capacity'] * 100, 1) if stats['tank_capacity'] else 0
+    )
+    return stats
+
+def get_dashboard_stats(organization):
+    """
+    Return the cached dashboard statistics of an organization.
+
+    Args:
+        organization: Organization instance or ID
+
+    Returns:
+        dict: The statistics of compute_dashboard_stats()
+    """
+    return get_or_set(
+        'dashboard_stats', lambda: compute_dashboard_stats(organization),
+        organization=organization, depends_on=DASHBOARD_MODELS
+    )
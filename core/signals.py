@@ -0,0 +1,80 @@
+"""
+Mirroring of shared rows into tenant databases.
+
+Users and organizations live in 'default', but tenant rows in the other
+databases of TENANT_DATABASES have foreign keys to them, which can't point
+across databases. Every save or delete in 'default' is therefore copied to the
+other tenant databases, like a reference table. A database added to
+TENANT_DATABASES later is seeded with mirror_shared_rows(), e.g. by the
+mirror_shared_rows management command.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from core.db_routers import get_registry
+
+def _mirror_aliases(using):
+    registry = get_registry()
+    # Only changes made in 'default' are mirrored, not the copies themselves
+    if using != registry.default:
+        return []
+    return sorted(registry.primaries() - {registry.default})
+
+def mirror_save(sender, instance, using, raw=False, **kwargs):
+    """Copy a saved shared row into the other tenant databases."""
+    aliases = _mirror_aliases(using)
+    if raw or not aliases:
+        return
+    values = {
+        field.attname: getattr(instance, field.attname)
+        for field in sender._meta.concrete_fields if not field.primary_key
+    }
+    for alias in aliases:
+        sender._base_manager.using(alias).update_or_create(pk=instance.pk, defaults=values)
+
+def mirror_delete(sender, instance, using, **kwargs):
+    """Delete a shared row from the other tenant databases."""
+    for alias in _mirror_aliases(using):
+        sender._base_manager.using(alias).filter(pk=instance.pk).delete()
+
+def _mirrored_models():
+    """Return the mirrored models, parents before their children."""
+    from organizations.models import Organization, OrganizationUser
+    return [get_user_model(), Organization, OrganizationUser]
+
+def mirror_shared_rows(alias):
+    """
+    Copy every user, organization and membership of 'default' into a tenant
+    database, and remove copies whose row is gone from 'default'.
+
+    Needed once for a database newly added to TENANT_DATABASES; from then on
+    mirror_save() and mirror_delete() keep it up to date. Rows are written raw,
+    so timestamps are copied unchanged.
+
+    Args:
+        alias: Alias of the tenant database
+
+    Returns:
+        dict: Number of rows copied keyed by model label
+    """
+    default = get_registry().default
+    copied = {}
+    kept = {}
+    for model in _mirrored_models():
+        rows = list(model._base_manager.using(default).order_by('pk'))
+        for row in rows:
+            row.save_base(raw=True, using=alias)
+        copied[model._meta.label] = len(rows)
+        kept[model] = [row.pk for row in rows]
+    # Children first, so the parents' copies are no longer referenced
+    for model in reversed(_mirrored_models()):
+        model._base_manager.using(alias).exclude(pk__in=kept[model]).delete()
+    return copied
+
+def connect_mirroring():
+    """Mirror users, organizations and memberships into tenant databases."""
+    # Parents are saved before and deleted after their children, so mirroring
+    # them in signal order keeps the copies' foreign keys valid
+    for model in _mirrored_models():
+        post_save.connect(mirror_save, sender=model, dispatch_uid=f'mirror_save_{model._meta.label}')
+        post_delete.connect(mirror_delete, sender=model, dispatch_uid=f'mirror_delete_{model._meta.label}')
@@ -0,0 +1,56 @@
+from django import template
+from django.apps import apps
+from core.cache import get_or_set
+
+register = template.Library()
+
+class TenantCacheNode(template.Node):
+    def __init__(self, nodelist, name, parts, depends_on, timeout):
+        self.nodelist = nodelist
+        self.name = name
+        self.parts = parts
+        self.depends_on = depends_on
+        self.timeout = timeout
+
+    def render(self, context):
+        request = context.get('request')
+        timeout = self.timeout.resolve(context) if self.timeout else None
+        return get_or_set(
+            self.name.resolve(context),
+            lambda: self.nodelist.render(context),
+            *[part.resolve(context) for part in self.parts],
+            organization=getattr(request, 'organization', None),
+            depends_on=[apps.get_model(label) for label in self.depends_on.resolve(context).split(',')],
+            timeout=timeout
+        )
+
+@register.tag
+def tenantcache(parser, token):
+    """
+    Cache a template fragment for the current organization with core.cache.
+
+    The fragment is rendered again once one of the models it depends on changes.
+
+    Usage::
+
+        {% tenantcache "vineyard_harvests" vineyard.id depends_on="harvests.Harvest,harvests.HarvestAllocation" %}
+            ...
+        {% endtenantcache %}
+
+    An optional timeout="seconds" overrides TENANT_DATA_CACHE_TIMEOUT.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires at least a name")
+    kwargs = template.base.token_kwargs([bit for bit in bits[2:] if '=' in bit], parser)
+    if 'depends_on' not in kwargs:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires depends_on")
+    nodelist = parser.parse(('endtenantcache',))
+    parser.delete_first_token()
+    return TenantCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        [parser.compile_filter(bit) for bit in bits[2:] if '=' not in bit],
+        kwargs['depends_on'],
+        kwargs.get('timeout'),
+    )
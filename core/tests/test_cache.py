@@ -0,0 +1,157 @@
+"""
+Tests for the tenant-aware data cache.
+"""
+
+import pytest
+from unittest import mock
+from decimal import Decimal
+from django.urls import reverse
+from cellars.models import Cellar, Tank
+from cellars.services import transfer
+from core.cache import (
+    get_cache_stats, get_generations, get_or_set, invalidate, reset_cache_stats, tenant_cache_key
+)
+from core.checks import check_counter_caches, check_shared_cache
+from core.models import tenant_context
+from vineyards.models import Vineyard
+
+@pytest.fixture
+def make_vineyard(tenant_client, organization):
+    _, user = tenant_client
+    def make(name, organization=organization):
+        return Vineyard.objects.create(
+            name=name, location='Test Location', size=10, ownership_type='owned',
+            grape_variety='merlot', arkod_id=name, organization=organization, created_by=user
+        )
+    return make
+
+@pytest.mark.django_db
+class TestTenantCache:
+    """Test cases for core.cache."""
+
+    def test_keys_are_namespaced_per_organization(self, organization):
+        assert tenant_cache_key('detail', 5, organization=organization) == f'tenant:{organization.pk}:detail:5'
+        with tenant_context(organization):
+            assert tenant_cache_key('detail', 5) == f'tenant:{organization.pk}:detail:5'
+        assert tenant_cache_key('detail', 5, organization=organization.pk + 1) != \
+            tenant_cache_key('detail', 5, organization=organization)
+
+    def test_saves_invalidate_dependent_values(self, organization, make_vineyard):
+        compute = lambda: Vineyard.objects.filter(organization=organization).count()
+        count = lambda: get_or_set('count', compute, organization=organization, depends_on=(Vineyard,))
+
+        assert count() == 0
+        make_vineyard('First')
+        assert count() == 1
+        vineyard = make_vineyard('Second')
+        assert count() == 2
+        vineyard.delete()
+        assert count() == 1
+
+    def test_other_organizations_and_models_keep_their_values(self, organization):
+        before = get_generations([Vineyard, Cellar], organization.pk)
+        invalidate(Vineyard, organization.pk + 1)
+        invalidate(Cellar, organization.pk)
+
+        after = get_generations([Vineyard, Cellar], organization.pk)
+        assert after[0] == before[0]
+        assert after[1] != before[1]
+
+    def test_bulk_updates_invalidate(self, tenant_client, organization):
+        _, user = tenant_client
+        cellar = Cellar.objects.create(name='Cellar', location='Here', organization=organization, created_by=user)
+        tanks = Tank.objects.bulk_create([
+            Tank(cellar=cellar, name=f'Tank {i}', capacity=Decimal('100'), current_volume=Decimal('50'),
+                 organization=organization, created_by=user)
+            for i in range(2)
+        ])
+        total = lambda: get_or_set(
+            'volume', lambda: sum(tank.current_volume for tank in Tank.objects.all()),
+            organization=organization, depends_on=(Tank,)
+        )
+        before = get_generations([Tank], organization.pk)
+
+        transfer(tanks[0], tanks[1], 20, '2025-09-01', user)
+
+        assert get_generations([Tank], organization.pk) != before
+        assert total() == Decimal('100')
+
+    def test_hits_and_misses_are_counted(self, organization, settings):
+        reset_cache_stats()
+        settings.CACHE_METRICS_HOOK = 'metrics.report'
+        hook = mock.Mock()
+
+        with mock.patch('core.cache.import_string', return_value=hook):
+            for _ in range(3):
+                get_or_set('answer', lambda: 42, organization=organization)
+
+        assert get_cache_stats()['answer'] == {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3}
+        assert hook.call_args_list == [mock.call('answer', False), mock.call('answer', True), mock.call('answer', True)]
+
+    def test_vineyard_list_count_is_cached(self, tenant_client, make_vineyard, add_model_permissions):
+        client, user = tenant_client
+        add_model_permissions(user, Vineyard)
+        make_vineyard('First')
+        url = reverse('vineyards:list_vineyards')
+        client.get(url)
+
+        reset_cache_stats()
+        client.get(url)
+        assert get_cache_stats()['vineyard_count']['hits'] == 1
+
+        make_vineyard('Second')
+        assert client.get(url).context['vineyards'].paginator.count == 2
+        assert get_cache_stats()['vineyard_count']['misses'] == 1
+
+    def test_metrics_endpoint_is_staff_only(self, tenant_client, organization):
+        client, user = tenant_client
+        reset_cache_stats()
+        get_or_set('answer', lambda: 42, organization=organization)
+
+        assert client.get(reverse('core:cache_metrics')).status_code == 302
+        user.is_staff = True
+        user.save()
+        assert client.get(reverse('core:cache_metrics')).json()['answer']['misses'] == 1
+
+class TestCounterCacheCheck:
+    """Test cases for the check of the caches that hold counters."""
+
+    def test_configured_caches_pass(self):
+        assert check_counter_caches(None) == []
+
+    def test_file_based_cache_is_refused(self, settings, tmp_path):
+        settings.CACHES = {
+            **settings.CACHES,
+            'files': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tmp_path},
+        }
+        settings.TENANT_CACHE_ALIAS = 'files'
+
+        errors = check_counter_caches(None)
+
+        assert [error.id for error in errors] == ['core.E001']
+        assert 'TENANT_CACHE_ALIAS' in errors[0].msg
+
+class TestSharedCacheCheck:
+    """Test cases for the check that the core.cache cache is shared between workers."""
+
+    def test_local_memory_cache_is_allowed_in_development(self, settings):
+        settings.DEBUG = True
+
+        assert check_shared_cache(None) == []
+
+    def test_local_memory_cache_is_warned_about_in_production(self, settings):
+        settings.DEBUG = False
+
+        warnings = check_shared_cache(None)
+
+        assert [warning.id for warning in warnings] == ['core.W001']
+        assert "'shared'" in warnings[0].msg
+
+    def test_redis_cache_passes(self, settings):
+        settings.DEBUG = False
+        settings.CACHES = {
+            **settings.CACHES,
+            'shared': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost:6379'},
+        }
+
+        assert check_shared_cache(None) == []
@@ -0,0 +1,84 @@
+"""
+Tests for the dashboard statistics.
+"""
+
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.urls import reverse
+from cellars.models import Cellar, Tank
+from core.cache import get_cache_stats, reset_cache_stats
+from core.services import compute_dashboard_stats
+from harvests.models import Harvest, HarvestAllocation
+from packaging.models import Bottle
+from vineyards.models import Vineyard
+
+@pytest.fixture
+def winery(tenant_client, organization):
+    """Create a vineyard with two harvests, a tank and two bottle types."""
+    _, user = tenant_client
+    vineyard = Vineyard.objects.create(
+        name='Test Vineyard', location='Test Location', size=10, ownership_type='owned',
+        grape_variety='merlot', organization=organization, created_by=user
+    )
+    harvests = [
+        Harvest.objects.create(vineyard=vineyard, date=date(2025, 9, day), quantity=Decimal('1000'),
+                               juice_yield=Decimal('700'), organization=organization, created_by=user)
+        for day in (1, 2)
+    ]
+    cellar = Cellar.objects.create(name='Cellar', location='Here', organization=organization, created_by=user)
+    tank = Tank.objects.create(cellar=cellar, name='Tank', capacity=Decimal('1000'),
+                               organization=organization, created_by=user)
+    HarvestAllocation.objects.create(harvest=harvests[0], tank=tank, allocated_volume=Decimal('700'),
+                                     allocation_date=date(2025, 9, 3), organization=organization,
+                                     created_by=user, updated_by=user)
+    for name, stock in [('Low', 5), ('Plenty', 500)]:
+        Bottle.objects.create(name=name, bottle_type='bordeaux', volume=750, stock=stock, minimum_stock=10,
+                              height=300, diameter=80, weight=500, glass_color='clear',
+                              organization=organization, created_by=user)
+    return tank
+
+@pytest.mark.django_db
+class TestDashboardStats:
+    """Test cases for the dashboard statistics service and views."""
+
+    def test_stats_are_computed_in_one_query(self, winery, organization, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            stats = compute_dashboard_stats(organization)
+
+        assert stats['vineyard_count'] == 1
+        assert stats['active_harvests'] == 1
+        assert stats['cellar_count'] == 1
+        assert stats['tank_volume'] == Decimal('700')
+        assert stats['tank_capacity'] == Decimal('1000')
+        assert stats['fill_percentage'] == Decimal('70.0')
+        assert stats['bottle_count'] == 2
+        assert stats['bottle_stock'] == 505
+        assert stats['low_stock_count'] == 1
+        assert stats['label_count'] == 0
+
+    def test_dashboard_is_cached_until_data_changes(self, tenant_client, winery, organization):
+        client, user = tenant_client
+        url = reverse('core:dashboard')
+        client.get(url)
+        reset_cache_stats()
+
+        response = client.get(url)
+        assert 'error' not in response.context
+        assert get_cache_stats()['dashboard_stats']['hits'] == 1
+        assert response.context['active_harvests'] == 1
+
+        Vineyard.objects.create(
+            name='Second Vineyard', location='Test Location', size=10, ownership_type='owned',
+            grape_variety='merlot', arkod_id='2', organization=organization, created_by=user
+        )
+        assert client.get(url).context['vineyard_count'] == 2
+
+    def test_stats_endpoint(self, tenant_client, winery):
+        client, _ = tenant_client
+
+        response = client.get(reverse('core:dashboard_stats'))
+
+        assert response.status_code == 200
+        assert Decimal(response.json()['tank_volume']) == Decimal('700')
+        assert response.json()['low_stock_count'] == 1
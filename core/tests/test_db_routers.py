@@ -0,0 +1,250 @@
+"""
+Tests for routing tenant data to per-organization databases and replicas.
+"""
+
+import json
+import pytest
+import shutil
+from contextlib import contextmanager
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse
+from cellars.models import Cellar, Tank
+from core.db_routers import TenantRouter, get_recent_writes, set_recent_writes, tenant_db
+from core.middleware.db_routing import SESSION_KEY, ReplicaStickinessMiddleware
+from core.models import tenant_context
+from core.signals import _mirror_aliases
+from organizations.models import Organization, OrganizationUser
+
+@pytest.fixture
+def sharded(settings):
+    """Give organization 7 and 'large-winery' databases of their own, with replicas."""
+    settings.TENANT_DATABASES = {'7': 'tenant_a', 'large-winery': 'tenant_b'}
+    settings.TENANT_DATABASE_REPLICAS = {'default': ['default_replica'], 'tenant_a': ['tenant_a_replica']}
+    settings.TENANT_REPLICA_LAG = 5
+
+@pytest.fixture
+def router(sharded):
+    set_recent_writes(None)
+    yield TenantRouter()
+    set_recent_writes(None)
+
+@contextmanager
+def sqlite_databases(**paths):
+    """Register SQLite files as database aliases for the duration of the block."""
+    configured = connections.configure_settings({
+        'default': {'ENGINE': 'django.db.backends.sqlite3'},
+        **{alias: {'ENGINE': 'django.db.backends.sqlite3', 'NAME': str(path)} for alias, path in paths.items()},
+    })
+    for alias in paths:
+        connections.settings[alias] = configured[alias]
+    try:
+        yield
+    finally:
+        for alias in paths:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+
+@pytest.fixture(scope='module')
+def tenant_databases(tmp_path_factory, django_db_setup, django_db_blocker):
+    """Migrate SQLite files for 'tenant_a' and a replica of it that is never updated."""
+    path = tmp_path_factory.mktemp('tenants')
+    primary, replica = path / 'tenant_a.sqlite3', path / 'tenant_a_replica.sqlite3'
+    with django_db_blocker.unblock(), sqlite_databases(tenant_a=primary, tenant_a_replica=replica):
+        call_command('migrate', database='tenant_a', verbosity=0)
+        connections['tenant_a'].close()
+        shutil.copy(primary, replica)
+        yield
+
+@pytest.fixture
+def large_winery_database(tenant_databases, settings):
+    """Give 'large-winery' a database of its own, with a replica that lags behind."""
+    settings.TENANT_DATABASES = {'large-winery': 'tenant_a'}
+    settings.TENANT_DATABASE_REPLICAS = {'tenant_a': ['tenant_a_replica']}
+    set_recent_writes(None)
+    yield
+    set_recent_writes(None)
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('sharded')
+class TestTenantRouter:
+    """Test cases for TenantRouter with sharded settings."""
+
+    def test_organizations_map_to_their_database(self):
+        assert tenant_db(7) == 'tenant_a'
+        assert tenant_db(Organization(pk=8, slug='large-winery')) == 'tenant_b'
+        assert tenant_db(8) == 'default'
+        assert tenant_db() == 'default'
+        with tenant_context(Organization(pk=7, slug='small')):
+            assert tenant_db() == 'tenant_a'
+
+    def test_writes_go_to_the_organizations_primary(self, router):
+        assert router.db_for_write(Tank, instance=Tank(organization_id=7)) == 'tenant_a'
+        assert router.db_for_write(get_user_model(), instance=get_user_model()(pk=1)) == 'default'
+        with tenant_context(Organization(pk=7)):
+            assert router.db_for_write(Cellar) == 'tenant_a'
+            assert router.db_for_write(Organization) == 'default'
+
+    def test_reads_use_replicas_until_written(self, router):
+        with tenant_context(Organization(pk=7)):
+            assert router.db_for_read(Tank) == 'tenant_a_replica'
+            router.db_for_write(Tank)
+            assert router.db_for_read(Tank) == 'tenant_a'
+            # Other databases still read from their replicas
+            assert router.db_for_read(Cellar, instance=Cellar(organization_id=8)) == 'default_replica'
+            # Shared data is always read from 'default'
+            assert router.db_for_read(Organization) == 'default'
+            assert router.db_for_read(Session) == 'default'
+
+            with mock.patch('core.db_routers.time.time', return_value=get_recent_writes()['tenant_a'] + 6):
+                assert router.db_for_read(Tank) == 'tenant_a_replica'
+
+    def test_instances_without_organization_stay_with_their_row(self, router):
+        tank = Tank()
+        tank._state.db = 'tenant_a_replica'
+        assert router.db_for_write(Tank, instance=tank) == 'tenant_a'
+
+    def test_relations_require_same_organization(self, router):
+        assert router.allow_relation(Tank(organization_id=7), Cellar(organization_id=7))
+        assert not router.allow_relation(Tank(organization_id=7), Cellar(organization_id=8))
+        assert router.allow_relation(Tank(), Cellar(organization_id=8))
+
+    def test_primaries_get_the_full_schema(self, router):
+        for alias in ('default', 'tenant_a', 'tenant_b'):
+            assert router.allow_migrate(alias, 'cellars')
+            assert router.allow_migrate(alias, 'auth')
+        assert not router.allow_migrate('tenant_a_replica', 'cellars')
+
+    def test_shared_rows_are_mirrored_from_default_only(self):
+        assert _mirror_aliases('default') == ['tenant_a', 'tenant_b']
+        assert _mirror_aliases('tenant_a') == []
+
+@pytest.mark.django_db(databases=['default', 'tenant_a', 'tenant_a_replica'])
+class TestTenantDatabases:
+    """Test cases for routing across real database aliases."""
+
+    def create_large_winery(self, owner):
+        return Organization.objects.create(
+            name='Large Winery', slug='large-winery', address='Hill Road', tax_number='98765432109',
+            contact_email='large@example.com', contact_phone='111111', created_by=owner
+        )
+
+    def test_tenant_rows_live_in_their_database(self, large_winery_database, organization, create_user):
+        owner = create_user(username='largeowner', email='large-owner@example.com')
+        large_winery = self.create_large_winery(owner)
+        # Shared rows are mirrored, so tenant rows can reference them
+        assert Organization.objects.using('tenant_a').filter(pk=large_winery.pk).exists()
+        assert get_user_model().objects.using('tenant_a').filter(pk=owner.pk).exists()
+
+        with tenant_context(large_winery):
+            Cellar.objects.create(name='Hill Cellar', location='Hill', created_by=owner)
+            # Reads follow the write to the primary...
+            assert list(Cellar.objects.values_list('name', flat=True)) == ['Hill Cellar']
+            set_recent_writes(None)
+            # ...and go back to the replica, which hasn't caught up yet
+            assert not Cellar.objects.exists()
+            # Shared rows are read from 'default'
+            assert Organization.objects.get(slug='large-winery') == large_winery
+        with tenant_context(organization):
+            Cellar.objects.create(name='Valley Cellar', location='Valley', created_by=owner)
+
+        assert list(Cellar.all_objects.using('tenant_a').values_list('name', flat=True)) == ['Hill Cellar']
+        assert list(Cellar.all_objects.using('default').values_list('name', flat=True)) == ['Valley Cellar']
+        assert not Cellar.all_objects.using('tenant_a_replica').exists()
+
+    def test_instances_route_by_slug(self, large_winery_database, create_user):
+        owner = create_user(username='largeowner', email='large-owner@example.com')
+        large_winery = self.create_large_winery(owner)
+
+        # Outside a request, saved instances are routed by their organization ID
+        cellar = Cellar(name='Hill Cellar', location='Hill', organization_id=large_winery.pk, created_by=owner)
+        cellar.save()
+
+        assert cellar._state.db == 'tenant_a'
+        assert Cellar.all_objects.using('tenant_a').get() == cellar
+        assert not Cellar.all_objects.using('default').exists()
+
+    def test_maintenance_commands_cover_sharded_organizations(self, large_winery_database, create_user):
+        owner = create_user(username='largeowner', email='large-owner@example.com')
+        large_winery = self.create_large_winery(owner)
+        with tenant_context(large_winery):
+            cellar = Cellar.objects.create(name='Hill Cellar', location='Hill', created_by=owner)
+            tank = Tank.objects.create(
+                cellar=cellar, name='Hill Tank', capacity=Decimal('1000'), current_volume=Decimal('100'),
+                organization=large_winery, created_by=owner
+            )
+            # Bulk updates bypass Tank.save and leave the rollup stale
+            Tank.objects.filter(pk=tank.pk).update(capacity=Decimal('2000'))
+
+        out = StringIO()
+        call_command('check_tank_volumes', '--json', stdout=out)
+        assert [(d['tank_id'], d['organization_id']) for d in json.loads(out.getvalue())] == [
+            (tank.pk, large_winery.pk)
+        ]
+
+        out = StringIO()
+        call_command('rebuild_volume_summaries', stdout=out)
+        assert 'Rebuilt volume rollups for 1 cellars' in out.getvalue()
+        assert 'match the tanks' in out.getvalue()
+        with tenant_context(large_winery):
+            assert cellar.volume_summary.total_capacity == Decimal('2000.00')
+
+    def test_command_seeds_a_new_database(self, organization, large_winery_database, settings):
+        # 'large-winery' exists before its database is added
+        settings.TENANT_DATABASES = {}
+        large_winery = self.create_large_winery(organization.created_by)
+        OrganizationUser.objects.create(
+            organization=large_winery, user=organization.created_by, role='owner', created_by=organization.created_by
+        )
+        assert not Organization.objects.using('tenant_a').exists()
+
+        settings.TENANT_DATABASES = {'large-winery': 'tenant_a'}
+        call_command('mirror_shared_rows', database=['tenant_a'], verbosity=0)
+
+        assert set(Organization.objects.using('tenant_a').values_list('slug', flat=True)) == {
+            'test-winery', 'large-winery'
+        }
+        assert OrganizationUser.objects.using('tenant_a').get().user_id == organization.created_by.pk
+        copy = Organization.objects.using('tenant_a').get(slug='large-winery')
+        assert copy.created_at == large_winery.created_at
+
+@pytest.mark.django_db
+class TestReplicaStickinessMiddleware:
+    """Test cases for carrying write times across requests in the session."""
+
+    def run(self, session, write=False):
+        """Handle a request and return the database the view reads tanks from."""
+        def view(request):
+            if write:
+                TenantRouter().db_for_write(Tank)
+            return HttpResponse(TenantRouter().db_for_read(Tank))
+        request = mock.Mock(session=session)
+        return ReplicaStickinessMiddleware(view)(request).content.decode()
+
+    def test_writes_stick_to_the_next_request(self, router):
+        session = {}
+        assert self.run(session) == 'default_replica'
+        assert SESSION_KEY not in session
+
+        self.run(session, write=True)
+        assert set(session[SESSION_KEY]) == {'default'}
+        assert get_recent_writes() == {}
+        assert self.run(session) == 'default'
+
+        with mock.patch('core.db_routers.time.time', return_value=session[SESSION_KEY]['default'] + 6):
+            assert self.run(session) == 'default_replica'
+        assert SESSION_KEY not in session
+
+    def test_no_session_access_without_replicas(self):
+        session = mock.MagicMock()
+        self.run(session, write=True)
+        session.get.assert_not_called()
+
+    def test_single_database_has_no_mirrors(self):
+        assert _mirror_aliases('default') == []
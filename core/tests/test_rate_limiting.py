@@ -0,0 +1,142 @@
+"""
+Tests for the rate limit backends and middleware.
+"""
+
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from core.middleware.rate_limiting import FixedWindowBackend, RateLimitMiddleware, SlidingWindowBackend
+from harvests.models import Harvest
+from vineyards.models import Vineyard
+
+class TestFixedWindowBackend:
+    """Test cases for FixedWindowBackend."""
+
+    def test_limits_hits_per_window(self):
+        backend = FixedWindowBackend()
+
+        assert [backend.hit('bucket', 3, 60, now=120 + i).allowed for i in range(4)] == [True] * 3 + [False]
+        assert backend.hit('bucket', 3, 60, now=130).retry_after == 50
+        # The next window starts from zero
+        assert backend.hit('bucket', 3, 60, now=180).allowed
+
+    def test_counters_are_shared_between_backends(self):
+        FixedWindowBackend().hit('bucket', 1, 60, now=0)
+        assert not FixedWindowBackend().hit('bucket', 1, 60, now=1).allowed
+
+class TestSlidingWindowBackend:
+    """Test cases for SlidingWindowBackend."""
+
+    def test_previous_window_is_weighted(self):
+        backend = SlidingWindowBackend()
+        for i in range(10):
+            assert backend.hit('bucket', 10, 60, now=100 + i).allowed
+
+        # At a quarter into the next window, 3/4 of the previous 10 hits count
+        results = [backend.hit('bucket', 10, 60, now=135) for _ in range(3)]
+        assert [result.allowed for result in results] == [True, True, False]
+        assert results[-1].count == pytest.approx(10.5)
+        assert results[-1].retry_after == pytest.approx(3)
+        assert backend.hit('bucket', 10, 60, now=138).allowed
+
+    def test_burst_at_window_boundary_is_refused(self):
+        backend = SlidingWindowBackend()
+        for _ in range(10):
+            backend.hit('bucket', 10, 60, now=119)
+
+        assert not backend.hit('bucket', 10, 60, now=121).allowed
+
+@pytest.fixture
+def rate_limited(settings):
+    """Enable RateLimitMiddleware, which isn't in MIDDLEWARE by default."""
+    settings.MIDDLEWARE = [*settings.MIDDLEWARE, 'core.middleware.rate_limiting.RateLimitMiddleware']
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures('rate_limited')
+class TestRateLimitMiddleware:
+    """Test cases for RateLimitMiddleware."""
+
+    def test_view_limit_per_route_and_user(self, tenant_client, settings):
+        settings.RATELIMIT_VIEW_LIMIT = '2/m'
+        client, _ = tenant_client
+        url = reverse('cellars:list_cellars')
+
+        assert [client.get(url).status_code for _ in range(3)] == [200, 200, 429]
+        # Other routes have buckets of their own
+        assert client.get(reverse('cellars:list_tanks')).status_code == 200
+
+        response = client.get(url)
+        assert int(response['Retry-After']) > 0
+        assert not any(key for key in cache._cache if url in key)
+
+    def test_route_limits_override_the_view_limit(self, tenant_client, settings):
+        settings.RATELIMIT_VIEW_LIMIT = '2/m'
+        settings.RATELIMIT_ROUTE_LIMITS = {'cellars:list_cellars': '3/m', 'cellars:list_tanks': None}
+        client, _ = tenant_client
+
+        cellars = [client.get(reverse('cellars:list_cellars')).status_code for _ in range(4)]
+        tanks = [client.get(reverse('cellars:list_tanks')).status_code for _ in range(4)]
+
+        assert cellars == [200, 200, 200, 429]
+        assert tanks == [200] * 4
+
+    def test_paging_through_a_list_is_not_limited(self, tenant_client, organization, settings):
+        settings.RATELIMIT_VIEW_LIMIT = '2/m'
+        client, user = tenant_client
+        vineyard = Vineyard.objects.create(
+            name='Test Vineyard', location='Test Location', size=100, ownership_type='owned',
+            grape_variety='merlot', organization=organization, created_by=user
+        )
+        Harvest.objects.bulk_create([
+            Harvest(
+                vineyard=vineyard, date=date(2000, 1, 1) + timedelta(days=i), quantity=Decimal('1000'),
+                juice_yield=Decimal('700'), organization=organization, created_by=user
+            )
+            for i in range(160)
+        ])
+
+        pages, cursor = 0, None
+        while True:
+            params = {'after': cursor} if cursor else {}
+            response = client.get(reverse('harvests:list_harvests'), params, HTTP_X_REQUESTED_WITH='XMLHttpRequest')
+            assert response.status_code == 200
+            pages += 1
+            cursor = response.json()['next']
+            if not cursor:
+                break
+
+        assert pages == 4
+        # The dashboard polls its statistics without using up a limit either
+        assert all(client.get(reverse('core:dashboard_stats')).status_code == 200 for _ in range(3))
+
+    def test_tenant_limit_spans_routes(self, tenant_client, settings):
+        settings.RATELIMIT_TENANT_LIMIT = '2/m'
+        client, _ = tenant_client
+
+        assert client.get(reverse('harvests:list_harvests')).status_code == 200
+        assert client.get(reverse('cellars:list_cellars')).status_code == 200
+        assert client.get(reverse('vineyards:list_vineyards')).status_code == 429
+
+    def test_login_attempts_limited_per_ip(self, client, settings):
+        settings.RATELIMIT_LOGIN_LIMIT = '2/h'
+        credentials = {'username': 'nobody', 'password': 'wrong'}
+
+        statuses = [client.post(reverse('login'), credentials).status_code for _ in range(3)]
+
+        assert statuses == [200, 200, 429]
+        assert client.get(reverse('login')).status_code == 200
+
+    def test_parse_limit(self):
+        middleware = RateLimitMiddleware(lambda request: None)
+        assert middleware.parse_limit('100/h') == (100, 3600)
+        assert middleware.parse_limit('5/10m') == (5, 600)
+        assert middleware.parse_limit('1/30') == (1, 30)
+
+def test_benchmark_command():
+    out = StringIO()
+    call_command('benchmark_rate_limiter', '--iterations', '50', '--rps', '5000', stdout=out)
+    assert 'µs per request' in out.getvalue()
@@ -0,0 +1,98 @@
+"""
+Tests for the organization scoping of tenant model queries.
+"""
+
+import pytest
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.urls import reverse
+from cellars.forms import TankTransferForm
+from cellars.models import Cellar, Tank
+from vineyards.models import GrapeVariety
+from core.models import get_current_organization, tenant_context
+from organizations.models import Organization
+
+@pytest.fixture
+def other_organization(create_user):
+    owner = create_user(username='otherowner', email='other@example.com')
+    return Organization.objects.create(
+        name='Other Winery',
+        slug='other-winery',
+        address='Other Address',
+        tax_number='98765432109',
+        contact_email='other@example.com',
+        contact_phone='111111',
+        created_by=owner
+    )
+
+@pytest.fixture
+def cellars(tenant_client, organization, other_organization):
+    """Create a cellar with a tank in each organization."""
+    _, user = tenant_client
+    created = []
+    for org in (organization, other_organization):
+        cellar = Cellar.objects.create(
+            name=f'{org.name} Cellar', location='Cellar Road', organization=org, created_by=user
+        )
+        Tank.objects.create(
+            cellar=cellar, name='Tank 1', capacity=1000, organization=org, created_by=user
+        )
+        created.append(cellar)
+    return created
+
+@pytest.mark.django_db
+class TestTenantManager:
+    """Test cases for core.models.TenantManager."""
+
+    def test_queries_are_scoped_to_current_organization(self, cellars, organization):
+        own, other = cellars
+        assert Cellar.objects.count() == 2
+
+        with tenant_context(organization):
+            assert list(Cellar.objects.all()) == [own]
+            assert list(Tank.objects.values_list('cellar', flat=True)) == [own.pk]
+            assert Cellar.all_objects.count() == 2
+            assert not Cellar.objects.filter(pk=other.pk).exists()
+
+        assert get_current_organization() is None
+        assert Cellar.objects.count() == 2
+
+    def test_form_querysets_are_scoped(self, cellars, organization):
+        with tenant_context(organization):
+            form = TankTransferForm()
+            assert {tank.cellar_id for tank in form.fields['source_tank'].queryset} == {cellars[0].pk}
+
+    def test_list_page_only_shows_own_rows(self, tenant_client, cellars):
+        client, _ = tenant_client
+
+        response = client.get(reverse('cellars:list_cellars'))
+
+        assert response.status_code == 200
+        assert list(response.context['cellars']) == [cellars[0]]
+        assert get_current_organization() is None
+
+    def test_unique_checks_see_other_organizations(self, organization, other_organization):
+        GrapeVariety.objects.create(
+            code='CV036', name='Cabernet Sauvignon', type='red', system_code='cabernet_sauvignon',
+            organization=other_organization
+        )
+
+        with tenant_context(organization):
+            duplicate = GrapeVariety(
+                code='CV036', name='Cabernet Sauvignon', type='red', system_code='cabernet_sauvignon',
+                organization=organization
+            )
+            with pytest.raises(ValidationError) as error:
+                duplicate.validate_unique()
+            assert set(error.value.message_dict) == {'system_code'}
+            # The code is only unique per organization
+            duplicate.validate_constraints()
+            assert not GrapeVariety.objects.exists()
+
+    @pytest.mark.skipif(connection.vendor != 'sqlite', reason='Checks the SQLite query plan')
+    def test_list_queries_use_tenant_index(self, cellars, organization):
+        with tenant_context(organization):
+            plan = Cellar.objects.order_by('name').explain()
+
+        assert 'cellar_org_name_idx' in plan
+        assert 'TEMP B-TREE' not in plan
@@ -0,0 +1,154 @@
+"""
+Tests for the organization resolution in TenantMiddleware.
+"""
+
+import pytest
+from io import StringIO
+from django.contrib.sessions.backends.cache import SessionStore
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.urls import resolve
+from core.models import get_current_organization
+from core.middleware.tenant_middleware import EXCLUDED_PATH_RE, TenantMiddleware, tenant_exempt
+from organizations.models import OrganizationUser
+
+@pytest.fixture
+def member(tenant_client):
+    _, user = tenant_client
+    return user
+
+def process(request, view=None):
+    """Pass a request through the middleware and a stub view and return the response."""
+    request.resolver_match = resolve(request.path)
+    view = view or request.resolver_match.func
+
+    def get_response(request):
+        response = middleware.process_view(request, view, (), {})
+        if response is None:
+            request.current_organization = get_current_organization()
+            response = HttpResponse('ok')
+        return response
+
+    middleware = TenantMiddleware(get_response)
+    return middleware(request)
+
+@pytest.fixture
+def run_middleware(organization):
+    """Return a helper that passes a session request for the user through the middleware."""
+    def run(user, path='/harvests/', session_organization=organization.pk, **headers):
+        request = RequestFactory().get(path, headers=headers)
+        request.user = user
+        request.session = SessionStore()
+        if session_organization is not None:
+            request.session['organization_id'] = str(session_organization)
+        return request, process(request)
+    return run
+
+@pytest.mark.django_db
+class TestTenantMiddleware:
+    """Test cases for TenantMiddleware."""
+
+    def test_organization_is_cached(self, member, organization, run_middleware,
+                                    django_assert_num_queries):
+        with django_assert_num_queries(1):
+            request, response = run_middleware(member)
+        assert request.organization == organization
+
+        with django_assert_num_queries(0):
+            request, response = run_middleware(member)
+        assert response.status_code == 200
+        assert request.organization == organization
+
+    def test_organization_scopes_queries_during_request(self, member, organization, run_middleware):
+        request, response = run_middleware(member)
+
+        assert request.current_organization == organization
+        assert get_current_organization() is None
+
+    def test_removed_membership_invalidates_cache(self, member, organization, run_middleware):
+        run_middleware(member)
+        OrganizationUser.objects.filter(user=member).delete()
+
+        request, response = run_middleware(member)
+
+        assert response.status_code == 302
+        assert not hasattr(request, 'organization')
+        assert 'organization_id' not in request.session
+
+    def test_deactivated_organization_invalidates_cache(self, member, organization, run_middleware):
+        run_middleware(member)
+        organization.is_active = False
+        organization.save()
+
+        request, response = run_middleware(member)
+
+        assert response.status_code == 302
+        assert request.session['next'] == '/harvests/'
+
+    def test_select_page_works_without_organization(self, member, run_middleware):
+        request, response = run_middleware(member, '/organizations/select/', session_organization=None)
+
+        assert response.status_code == 200
+        assert not hasattr(request, 'organization')
+
+    def test_exempt_views_do_not_resolve(self, member, run_middleware, django_assert_num_queries):
+        request = RequestFactory().get('/harvests/')
+        request.user = member
+        request.session = SessionStore()
+        request.session['organization_id'] = '999'
+
+        with django_assert_num_queries(0):
+            response = process(request, tenant_exempt(lambda request: HttpResponse('ok')))
+
+        assert response.status_code == 200
+        assert not hasattr(request, 'organization')
+
+    def test_header_resolver(self, member, organization, run_middleware):
+        request, response = run_middleware(
+            member, session_organization=None, X_Organization=str(organization.pk)
+        )
+        assert request.organization == organization
+
+        request, response = run_middleware(member, X_Organization='999')
+        assert response.status_code == 403
+        assert not hasattr(request, 'organization')
+
+    @override_settings(
+        TENANT_RESOLVERS=['core.middleware.tenant_middleware.SubdomainTenantResolver'],
+        TENANT_BASE_DOMAIN='vinco.example',
+        ALLOWED_HOSTS=['.vinco.example']
+    )
+    def test_subdomain_resolver(self, member, organization, run_middleware, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            request, response = run_middleware(member, HOST='test-winery.vinco.example')
+        assert request.organization == organization
+
+        with django_assert_num_queries(0):
+            request, response = run_middleware(member, HOST='test-winery.vinco.example')
+        assert request.organization == organization
+
+        request, response = run_middleware(member, HOST='other.vinco.example')
+        assert response.status_code == 403
+
+    @pytest.mark.parametrize('path, excluded', [
+        ('/static/css/app.css', True),
+        ('/admin/', True),
+        ('/favicon.ico', True),
+        ('/favicon.ico.bak', False),
+        ('/harvests/', False),
+    ])
+    def test_excluded_paths(self, path, excluded):
+        assert bool(EXCLUDED_PATH_RE.match(path)) == excluded
+
+    def test_benchmark_command(self, member, organization):
+        out = StringIO()
+
+        call_command(
+            'benchmark_tenant_middleware', '--user', member.username,
+            '--organization', str(organization.pk), '--iterations', '5', stdout=out
+        )
+
+        assert 'cold cache' in out.getvalue()
+        assert 'warm cache: ' in out.getvalue()
+        assert '0.00 queries/request' in out.getvalue()
@@ -0,0 +1,79 @@
+"""
+Tests for filling in the organization of tenant model instances.
+"""
+
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from cellars.models import Cellar, Tank, TankHistory
+from core.models import tenant_context
+from organizations.models import OrganizationUser
+
+@pytest.fixture
+def user(tenant_client):
+    _, user = tenant_client
+    return user
+
+@pytest.fixture
+def tank(user, organization):
+    cellar = Cellar.objects.create(
+        name='Test Cellar', location='Test Location', organization=organization, created_by=user
+    )
+    return Tank.objects.create(
+        cellar=cellar, name='Tank 1', capacity=Decimal('1000'), organization=organization, created_by=user
+    )
+
+def organization_queries(queries):
+    return [query for query in queries.captured_queries if 'organizations_organizationuser' in query['sql']]
+
+@pytest.mark.django_db
+class TestOrganizationPropagation:
+    """Test cases for TenantModel.save() and TenantManager.bulk_create()."""
+
+    def test_organization_comes_from_parent(self, tank, user):
+        with CaptureQueriesContext(connection) as queries:
+            entry = TankHistory.objects.create(
+                tank=tank, operation_type='adjustment', date=date(2025, 9, 1),
+                volume=Decimal('10'), created_by=user
+            )
+
+        assert entry.organization_id == tank.organization_id
+        assert organization_queries(queries) == []
+
+    def test_organization_comes_from_request(self, user, organization, create_user):
+        stranger = create_user(username='stranger', email='stranger@example.com')
+
+        with tenant_context(organization), CaptureQueriesContext(connection) as queries:
+            cellar = Cellar.objects.create(name='Cellar', location='Road', created_by=stranger)
+
+        assert cellar.organization == organization
+        assert organization_queries(queries) == []
+
+    def test_primary_organization_is_cached(self, user, organization):
+        with CaptureQueriesContext(connection) as queries:
+            for i in range(3):
+                cellar = Cellar.objects.create(name=f'Cellar {i}', location='Road', created_by=user)
+
+        assert cellar.organization == organization
+        assert len(organization_queries(queries)) == 1
+
+        OrganizationUser.objects.filter(user=user).delete()
+        assert Cellar.objects.create(name='Orphan', location='Road', created_by=user).organization is None
+
+    def test_bulk_create_fills_batch_with_one_query(self, user, organization, create_user):
+        others = [create_user(username=f'user{i}', email=f'user{i}@example.com') for i in range(3)]
+        for other in others:
+            OrganizationUser.objects.create(
+                organization=organization, user=other, role='member', is_primary=True, created_by=other
+            )
+
+        with CaptureQueriesContext(connection) as queries:
+            cellars = Cellar.objects.bulk_create([
+                Cellar(name=f'Cellar {i}', location='Road', created_by=creator)
+                for i, creator in enumerate([user] + others * 5)
+            ])
+
+        assert {cellar.organization_id for cellar in cellars} == {organization.pk}
+        assert len(organization_queries(queries)) == 1
@@ -1,8 +1,11 @@
 from django.urls import path
-from .views.dashboard import DashboardView
+from .views.dashboard import DashboardStatsView, DashboardView
+from .views.metrics import cache_metrics
 
 app_name = 'core'
 
 urlpatterns = [
     path('dashboard/', DashboardView.as_view(), name='dashboard'),  # Only keep one dashboard URL
+    path('dashboard/stats/', DashboardStatsView.as_view(), name='dashboard_stats'),
+    path('metrics/cache/', cache_metrics, name='cache_metrics'),
 ]
@@ -0,0 +1,122 @@
+"""
+Keyset pagination utilities.
+
+Keyset (seek) pagination filters on the ordering columns of the last row of the
+previous page instead of using OFFSET, so every page costs the same index range
+scan no matter how deep into the result set it is.
+"""
+
+import base64
+import json
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+from django.db.models import Q, QuerySet
+
+@dataclass
+class KeysetPage:
+    """A page of results and the cursor of the page after it."""
+    items: List
+    next_cursor: Optional[str]
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+def _get_field(queryset: QuerySet, name: str):
+    """Return the model field for an ordering entry such as '-date' or 'pk'."""
+    opts = queryset.model._meta
+    name = name.lstrip('-')
+    return opts.pk if name == 'pk' else opts.get_field(name)
+
+def encode_cursor(values: Sequence) -> str:
+    """
+    Encode ordering values into an opaque URL-safe cursor.
+
+    Args:
+        values: Values of the ordering fields of the last row on a page
+
+    Returns:
+        str: The cursor
+    """
+    # isoformat() keeps the microseconds that DjangoJSONEncoder would truncate,
+    # which the row comparison needs to be exact
+    payload = json.dumps(
+        list(values),
+        default=lambda value: value.isoformat() if hasattr(value, 'isoformat') else str(value)
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor: str, queryset: QuerySet, ordering: Sequence[str]) -> list:
+    """
+    Decode a cursor back into Python values for the ordering fields.
+
+    Args:
+        cursor: Cursor produced by encode_cursor()
+        queryset: Queryset the cursor belongs to
+        ordering: Ordering field names, optionally prefixed with '-'
+
+    Returns:
+        list: A value per ordering field
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(values, list) or len(values) != len(ordering):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+    try:
+        return [
+            _get_field(queryset, name).to_python(value)
+            for name, value in zip(ordering, values)
+        ]
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+def keyset_paginate(queryset: QuerySet, ordering: Sequence[str], cursor: Optional[str] = None,
+                    page_size: int = 50) -> KeysetPage:
+    """
+    Return one page of a queryset using keyset pagination.
+
+    The ordering must end in a unique field (usually 'pk' or '-pk') so that rows
+    with equal sort values are neither skipped nor repeated.
+
+    Args:
+        queryset: Queryset to paginate
+        ordering: Ordering field names, optionally prefixed with '-'
+        cursor: Cursor of the page to return; the first page if omitted
+        page_size: Maximum number of rows per page
+
+    Returns:
+        KeysetPage: The rows of the page and the cursor of the next page
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset, ordering)
+        # (a, b, c) after (x, y, z) == a > x OR (a = x AND b > y) OR ...
+        after = Q()
+        for i, name in enumerate(ordering):
+            field = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            condition = Q(**{f'{field}__{lookup}': values[i]})
+            for prior, value in zip(ordering[:i], values[:i]):
+                condition &= Q(**{prior.lstrip('-'): value})
+            after |= condition
+        queryset = queryset.filter(after)
+
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        last = items[-1]
+        next_cursor = encode_cursor([
+            getattr(last, _get_field(queryset, name).attname) for name in ordering
+        ])
+    return KeysetPage(items=items, next_cursor=next_cursor)
@@ -1,11 +1,8 @@
-from django.shortcuts import render
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.http import JsonResponse
+from django.views import View
 from django.views.generic import TemplateView
+from core.services import get_dashboard_stats
 from core.views.mixins import TenantViewMixin
-from vineyards.models import Vineyard
-from harvests.models import Harvest
-from cellars.models import Cellar
-from packaging.models import Bottle, Label, Closure, Box
 import logging
 
 logger = logging.getLogger(__name__)
@@ -21,20 +18,8 @@ class DashboardView(TenantViewMixin, TemplateView):
         try:
             # Get organization from request (set by TenantViewMixin)
             organization = self.request.organization
-            logger.info(f"Getting dashboard data for organization: {organization.name}")
-            
-            # Get counts for each model
-            context['vineyard_count'] = Vineyard.objects.filter(organization=organization).count()
-            context['active_harvests'] = Harvest.objects.filter(organization=organization, is_active=True).count()
-            context['cellar_count'] = Cellar.objects.filter(organization=organization).count()
-            
-            # Get packaging counts
-            context['bottle_count'] = Bottle.objects.filter(organization=organization).count()
-            context['label_count'] = Label.objects.filter(organization=organization).count()
-            context['closure_count'] = Closure.objects.filter(organization=organization).count()
-            context['box_count'] = Box.objects.filter(organization=organization).count()
-            
-            logger.info(f"Dashboard data: {context}")
+            context.update(get_dashboard_stats(organization))
+            logger.debug(f"Dashboard data loaded for organization: {organization.pk}")
             
         except Exception as e:
             logger.error(f"Error getting dashboard data: {str(e)}")
@@ -43,4 +28,11 @@ class DashboardView(TenantViewMixin, TemplateView):
         context['title'] = 'Dashboard'
         return context
 
+class DashboardStatsView(TenantViewMixin, View):
+    """
+    Return the dashboard statistics as JSON, so the dashboard can refresh them in place.
+    """
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(get_dashboard_stats(request.organization))
+
 dashboard = DashboardView.as_view()
@@ -0,0 +1,12 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from core.cache import get_cache_stats
+from core.middleware.tenant_middleware import tenant_exempt
+
+@tenant_exempt
+@staff_member_required
+def cache_metrics(request):
+    """
+    Return the data cache hits, misses and hit rate of this worker process as JSON.
+    """
+    return JsonResponse(get_cache_stats())
@@ -1,4 +1,5 @@
 from django import forms
+from core.forms import TenantFormMixin
 from django.core.exceptions import ValidationError
 from crispy_forms.helper import FormHelper
 from crispy_forms.layout import Layout, Row, Column, Div, HTML, Submit, Button
@@ -8,7 +9,7 @@ from vineyards.models import Vineyard
 from django.utils import timezone
 from django.db import models
 
-class HarvestForm(forms.ModelForm):
+class HarvestForm(TenantFormMixin, forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.helper = FormHelper()
@@ -91,7 +92,17 @@ class HarvestForm(forms.ModelForm):
                     )
         return cleaned_data
 
-class HarvestAllocationForm(forms.ModelForm):
+class HarvestAllocationSplitForm(forms.Form):
+    """Date of a pressing split across several tanks."""
+    allocation_date = forms.DateField(
+        widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'})
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['allocation_date'].initial = timezone.localdate()
+
+class HarvestAllocationForm(TenantFormMixin, forms.ModelForm):
     class Meta:
         model = HarvestAllocation
         fields = ['harvest', 'tank', 'allocated_volume', 'allocation_date']
@@ -143,7 +154,7 @@ class HarvestAllocationForm(forms.ModelForm):
             # Check harvest available juice
             available_juice = harvest.available_juice
             if self.instance.pk:  # For updates, add back this allocation's current volume
-                available_juice += float(self.instance.allocated_volume)
+                available_juice += self.instance.allocated_volume
 
             if allocated_volume > available_juice:
                 raise ValidationError({
@@ -0,0 +1,73 @@
+import json
+from pathlib import Path
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from core.models import tenant_context
+from organizations.models import Organization
+from harvests.services import import_deliveries, parse_deliveries
+
+class Command(BaseCommand):
+    help = 'Import a weighbridge batch of grape deliveries from a CSV or JSON file as harvests'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON file with one delivery per row')
+        parser.add_argument(
+            '--organization',
+            type=int,
+            required=True,
+            help='ID of the organization the harvests belong to',
+        )
+        parser.add_argument(
+            '--user',
+            required=True,
+            help='Username recorded as the creator of the harvests',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'json'],
+            help='Format of the file (default: from the file extension)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of harvests inserted per query (default: 1000)',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the result as JSON',
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        data_format = options['format'] or path.suffix.lstrip('.').lower()
+        try:
+            organization = Organization.objects.get(pk=options['organization'])
+            user = get_user_model().objects.get(username=options['user'])
+        except (Organization.DoesNotExist, get_user_model().DoesNotExist) as e:
+            raise CommandError(str(e))
+
+        try:
+            rows = parse_deliveries(path.read_bytes(), data_format)
+            # Route the import to the organization's database, as a request would
+            with tenant_context(organization):
+                result = import_deliveries(rows, organization, user, chunk_size=options['chunk_size'])
+        except (OSError, ValidationError) as e:
+            raise CommandError(f'Could not import {path}: {e}')
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'created': len(result.created),
+                'errors': result.errors,
+            }, indent=2))
+            return
+
+        for error in result.errors:
+            details = '; '.join(f'{name}: {message}' for name, message in error['errors'].items())
+            self.stdout.write(self.style.WARNING(f"Row {error['row']}: {details}"))
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {len(result.created)} harvests'))
+        if result.errors:
+            self.stdout.write(self.style.ERROR(f'{len(result.errors)} rows rejected'))
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def add_notes_trigram_index(apps, schema_editor):
+    """
+    Index harvest notes for the list search's icontains lookups.
+
+    Only PostgreSQL has trigram indexes; other databases keep the LIKE scan.
+    icontains compiles to UPPER(notes::text) LIKE UPPER(%s), so the index is built
+    over the same expression.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS harvest_notes_trgm_idx '
+        'ON harvests_harvest USING gin ((UPPER(notes::text)) gin_trgm_ops)'
+    )
+
+
+def remove_notes_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS harvest_notes_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('harvests', '0010_harvest_organization_harvestallocation_organization_and_more'),
+        ('organizations', '0001_initial'),
+        ('vineyards', '0018_load_initial_grape_varieties'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='harvest',
+            index=models.Index(fields=['organization', '-date', '-created_at'], name='harvest_org_date_idx'),
+        ),
+        migrations.RunPython(add_notes_trigram_index, remove_notes_trigram_index),
+    ]
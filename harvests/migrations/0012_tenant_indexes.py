@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cellars', '0014_tenant_indexes'),
+        ('harvests', '0011_harvest_list_indexes'),
+        ('organizations', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='harvestallocation',
+            index=models.Index(fields=['organization', '-allocation_date', '-created_at'], name='allocation_org_date_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def build_vintage_summaries(apps, schema_editor):
+    Harvest = apps.get_model('harvests', 'Harvest')
+    HarvestVintageSummary = apps.get_model('harvests', 'HarvestVintageSummary')
+
+    rows = Harvest.objects.exclude(organization=None).order_by().values('organization_id', 'date__year').annotate(
+        count=Count('id'),
+        quantity=Sum('quantity'),
+        juice_yield=Sum('juice_yield')
+    )
+    HarvestVintageSummary.objects.bulk_create([
+        HarvestVintageSummary(
+            organization_id=row['organization_id'],
+            vintage=row['date__year'],
+            harvest_count=row['count'],
+            total_quantity=row['quantity'] or 0,
+            total_juice_yield=row['juice_yield'] or 0
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('harvests', '0012_tenant_indexes'),
+        ('organizations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HarvestVintageSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vintage', models.PositiveSmallIntegerField(help_text='Year of the harvests')),
+                ('harvest_count', models.PositiveIntegerField(default=0)),
+                ('total_quantity', models.DecimalField(decimal_places=2, default=0, help_text='Harvested grapes in kilograms', max_digits=14)),
+                ('total_juice_yield', models.DecimalField(decimal_places=2, default=0, help_text='Pressed juice in liters', max_digits=14)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='harvest_vintage_summaries', to='organizations.organization')),
+            ],
+            options={
+                'verbose_name': 'Harvest Vintage Summary',
+                'verbose_name_plural': 'Harvest Vintage Summaries',
+                'ordering': ['organization', '-vintage'],
+                'constraints': [models.UniqueConstraint(fields=('organization', 'vintage'), name='harvest_summary_org_vintage_uniq')],
+            },
+        ),
+        migrations.RunPython(build_vintage_summaries, migrations.RunPython.noop),
+    ]
@@ -6,17 +6,41 @@ of juice to different tanks. It handles harvest details, pressing information, a
 throughout the production process.
 """
 
-from django.db import models
+from django.db import models, transaction
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
-from core.models import TenantModel
+from core.db_routers import tenant_db
+from core.models import TenantManager, TenantModel, TenantQuerySet
 from vineyards.models import Vineyard
 from decimal import Decimal
-from django.db.models import Sum
-from django.db.models.signals import pre_delete
+from django.db.models import Count, DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+from django.db.models.signals import post_delete, pre_delete
 from django.dispatch import receiver
 
+class HarvestQuerySet(TenantQuerySet):
+    """Custom queryset for harvests."""
+
+    def with_allocation_totals(self):
+        """
+        Annotate each harvest with the total volume allocated from it.
+
+        The annotation fills Harvest.allocated_juice, so allocated_juice,
+        available_juice and remaining_juice don't query per harvest.
+
+        Returns:
+            HarvestQuerySet: Queryset annotated with allocated_juice
+        """
+        return self.annotate(
+            allocated_juice=Coalesce(
+                Sum('allocations__allocated_volume'),
+                Value(Decimal('0')),
+                output_field=DecimalField(max_digits=12, decimal_places=2)
+            )
+        )
+
 class Harvest(TenantModel):
     """
     Represents a grape harvest event in the wine production process.
@@ -126,17 +150,40 @@ class Harvest(TenantModel):
         """Return a string representation of the harvest."""
         return f"{self.vineyard.name} - {self.date}"
 
+    objects = TenantManager.from_queryset(HarvestQuerySet)()
+
+    @cached_property
+    def allocated_juice(self):
+        """
+        Total juice volume allocated to tanks in liters.
+
+        Filled by HarvestQuerySet.with_allocation_totals(); queried once per
+        instance otherwise.
+        """
+        return self.allocations.aggregate(
+            total=Sum('allocated_volume')
+        )['total'] or Decimal('0')
+
     @property
     def available_juice(self):
         """Calculate available juice volume that can still be allocated."""
         if not self.juice_yield:
-            return 0
-            
-        allocated = self.allocations.aggregate(
-            total=Sum('allocated_volume')
-        )['total'] or 0
-        
-        return float(self.juice_yield) - float(allocated)
+            return Decimal('0')
+        return self.juice_yield - self.allocated_juice
+
+    @property
+    def remaining_juice(self):
+        """Alias of available_juice used by the templates and cellar forms."""
+        return self.available_juice
+
+    @property
+    def is_allocated(self):
+        """Whether all of the pressed juice has been allocated to tanks."""
+        return bool(self.juice_yield) and self.available_juice <= 0
+
+    def reset_allocation_totals(self):
+        """Forget the cached allocation totals after allocations change."""
+        self.__dict__.pop('allocated_juice', None)
 
     def clean(self):
         """
@@ -155,9 +202,7 @@ class Harvest(TenantModel):
 
             # For existing harvests, check if reducing quantity would go below allocated volume
             if self.pk:
-                allocated_volume = self.allocations.aggregate(
-                    total=Sum('allocated_volume')
-                )['total'] or 0
+                allocated_volume = self.allocated_juice
 
                 if self.juice_yield < allocated_volume:
                     raise ValidationError(
@@ -167,14 +212,192 @@ class Harvest(TenantModel):
         if self.vineyard.organization != self.organization:
             raise ValidationError('Vineyard must belong to the same organization')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields() & {'organization_id', 'date', 'quantity', 'juice_yield'}:
+            instance._summary_state = instance._get_summary_state()
+        return instance
+
+    def _get_summary_state(self):
+        """Return the (organization_id, vintage, quantity, juice_yield) the vintage summaries count."""
+        return (self.organization_id, self.date.year, self.quantity, self.juice_yield or 0)
+
     def save(self, *args, **kwargs):
+        """Save the harvest and move its totals between vintage summaries in one transaction."""
         self.full_clean()
-        super().save(*args, **kwargs)
+        old_state = None if self._state.adding else getattr(self, '_summary_state', None)
+        if not self._state.adding and old_state is None:
+            old_state = Harvest.objects.filter(pk=self.pk).values_list(
+                'organization_id', 'date__year', 'quantity', 'juice_yield'
+            ).first()
+        with transaction.atomic(using=tenant_db(self.organization_id)):
+            super().save(*args, **kwargs)
+            new_state = self._get_summary_state()
+            HarvestVintageSummary.objects.apply_harvest_change(old_state, new_state)
+        self._summary_state = new_state
 
     class Meta:
         ordering = ['-date', '-created_at']
         verbose_name = 'Harvest'
         verbose_name_plural = 'Harvests'
+        indexes = [
+            # Serves the keyset-paginated harvest list of an organization
+            models.Index(fields=['organization', '-date', '-created_at'], name='harvest_org_date_idx'),
+        ]
+
+@receiver(post_delete, sender=Harvest)
+def remove_harvest_from_summary(sender, instance, **kwargs):
+    """Subtract a deleted harvest from its vintage summary."""
+    state = getattr(instance, '_summary_state', None) or instance._get_summary_state()
+    HarvestVintageSummary.objects.apply_harvest_change(state, None)
+
+class HarvestVintageSummaryManager(models.Manager):
+    """
+    Manager that maintains the per-organization, per-vintage harvest totals.
+
+    Every change is applied as an F() expression UPDATE so concurrent writers
+    never overwrite each other's totals.
+    """
+
+    def apply_delta(self, organization_id, vintage, harvests=0, quantity=0, juice_yield=0, create=True):
+        """
+        Add the given deltas to the summary of one vintage.
+
+        Args:
+            organization_id: ID of the organization
+            vintage: Year of the harvests
+            harvests: Change in the number of harvests
+            quantity: Change in harvested grapes in kilograms
+            juice_yield: Change in pressed juice in liters
+            create: Create the summary row if it's missing
+        """
+        if organization_id is None or not (harvests or quantity or juice_yield):
+            return
+        rows = self.filter(organization_id=organization_id, vintage=vintage)
+        changes = {
+            'harvest_count': F('harvest_count') + harvests,
+            'total_quantity': F('total_quantity') + quantity,
+            'total_juice_yield': F('total_juice_yield') + juice_yield,
+        }
+        if not rows.update(**changes) and create:
+            self.get_or_create(organization_id=organization_id, vintage=vintage)
+            rows.update(**changes)
+        # update() sends no signals, so invalidate the cached totals here
+        from core.cache import invalidate
+        invalidate(self.model, organization_id)
+
+    def apply_harvest_change(self, old_state, new_state):
+        """
+        Apply the deltas between two Harvest summary states.
+
+        Args:
+            old_state: (organization_id, vintage, quantity, juice_yield) before the
+                change, or None for a new harvest
+            new_state: The same tuple after the change, or None for a deleted harvest
+        """
+        if old_state and new_state and old_state[:2] == new_state[:2]:
+            self.apply_delta(
+                *new_state[:2],
+                quantity=new_state[2] - old_state[2],
+                juice_yield=new_state[3] - old_state[3]
+            )
+            return
+        if old_state:
+            self.apply_delta(*old_state[:2], harvests=-1, quantity=-old_state[2],
+                             juice_yield=-old_state[3], create=False)
+        if new_state:
+            self.apply_delta(*new_state[:2], harvests=1, quantity=new_state[2], juice_yield=new_state[3])
+
+    def apply_new_harvests(self, harvests):
+        """
+        Add harvests created with bulk_create, with one update per vintage.
+
+        Args:
+            harvests: The created Harvest instances
+        """
+        deltas = {}
+        for harvest in harvests:
+            key = (harvest.organization_id, harvest.date.year)
+            count, quantity, juice_yield = deltas.get(key, (0, 0, 0))
+            deltas[key] = (count + 1, quantity + harvest.quantity, juice_yield + (harvest.juice_yield or 0))
+        for (organization_id, vintage), (count, quantity, juice_yield) in deltas.items():
+            self.apply_delta(organization_id, vintage, count, quantity, juice_yield)
+
+    def rebuild(self, organization_ids=None):
+        """
+        Recompute the summaries from the Harvest table.
+
+        Args:
+            organization_ids: Only rebuild these organizations; all if omitted
+
+        Returns:
+            int: Number of summary rows written
+        """
+        harvests = Harvest.all_objects.all()
+        if organization_ids is not None:
+            harvests = harvests.filter(organization_id__in=organization_ids)
+        rows = harvests.order_by().values('organization_id', 'date__year').annotate(
+            count=Count('id'), quantity=Sum('quantity'), juice_yield=Sum('juice_yield')
+        )
+        summaries = [
+            self.model(
+                organization_id=row['organization_id'],
+                vintage=row['date__year'],
+                harvest_count=row['count'],
+                total_quantity=row['quantity'] or 0,
+                total_juice_yield=row['juice_yield'] or 0
+            )
+            for row in rows if row['organization_id'] is not None
+        ]
+        existing = self.all()
+        if organization_ids is not None:
+            existing = existing.filter(organization_id__in=organization_ids)
+        with transaction.atomic(using=tenant_db()):
+            existing.delete()
+            self.bulk_create(summaries)
+        from core.cache import invalidate
+        for organization_id in {summary.organization_id for summary in summaries}:
+            invalidate(self.model, organization_id)
+        return len(summaries)
+
+class HarvestVintageSummary(models.Model):
+    """
+    Denormalized harvest totals of one organization and vintage.
+
+    Maintained in the same transaction as every change to a harvest's
+    organization, date, quantity or juice yield, so totals over any amount of
+    harvest history are read from a handful of rows. Harvests changed with
+    QuerySet.update() bypass it; call objects.rebuild() afterwards.
+    """
+    organization = models.ForeignKey(
+        'organizations.Organization',
+        on_delete=models.CASCADE,
+        related_name='harvest_vintage_summaries'
+    )
+    vintage = models.PositiveSmallIntegerField(help_text="Year of the harvests")
+    harvest_count = models.PositiveIntegerField(default=0)
+    total_quantity = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0,
+        help_text="Harvested grapes in kilograms"
+    )
+    total_juice_yield = models.DecimalField(
+        max_digits=14, decimal_places=2, default=0,
+        help_text="Pressed juice in liters"
+    )
+
+    objects = HarvestVintageSummaryManager()
+
+    def __str__(self):
+        return f"{self.organization_id} {self.vintage}: {self.total_quantity} kg"
+
+    class Meta:
+        ordering = ['organization', '-vintage']
+        verbose_name = 'Harvest Vintage Summary'
+        verbose_name_plural = 'Harvest Vintage Summaries'
+        constraints = [
+            models.UniqueConstraint(fields=['organization', 'vintage'], name='harvest_summary_org_vintage_uniq'),
+        ]
 
 class HarvestAllocation(TenantModel):
     """
@@ -239,12 +462,14 @@ class HarvestAllocation(TenantModel):
         if self.allocated_volume <= 0:
             raise ValidationError("Allocated volume must be greater than 0")
 
+        # Values as stored before this change, for updates
+        loaded = self._get_loaded_state() if self.pk else None
+
         # Check if allocation exceeds available juice
         if self.harvest:
             available = self.harvest.available_juice
-            if self.pk:  # For updates, add back this allocation's current volume
-                current = HarvestAllocation.objects.get(pk=self.pk)
-                available += current.allocated_volume
+            if loaded and loaded[0] == self.harvest_id:  # Add back this allocation's current volume
+                available += loaded[2]
 
             if self.allocated_volume > available:
                 raise ValidationError(
@@ -252,12 +477,10 @@ class HarvestAllocation(TenantModel):
                 )
 
         # Check if allocation would exceed tank capacity
-        from cellars.models import Tank
         if self.tank:
             current_volume = self.tank.current_volume
-            if self.pk:  # For updates, subtract this allocation's current volume
-                current = HarvestAllocation.objects.get(pk=self.pk)
-                current_volume -= current.allocated_volume
+            if loaded and loaded[1] == self.tank_id:  # Subtract this allocation's current volume
+                current_volume -= loaded[2]
 
             if current_volume + self.allocated_volume > self.tank.capacity:
                 raise ValidationError(
@@ -269,8 +492,36 @@ class HarvestAllocation(TenantModel):
         if self.tank.organization != self.organization:
             raise ValidationError('Tank must belong to the same organization')
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields() & {'harvest_id', 'tank_id', 'allocated_volume'}:
+            instance._loaded_state = (instance.harvest_id, instance.tank_id, instance.allocated_volume)
+        return instance
+
+    def _get_loaded_state(self):
+        """
+        Return the (harvest_id, tank_id, allocated_volume) stored in the database,
+        querying only when the instance wasn't loaded with them.
+        """
+        loaded = getattr(self, '_loaded_state', None)
+        if loaded is None:
+            loaded = HarvestAllocation.objects.filter(pk=self.pk).values_list(
+                'harvest_id', 'tank_id', 'allocated_volume'
+            ).first()
+        return loaded
+
     def save(self, *args, **kwargs):
-        """Save the allocation and update the tank's volume."""
+        """
+        Save the allocation and update the tank's volume.
+
+        Runs in a single transaction so the allocation, tank volumes, history and
+        cellar volume rollups are committed together.
+        """
+        with transaction.atomic(using=tenant_db(self.organization_id)):
+            self._save(*args, **kwargs)
+
+    def _save(self, *args, **kwargs):
         from cellars.models import Tank, TankHistory
         
         is_new = self.pk is None
@@ -290,6 +541,7 @@ class HarvestAllocation(TenantModel):
                     date=self.allocation_date,
                     volume=-float(old_allocation.allocated_volume),
                     harvest=self.harvest,
+                    allocation=self,
                     created_by=self.updated_by or self.created_by,
                     notes=f"Removed allocation of {old_allocation.allocated_volume}L"
                 )
@@ -304,6 +556,7 @@ class HarvestAllocation(TenantModel):
                         date=self.allocation_date,
                         volume=float(self.allocated_volume),
                         harvest=self.harvest,
+                        allocation=self,
                         created_by=self.updated_by or self.created_by,
                         notes=f"Added allocation of {self.allocated_volume}L"
                     )
@@ -322,10 +575,14 @@ class HarvestAllocation(TenantModel):
                 date=self.allocation_date,
                 volume=float(self.allocated_volume),
                 harvest=self.harvest,
+                allocation=self,
                 created_by=self.updated_by or self.created_by,
                 notes=f"{'Added' if is_new else 'Updated'} allocation of {self.allocated_volume}L"
             )
 
+        self._loaded_state = (self.harvest_id, self.tank_id, self.allocated_volume)
+        self.harvest.reset_allocation_totals()
+
     def __str__(self):
         return f"{self.allocated_volume}L from {self.harvest} to {self.tank}"
 
@@ -333,6 +590,12 @@ class HarvestAllocation(TenantModel):
         ordering = ['-allocation_date', '-created_at']
         verbose_name = 'Harvest Allocation'
         verbose_name_plural = 'Harvest Allocations'
+        indexes = [
+            models.Index(
+                fields=['organization', '-allocation_date', '-created_at'],
+                name='allocation_org_date_idx'
+            ),
+        ]
 
 @receiver(pre_delete, sender=HarvestAllocation)
 def remove_allocation_from_tank(sender, instance, **kwargs):
@@ -349,6 +612,8 @@ def remove_allocation_from_tank(sender, instance, **kwargs):
         date=instance.allocation_date,
         volume=-float(instance.allocated_volume),
         harvest=instance.harvest,
+        allocation=instance,
         created_by=instance.updated_by or instance.created_by,
         notes=f"Removed allocation of {instance.allocated_volume}L (allocation deleted)"
     )
+    instance.harvest.reset_allocation_totals()
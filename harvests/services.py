@@ -0,0 +1,287 @@
+"""
+Services for recording harvests and juice allocations in bulk.
+
+Weighbridge batches can hold thousands of grape deliveries. Instead of saving
+and fully validating each harvest on its own, a batch is validated in one pass
+against vineyards fetched with a single query and inserted with chunked
+bulk_create calls. Splitting a pressing across tanks works the same way: the
+harvest and tanks are locked once and every allocation is written in bulk.
+"""
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Dict, List
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from cellars.models import Tank, TankHistory
+from cellars.services import lock_tanks, update_tank_volumes
+from core.cache import get_or_set
+from core.db_routers import tenant_db
+from vineyards.models import Vineyard
+from .models import Harvest, HarvestAllocation, HarvestVintageSummary
+
+# Delivery columns that map directly onto Harvest fields
+DELIVERY_FIELDS = [
+    'date', 'quantity', 'juice_yield', 'price_per_kg', 'vat_per_kg',
+    'crushing_date', 'notes', 'pressing_notes',
+]
+REQUIRED_FIELDS = ['vineyard', 'date', 'quantity']
+
+@dataclass
+class IntakeResult:
+    """Outcome of a bulk harvest intake."""
+    created: List[Harvest] = field(default_factory=list)
+    errors: List[Dict] = field(default_factory=list)
+
+def parse_deliveries(data, data_format):
+    """
+    Parse a batch of deliveries from CSV or JSON.
+
+    Args:
+        data: The raw batch, as str or bytes
+        data_format: 'csv' or 'json'
+
+    Returns:
+        list: A dict per delivery
+
+    Raises:
+        ValidationError: If the batch cannot be parsed
+    """
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+
+    if data_format == 'csv':
+        return list(csv.DictReader(io.StringIO(data)))
+    if data_format == 'json':
+        try:
+            rows = json.loads(data)
+        except ValueError as e:
+            raise ValidationError(f"Invalid JSON: {e}")
+        if isinstance(rows, dict):
+            rows = rows.get('deliveries')
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValidationError("Expected a list of delivery objects")
+        return rows
+    raise ValidationError(f"Unsupported format: {data_format}")
+
+def _clean_delivery(row, vineyards):
+    """
+    Validate one delivery and convert its values to Harvest field values.
+
+    Args:
+        row: Dict of delivery values
+        vineyards: Vineyards of the organization keyed by ID
+
+    Returns:
+        tuple: (dict of field values, dict of errors keyed by field)
+    """
+    errors = {}
+    values = {}
+    for name in REQUIRED_FIELDS:
+        if row.get(name) in (None, ''):
+            errors[name] = 'This field is required.'
+
+    vineyard_id = row.get('vineyard')
+    if 'vineyard' not in errors:
+        try:
+            values['vineyard'] = vineyards[int(vineyard_id)]
+        except (KeyError, TypeError, ValueError):
+            errors['vineyard'] = f'Unknown vineyard: {vineyard_id}'
+
+    for name in DELIVERY_FIELDS:
+        value = row.get(name)
+        if value in (None, '') or name in errors:
+            continue
+        model_field = Harvest._meta.get_field(name)
+        try:
+            values[name] = model_field.to_python(value)
+            model_field.run_validators(values[name])
+        except ValidationError as e:
+            errors[name] = ' '.join(e.messages)
+
+    if 'quantity' in values and values['quantity'] <= 0:
+        errors['quantity'] = 'Harvest quantity must be greater than 0'
+
+    return values, errors
+
+def import_deliveries(rows, organization, user, chunk_size=1000):
+    """
+    Validate and record a batch of grape deliveries as harvests.
+
+    Every vineyard the batch refers to is fetched with one query, each row is
+    validated without further queries, and the valid rows are inserted with
+    bulk_create in chunks inside one transaction, together with one vintage
+    summary update per vintage. Invalid rows are reported and skipped; they
+    don't abort the rest of the batch.
+
+    Args:
+        rows: Iterable of dicts with vineyard (ID), date, quantity and optionally
+            juice_yield, price_per_kg, vat_per_kg, crushing_date, notes and
+            pressing_notes
+        organization: Organization that the harvests belong to
+        user: User recording the harvests
+        chunk_size: Number of harvests per INSERT
+
+    Returns:
+        IntakeResult: The created harvests and a dict per invalid row with its
+            1-based row number and field errors
+    """
+    rows = list(rows)
+    vineyard_ids = set()
+    for row in rows:
+        try:
+            vineyard_ids.add(int(row.get('vineyard')))
+        except (TypeError, ValueError):
+            pass
+    # Only the organization's vineyards are valid, which also covers the
+    # vineyard/harvest organization check that Harvest.clean does per row
+    vineyards = Vineyard.objects.filter(organization=organization).in_bulk(vineyard_ids)
+
+    result = IntakeResult()
+    harvests = []
+    for number, row in enumerate(rows, start=1):
+        values, errors = _clean_delivery(row, vineyards)
+        if errors:
+            result.errors.append({'row': number, 'errors': errors})
+            continue
+        harvests.append(Harvest(organization=organization, created_by=user, updated_by=user, **values))
+
+    with transaction.atomic(using=tenant_db(organization)):
+        for start in range(0, len(harvests), chunk_size):
+            result.created.extend(Harvest.objects.bulk_create(harvests[start:start + chunk_size]))
+        HarvestVintageSummary.objects.apply_new_harvests(result.created)
+    return result
+
+def allocate_many(harvest, allocations, date, user):
+    """
+    Split a harvest's juice across several tanks in one operation.
+
+    The harvest and all tanks are locked once and the combined volumes are
+    validated against the locked state before anything is written. The
+    allocations, tank volumes, history rows and cellar rollups are then written
+    with bulk statements, so the query count doesn't grow with the number of
+    tanks.
+
+    Args:
+        harvest: Harvest (or harvest ID) to allocate juice from
+        allocations: Iterable of (tank, volume) tuples, where the tank may be a
+            Tank instance or a tank ID
+        date: Date of the allocations
+        user: User making the allocations
+
+    Returns:
+        list: The created HarvestAllocation instances
+
+    Raises:
+        ValidationError: If a volume is not positive, the allocations exceed the
+            harvest's available juice or a tank's free space, or a tank belongs
+            to another organization
+    """
+    parsed = []
+    passed_tanks = []
+    for tank, volume in allocations:
+        try:
+            volume = Decimal(str(volume))
+        except InvalidOperation:
+            raise ValidationError(f"Invalid allocated volume: {volume}")
+        if volume <= 0:
+            raise ValidationError("Allocated volume must be greater than 0")
+        parsed.append((getattr(tank, 'pk', tank), volume))
+        if isinstance(tank, Tank):
+            passed_tanks.append(tank)
+    if not parsed:
+        raise ValidationError("At least one allocation is required")
+
+    deltas = {}
+    for tank_id, volume in parsed:
+        deltas[tank_id] = deltas.get(tank_id, 0) + volume
+    total = sum(deltas.values())
+
+    try:
+        with transaction.atomic(using=tenant_db(getattr(harvest, 'organization_id', None))):
+            locked = Harvest.objects.select_for_update().get(pk=getattr(harvest, 'pk', harvest))
+            tanks = lock_tanks(deltas)
+
+            errors = []
+            available = locked.available_juice
+            if total > available:
+                errors.append(f"Cannot allocate more than available juice ({available:.2f}L)")
+            for tank_id, delta in deltas.items():
+                tank = tanks[tank_id]
+                if tank.organization_id != locked.organization_id:
+                    errors.append(f"Tank {tank.name} must belong to the same organization")
+                elif tank.current_volume + delta > tank.capacity:
+                    errors.append(
+                        f"Allocation would exceed tank {tank.name}'s capacity. "
+                        f"Available space: {tank.capacity - tank.current_volume:.2f}L"
+                    )
+            if errors:
+                raise ValidationError(errors)
+
+            created = HarvestAllocation.objects.bulk_create([
+                HarvestAllocation(
+                    organization_id=locked.organization_id,
+                    harvest_id=locked.pk,
+                    tank_id=tank_id,
+                    allocated_volume=volume,
+                    allocation_date=date,
+                    created_by=user,
+                    updated_by=user
+                )
+                for tank_id, volume in parsed
+            ])
+            update_tank_volumes(tanks, deltas, user)
+            TankHistory.objects.append([
+                TankHistory(
+                    organization_id=locked.organization_id,
+                    tank_id=allocation.tank_id,
+                    operation_type='allocation',
+                    date=date,
+                    volume=allocation.allocated_volume,
+                    harvest_id=locked.pk,
+                    allocation_id=allocation.pk,
+                    created_by=user,
+                    notes=f"Added allocation of {allocation.allocated_volume}L"
+                )
+                for allocation in created
+            ])
+    except IntegrityError as e:
+        # The tank volume CHECK constraints are the last line of defence
+        raise ValidationError(f"Allocation would violate tank volume limits: {e}")
+
+    # Keep the caller's instances in step with the database
+    if isinstance(harvest, Harvest):
+        harvest.reset_allocation_totals()
+    for tank in passed_tanks:
+        tank.current_volume = tanks[tank.pk].current_volume + deltas[tank.pk]
+        tank._rollup_state = tank._get_rollup_state()
+    return created
+
+def get_harvest_totals(organization):
+    """
+    Return the cached harvest totals of an organization per vintage.
+
+    The totals are read from the HarvestVintageSummary rows, so the cost doesn't
+    grow with the number of harvests, and are cached until a summary changes.
+
+    Args:
+        organization: Organization instance or ID
+
+    Returns:
+        dict: Dicts with harvest_count, total_quantity and total_juice_yield
+            keyed by vintage
+    """
+    organization_id = getattr(organization, 'pk', organization)
+
+    def compute():
+        rows = HarvestVintageSummary.objects.using(tenant_db(organization_id)).filter(
+            organization_id=organization_id
+        ).values('vintage', 'harvest_count', 'total_quantity', 'total_juice_yield')
+        return {row.pop('vintage'): row for row in rows}
+
+    return get_or_set(
+        'harvest_totals', compute, organization=organization_id, depends_on=(HarvestVintageSummary,)
+    )
@@ -1,15 +1,30 @@
 from django import template
-from django.db.models import Sum
-from harvests.models import Harvest
+from harvests.services import get_harvest_totals
 
 register = template.Library()
 
-@register.simple_tag
-def get_total_harvest_quantity():
-    """Return the total quantity of all harvests"""
-    return Harvest.objects.aggregate(total_quantity=Sum('quantity'))['total_quantity'] or 0
+def _harvest_totals(context):
+    """Return the harvest totals of the request's organization, fetched once per request."""
+    request = context.get('request')
+    organization = getattr(request, 'organization', None)
+    if organization is None:
+        return {}
+    if not hasattr(request, '_harvest_totals'):
+        request._harvest_totals = get_harvest_totals(organization)
+    return request._harvest_totals
 
-@register.simple_tag
-def get_total_juice_yield():
-    """Return the total juice yield from all harvests"""
-    return Harvest.objects.aggregate(total_yield=Sum('juice_yield'))['total_yield'] or 0
+def _total(context, field, vintage):
+    totals = _harvest_totals(context)
+    if vintage not in (None, ''):
+        return totals.get(int(vintage), {}).get(field, 0)
+    return sum((row[field] for row in totals.values()), 0)
+
+@register.simple_tag(takes_context=True)
+def get_total_harvest_quantity(context, vintage=None):
+    """Return the total quantity of the organization's harvests, optionally of one vintage"""
+    return _total(context, 'total_quantity', vintage)
+
+@register.simple_tag(takes_context=True)
+def get_total_juice_yield(context, vintage=None):
+    """Return the total juice yield of the organization's harvests, optionally of one vintage"""
+    return _total(context, 'total_juice_yield', vintage)
@@ -0,0 +1,187 @@
+"""
+Tests for splitting a harvest's juice across several tanks and deleting
+allocations again.
+"""
+
+import json
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from cellars.models import Cellar, Tank, TankHistory, CellarVolumeSummary
+from harvests.models import Harvest, HarvestAllocation
+from harvests.services import allocate_many
+from vineyards.models import Vineyard
+
+@pytest.fixture
+def harvest(tenant_client, organization):
+    """Create a harvest with 5000 L of juice."""
+    _, user = tenant_client
+    vineyard = Vineyard.objects.create(
+        name='Test Vineyard',
+        location='Test Location',
+        size=100,
+        ownership_type='owned',
+        grape_variety='merlot',
+        organization=organization,
+        created_by=user
+    )
+    return Harvest.objects.create(
+        vineyard=vineyard,
+        date=date(2025, 9, 15),
+        quantity=Decimal('7000'),
+        juice_yield=Decimal('5000'),
+        organization=organization,
+        created_by=user
+    )
+
+@pytest.fixture
+def make_tank(harvest):
+    """Return a factory for tanks in a test cellar."""
+    cellar = Cellar.objects.create(
+        name='Test Cellar',
+        location='Test Location',
+        organization=harvest.organization,
+        created_by=harvest.created_by
+    )
+    def make(name, capacity=1000, current_volume=0):
+        return Tank.objects.create(
+            cellar=cellar,
+            name=name,
+            capacity=Decimal(capacity),
+            current_volume=Decimal(current_volume),
+            organization=cellar.organization,
+            created_by=cellar.created_by
+        )
+    return make
+
+@pytest.mark.django_db
+class TestAllocateMany:
+    """Test cases for harvests.services.allocate_many()."""
+
+    def test_splits_juice_across_tanks(self, harvest, make_tank):
+        first, second = make_tank('First', current_volume=100), make_tank('Second')
+
+        created = allocate_many(
+            harvest, [(first, '400'), (second.pk, 250), (first, '100.50')],
+            date(2025, 9, 16), harvest.created_by
+        )
+
+        assert len(created) == 3
+        assert first.current_volume == Decimal('600.50')
+        second.refresh_from_db()
+        assert second.current_volume == Decimal('250')
+        assert harvest.available_juice == Decimal('4249.50')
+        history = TankHistory.objects.filter(harvest=harvest, operation_type='allocation')
+        assert sorted(entry.allocation_id for entry in history) == sorted(a.pk for a in created)
+        assert first.volume_as_of(date(2025, 9, 16)) == Decimal('500.50')
+        assert CellarVolumeSummary.objects.verify() == []
+
+    def test_query_count_does_not_grow_with_tanks(self, harvest, make_tank):
+        tanks = [make_tank(f'Tank {i}') for i in range(15)]
+        user = harvest.created_by
+
+        with CaptureQueriesContext(connection) as small:
+            allocate_many(harvest, [(tanks[0], 10)], date(2025, 9, 16), user)
+        with CaptureQueriesContext(connection) as large:
+            allocate_many(harvest, [(tank, 10) for tank in tanks], date(2025, 9, 16), user)
+
+        assert len(large.captured_queries) == len(small.captured_queries)
+        assert HarvestAllocation.objects.count() == 16
+
+    def test_combined_volume_cannot_exceed_available_juice(self, harvest, make_tank):
+        tanks = [make_tank(f'Tank {i}', capacity=3000) for i in range(2)]
+
+        with pytest.raises(ValidationError, match='available juice'):
+            allocate_many(harvest, [(tanks[0], 2600), (tanks[1], 2600)], date(2025, 9, 16),
+                          harvest.created_by)
+
+        assert not HarvestAllocation.objects.exists()
+        assert Tank.objects.filter(current_volume__gt=0).count() == 0
+
+    def test_combined_volume_cannot_exceed_tank_capacity(self, harvest, make_tank):
+        tank = make_tank('Small', capacity=500, current_volume=100)
+
+        with pytest.raises(ValidationError, match='capacity'):
+            allocate_many(harvest, [(tank, 300), (tank, 150)], date(2025, 9, 16), harvest.created_by)
+
+        tank.refresh_from_db()
+        assert tank.current_volume == Decimal('100')
+
+    @pytest.mark.parametrize('allocations', [[], [(1, 0)], [(1, '-5')], [(1, 'lots')]])
+    def test_rejects_invalid_allocations(self, harvest, allocations):
+        with pytest.raises(ValidationError):
+            allocate_many(harvest, allocations, date(2025, 9, 16), harvest.created_by)
+
+@pytest.mark.django_db
+class TestHarvestAllocationSplitView:
+    """Test cases for the allocation split endpoint."""
+
+    def test_json_split(self, tenant_client, harvest, make_tank):
+        client, _ = tenant_client
+        tanks = [make_tank(f'Tank {i}') for i in range(3)]
+        body = {
+            'allocation_date': '2025-09-16',
+            'allocations': [{'tank': tank.pk, 'volume': '300'} for tank in tanks],
+        }
+
+        response = client.post(
+            reverse('harvests:allocation_split', args=[harvest.pk]),
+            json.dumps(body), content_type='application/json'
+        )
+
+        assert response.status_code == 201
+        assert len(response.json()['allocations']) == 3
+        assert Harvest.objects.get(pk=harvest.pk).available_juice == Decimal('4100')
+
+    def test_json_split_errors(self, tenant_client, harvest, make_tank):
+        client, _ = tenant_client
+        tank = make_tank('Tank', capacity=100)
+
+        response = client.post(
+            reverse('harvests:allocation_split', args=[harvest.pk]),
+            json.dumps({'allocation_date': '2025-09-16', 'allocations': [{'tank': tank.pk, 'volume': 200}]}),
+            content_type='application/json'
+        )
+
+        assert response.status_code == 400
+        assert 'capacity' in response.json()['errors'][0]
+        assert not HarvestAllocation.objects.exists()
+
+    def test_form_split_redirects(self, tenant_client, harvest, make_tank):
+        client, _ = tenant_client
+        tanks = [make_tank(f'Tank {i}') for i in range(2)]
+
+        response = client.post(reverse('harvests:allocation_split', args=[harvest.pk]), {
+            'allocation_date': '2025-09-16',
+            'tank': [tank.pk for tank in tanks],
+            'allocated_volume': ['100', '200'],
+        })
+
+        assert response.status_code == 302
+        assert response.url == reverse('harvests:harvest_detail', args=[harvest.pk])
+        assert HarvestAllocation.objects.count() == 2
+
+@pytest.mark.django_db
+class TestHarvestAllocationDeleteView:
+    """Test cases for HarvestAllocationDeleteView."""
+
+    def test_delete_reverses_the_allocation_once(self, tenant_client, harvest, make_tank):
+        client, user = tenant_client
+        tank = make_tank('First')
+        [allocation] = allocate_many(harvest, [(tank, 300)], date(2025, 9, 16), harvest.created_by)
+
+        response = client.post(reverse('harvests:delete_allocation', args=[allocation.pk]))
+
+        assert response.status_code == 302
+        assert not HarvestAllocation.objects.exists()
+        tank.refresh_from_db()
+        assert tank.current_volume == 0
+        # Both entries still point at the deleted allocation and cancel out
+        entries = TankHistory.objects.filter(allocation_id=allocation.pk)
+        assert sorted(entries.values_list('volume', flat=True)) == [Decimal('-300.00'), Decimal('300.00')]
+        assert entries.get(volume__lt=0).created_by == user
+        assert tank.volume_as_of(date(2025, 9, 16)) == 0
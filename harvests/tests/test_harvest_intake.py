@@ -0,0 +1,171 @@
+"""
+Tests for the bulk harvest intake service, endpoint and command.
+"""
+
+import json
+import pytest
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.urls import reverse
+from harvests.models import Harvest
+from harvests.services import import_deliveries, parse_deliveries
+from organizations.models import Organization
+from vineyards.models import Vineyard
+
+@pytest.fixture
+def vineyard(tenant_client, organization):
+    """Create a vineyard of the test organization."""
+    _, user = tenant_client
+    return Vineyard.objects.create(
+        name='Test Vineyard',
+        location='Test Location',
+        size=100,
+        ownership_type='owned',
+        grape_variety='merlot',
+        organization=organization,
+        created_by=user
+    )
+
+@pytest.fixture
+def other_vineyard(create_user):
+    """Create a vineyard of another organization."""
+    owner = create_user(username='otherowner', email='other@example.com')
+    organization = Organization.objects.create(
+        name='Other Winery',
+        slug='other-winery',
+        address='Other Address',
+        tax_number='98765432109',
+        contact_email='other@example.com',
+        contact_phone='111111',
+        created_by=owner
+    )
+    return Vineyard.objects.create(
+        name='Other Vineyard',
+        location='Other Location',
+        size=10,
+        ownership_type='owned',
+        grape_variety='merlot',
+        organization=organization,
+        created_by=owner
+    )
+
+def csv_batch(vineyard, count):
+    lines = ['vineyard,date,quantity,juice_yield,notes']
+    lines += [f'{vineyard.pk},2025-09-{i % 28 + 1:02d},{1000 + i},700,Truck {i}' for i in range(count)]
+    return '\n'.join(lines)
+
+@pytest.mark.django_db
+class TestImportDeliveries:
+    """Test cases for harvests.services.import_deliveries()."""
+
+    def test_imports_batch_with_constant_queries(self, vineyard, organization, tenant_client,
+                                                 django_assert_num_queries):
+        _, user = tenant_client
+        rows = parse_deliveries(csv_batch(vineyard, 250), 'csv')
+
+        # Vineyard lookup, the savepoint and its release, one INSERT per chunk of 50
+        # and creating the vintage summary (update, select, savepoint, insert,
+        # release, update)
+        with django_assert_num_queries(14):
+            result = import_deliveries(rows, organization, user, chunk_size=50)
+
+        assert result.errors == []
+        assert len(result.created) == 250
+        harvest = Harvest.objects.get(notes='Truck 3')
+        assert harvest.quantity == Decimal('1003.00')
+        assert harvest.date == date(2025, 9, 4)
+        assert harvest.organization == organization
+        assert harvest.created_by == user
+
+    def test_invalid_rows_are_reported_and_skipped(self, vineyard, other_vineyard, organization,
+                                                   tenant_client):
+        _, user = tenant_client
+        rows = [
+            {'vineyard': vineyard.pk, 'date': '2025-09-01', 'quantity': '500'},
+            {'vineyard': other_vineyard.pk, 'date': '2025-09-01', 'quantity': '500'},
+            {'vineyard': vineyard.pk, 'date': 'yesterday', 'quantity': '0'},
+            {'vineyard': vineyard.pk, 'quantity': 'lots'},
+            {'vineyard': vineyard.pk, 'date': '2025-09-02', 'quantity': '800', 'juice_yield': '560'},
+        ]
+
+        result = import_deliveries(rows, organization, user)
+
+        assert len(result.created) == 2
+        assert [error['row'] for error in result.errors] == [2, 3, 4]
+        assert 'vineyard' in result.errors[0]['errors']
+        assert set(result.errors[1]['errors']) == {'date', 'quantity'}
+        assert set(result.errors[2]['errors']) == {'date', 'quantity'}
+        assert not Harvest.objects.filter(vineyard=other_vineyard).exists()
+
+    def test_parse_json_batch(self):
+        rows = parse_deliveries(json.dumps({'deliveries': [{'vineyard': 1}]}), 'json')
+        assert rows == [{'vineyard': 1}]
+
+        with pytest.raises(ValidationError):
+            parse_deliveries('{"deliveries": 1}', 'json')
+        with pytest.raises(ValidationError):
+            parse_deliveries('not json', 'json')
+
+@pytest.mark.django_db
+class TestHarvestIntakeView:
+    """Test cases for the harvest intake endpoint."""
+
+    def test_json_batch(self, tenant_client, vineyard):
+        client, _ = tenant_client
+        batch = [
+            {'vineyard': vineyard.pk, 'date': '2025-09-01', 'quantity': 1200.5},
+            {'vineyard': 0, 'date': '2025-09-01', 'quantity': 100},
+        ]
+
+        response = client.post(
+            reverse('harvests:harvest_intake'), json.dumps(batch), content_type='application/json'
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data['created'] == 1
+        assert Harvest.objects.get(pk=data['ids'][0]).quantity == Decimal('1200.50')
+        assert data['errors'] == [{'row': 2, 'errors': {'vineyard': 'Unknown vineyard: 0'}}]
+
+    def test_csv_upload(self, tenant_client, vineyard):
+        client, _ = tenant_client
+        upload = StringIO(csv_batch(vineyard, 5))
+        upload.name = 'weighbridge.csv'
+
+        response = client.post(reverse('harvests:harvest_intake'), {'file': upload})
+
+        assert response.status_code == 200
+        assert response.json()['created'] == 5
+        assert Harvest.objects.count() == 5
+
+    def test_unreadable_batch(self, tenant_client):
+        client, _ = tenant_client
+
+        response = client.post(
+            reverse('harvests:harvest_intake'), 'not json', content_type='application/json'
+        )
+
+        assert response.status_code == 400
+        assert Harvest.objects.count() == 0
+
+@pytest.mark.django_db
+class TestImportHarvestsCommand:
+    """Test cases for the import_harvests management command."""
+
+    def test_imports_file(self, tmp_path, tenant_client, organization, vineyard):
+        _, user = tenant_client
+        path = tmp_path / 'batch.csv'
+        path.write_text(csv_batch(vineyard, 3) + f'\n{vineyard.pk},2025-09-01,-5,0,Bad')
+        out = StringIO()
+
+        call_command(
+            'import_harvests', str(path), '--organization', str(organization.pk),
+            '--user', user.username, '--chunk-size', '2', stdout=out
+        )
+
+        assert Harvest.objects.count() == 3
+        assert 'Row 4: quantity' in out.getvalue()
+        assert 'Imported 3 harvests' in out.getvalue()
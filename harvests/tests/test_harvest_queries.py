@@ -0,0 +1,222 @@
+"""
+Tests for the harvest allocation totals and query counts.
+"""
+
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from cellars.models import Cellar, Tank
+from harvests.models import Harvest, HarvestAllocation
+from vineyards.models import Vineyard
+
+@pytest.fixture
+def harvest(tenant_client, organization):
+    """Create a harvest with 1000 L of juice."""
+    _, user = tenant_client
+    vineyard = Vineyard.objects.create(
+        name='Test Vineyard',
+        location='Test Location',
+        size=100,
+        ownership_type='owned',
+        grape_variety='merlot',
+        organization=organization,
+        created_by=user
+    )
+    return Harvest.objects.create(
+        vineyard=vineyard,
+        date=date(2025, 9, 15),
+        quantity=Decimal('1500'),
+        juice_yield=Decimal('1000'),
+        organization=organization,
+        created_by=user
+    )
+
+@pytest.fixture
+def allocate(harvest):
+    """Return a helper that records allocations without touching tank volumes."""
+    cellar = Cellar.objects.create(
+        name='Test Cellar',
+        location='Test Location',
+        organization=harvest.organization,
+        created_by=harvest.created_by
+    )
+    def add(*volumes):
+        tanks = Tank.objects.bulk_create([
+            Tank(
+                cellar=cellar,
+                name=f'Tank {Tank.objects.count() + i}',
+                capacity=Decimal('1000'),
+                organization=harvest.organization,
+                created_by=harvest.created_by
+            )
+            for i in range(len(volumes))
+        ])
+        return HarvestAllocation.objects.bulk_create([
+            HarvestAllocation(
+                harvest=harvest,
+                tank=tank,
+                allocated_volume=Decimal(volume),
+                allocation_date=date(2025, 9, 16),
+                organization=harvest.organization,
+                created_by=harvest.created_by,
+                updated_by=harvest.created_by
+            )
+            for tank, volume in zip(tanks, volumes)
+        ])
+    return add
+
+@pytest.mark.django_db
+class TestAllocationTotals:
+    """Test cases for HarvestQuerySet.with_allocation_totals()."""
+
+    def test_annotation_matches_aggregate(self, harvest, allocate, django_assert_num_queries):
+        allocate('120.25', '300')
+
+        annotated = Harvest.objects.with_allocation_totals().get(pk=harvest.pk)
+
+        with django_assert_num_queries(0):
+            assert annotated.allocated_juice == Decimal('420.25')
+            assert annotated.available_juice == Decimal('579.75')
+            assert annotated.remaining_juice == Decimal('579.75')
+        assert Harvest.objects.get(pk=harvest.pk).available_juice == Decimal('579.75')
+
+    def test_total_is_cached_until_reset(self, harvest, allocate, django_assert_num_queries):
+        with django_assert_num_queries(1):
+            assert harvest.available_juice == Decimal('1000')
+            assert harvest.available_juice == Decimal('1000')
+
+        allocate('250')
+        assert harvest.available_juice == Decimal('1000')
+        harvest.reset_allocation_totals()
+        assert harvest.available_juice == Decimal('750')
+
+    def test_harvest_without_juice_has_none_available(self, harvest):
+        harvest.juice_yield = Decimal('0')
+
+        assert harvest.available_juice == Decimal('0')
+
+@pytest.mark.django_db
+class TestHarvestDetailQueries:
+    """Query-count regression tests for the harvest detail page."""
+
+    def render_detail(self, client, harvest):
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(reverse('harvests:harvest_detail', args=[harvest.pk]))
+        assert response.status_code == 200
+        return response, queries
+
+    def test_detail_queries_do_not_depend_on_allocations(self, tenant_client, harvest, allocate):
+        client, _ = tenant_client
+        allocate('100')
+        self.render_detail(client, harvest)  # Warm the tenant cache
+        response, few = self.render_detail(client, harvest)
+        assert b'900.00 L available' in response.content
+
+        allocate(*['50'] * 10)
+        response, many = self.render_detail(client, harvest)
+        assert b'400.00 L available' in response.content
+
+        assert len(many) == len(few)
+        allocation_aggregates = [
+            query for query in many.captured_queries
+            if 'SUM' in query['sql'] and 'harvests_harvest' not in query['sql']
+        ]
+        assert allocation_aggregates == []
+
+def create_harvests(vineyard, count, **kwargs):
+    """Bulk create ``count`` harvests of the vineyard on consecutive days."""
+    return Harvest.objects.bulk_create([
+        Harvest(
+            vineyard=vineyard,
+            date=date(2000, 1, 1) + timedelta(days=i),
+            quantity=Decimal('1000'),
+            juice_yield=Decimal('700'),
+            organization=vineyard.organization,
+            created_by=vineyard.created_by,
+            **kwargs
+        )
+        for i in range(count)
+    ])
+
+@pytest.mark.django_db
+class TestHarvestList:
+    """Test cases for the keyset-paginated harvest list."""
+
+    def get_list(self, client, xhr=False, **params):
+        headers = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'} if xhr else {}
+        return client.get(reverse('harvests:list_harvests'), params, **headers)
+
+    def test_pages_cover_every_harvest_once(self, tenant_client, harvest):
+        client, _ = tenant_client
+        create_harvests(harvest.vineyard, 120)
+
+        seen, cursor = [], None
+        while True:
+            params = {'after': cursor} if cursor else {}
+            page = self.get_list(client, xhr=True, **params).json()
+            seen.extend(row['id'] for row in page['results'])
+            cursor = page['next']
+            if not cursor:
+                break
+
+        expected = list(Harvest.objects.order_by('-date', '-created_at', '-pk').values_list('pk', flat=True))
+        assert seen == expected
+
+    def test_page_queries_do_not_depend_on_depth(self, tenant_client, harvest):
+        client, _ = tenant_client
+        create_harvests(harvest.vineyard, 200)
+        first = self.get_list(client, xhr=True).json()
+        second = self.get_list(client, xhr=True, after=first['next']).json()
+
+        with CaptureQueriesContext(connection) as first_queries:
+            self.get_list(client)
+        with CaptureQueriesContext(connection) as deep_queries:
+            response = self.get_list(client, after=second['next'])
+
+        assert response.status_code == 200
+        assert len(response.context['harvests']) == 50
+        assert len(deep_queries) == len(first_queries)
+        assert not any('OFFSET' in query['sql'] for query in deep_queries.captured_queries)
+
+    def test_remaining_juice_uses_juice_yield(self, tenant_client, harvest, allocate):
+        client, _ = tenant_client
+        allocate('250')
+
+        row = self.get_list(client, xhr=True).json()['results'][0]
+
+        assert row['id'] == harvest.pk
+        assert Decimal(row['allocated_juice']) == Decimal('250')
+        assert Decimal(row['remaining_juice']) == Decimal('750')
+
+    def test_search_and_tenant_scope(self, tenant_client, harvest, create_user):
+        from organizations.models import Organization
+        client, _ = tenant_client
+        create_harvests(harvest.vineyard, 2, notes='Botrytis in the lower rows')
+        other_org = Organization.objects.create(
+            name='Other Winery',
+            slug='other-winery',
+            address='Other Address',
+            tax_number='10987654321',
+            contact_email='other@example.com',
+            contact_phone='111111',
+            created_by=create_user(username='otherowner', email='other@example.com')
+        )
+        Vineyard.objects.filter(pk=harvest.vineyard.pk).update(organization=other_org)
+        create_harvests(
+            Vineyard.objects.get(pk=harvest.vineyard.pk),
+            1,
+            notes='Botrytis elsewhere'
+        )
+
+        results = self.get_list(client, xhr=True, search='botrytis').json()['results']
+
+        assert len(results) == 2
+        assert self.get_list(client, xhr=True, search='no such note').json()['results'] == []
+
+    def test_invalid_cursor_is_rejected(self, tenant_client, harvest):
+        client, _ = tenant_client
+
+        assert self.get_list(client, after='not-a-cursor').status_code == 400
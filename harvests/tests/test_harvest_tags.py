@@ -0,0 +1,148 @@
+"""
+Tests for the harvest vintage summaries and the harvest template tags.
+"""
+
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.db import connection
+from django.template import Context, Template
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from harvests.models import Harvest, HarvestVintageSummary
+from harvests.services import import_deliveries
+from organizations.models import Organization
+from vineyards.models import Vineyard
+
+TEMPLATE = Template(
+    '{% load harvest_tags %}'
+    '{% get_total_harvest_quantity %}|{% get_total_juice_yield %}|'
+    '{% get_total_harvest_quantity 2024 %}|{% get_total_juice_yield vintage %}'
+)
+
+@pytest.fixture
+def vineyard(organization, create_user):
+    user = create_user()
+    return Vineyard.objects.create(
+        name='Test Vineyard',
+        location='Test Location',
+        size=100,
+        ownership_type='owned',
+        grape_variety='merlot',
+        organization=organization,
+        created_by=user
+    )
+
+@pytest.fixture
+def add_harvest(vineyard):
+    def add(day, quantity, juice_yield='0', vineyard=vineyard):
+        return Harvest.objects.create(
+            vineyard=vineyard,
+            date=day,
+            quantity=Decimal(quantity),
+            juice_yield=Decimal(juice_yield),
+            organization=vineyard.organization,
+            created_by=vineyard.created_by
+        )
+    return add
+
+def summary(organization, vintage):
+    return HarvestVintageSummary.objects.filter(organization=organization, vintage=vintage).values_list(
+        'harvest_count', 'total_quantity', 'total_juice_yield'
+    ).first()
+
+def render(organization, vintage=None):
+    request = RequestFactory().get('/')
+    request.organization = organization
+    return TEMPLATE.render(Context({'request': request, 'vintage': vintage}))
+
+@pytest.mark.django_db
+class TestHarvestVintageSummary:
+    def test_save_updates_summary(self, organization, add_harvest):
+        harvest = add_harvest(date(2025, 9, 1), '1000', '600')
+        add_harvest(date(2025, 9, 2), '500')
+        assert summary(organization, 2025) == (2, Decimal('1500'), Decimal('600'))
+
+        harvest.quantity = Decimal('800')
+        harvest.juice_yield = Decimal('500')
+        harvest.save()
+        assert summary(organization, 2025) == (2, Decimal('1300'), Decimal('500'))
+
+    def test_changing_vintage_moves_totals(self, organization, add_harvest):
+        harvest = add_harvest(date(2025, 9, 1), '1000', '600')
+        harvest.date = date(2024, 9, 1)
+        harvest.save()
+        assert summary(organization, 2025) == (0, Decimal('0'), Decimal('0'))
+        assert summary(organization, 2024) == (1, Decimal('1000'), Decimal('600'))
+
+    def test_delete_updates_summary(self, organization, add_harvest):
+        harvest = add_harvest(date(2025, 9, 1), '1000', '600')
+        add_harvest(date(2025, 9, 2), '500', '300')
+        Harvest.objects.get(pk=harvest.pk).delete()
+        assert summary(organization, 2025) == (1, Decimal('500'), Decimal('300'))
+
+    def test_import_updates_summary(self, organization, vineyard):
+        import_deliveries([
+            {'vineyard': vineyard.pk, 'date': '2025-09-01', 'quantity': '1000', 'juice_yield': '700'},
+            {'vineyard': vineyard.pk, 'date': '2024-09-01', 'quantity': '200'},
+            {'vineyard': vineyard.pk, 'date': '2025-09-03', 'quantity': '300'},
+        ], organization, vineyard.created_by)
+        assert summary(organization, 2025) == (2, Decimal('1300'), Decimal('700'))
+        assert summary(organization, 2024) == (1, Decimal('200'), Decimal('0'))
+
+    def test_rebuild_matches_incremental_totals(self, organization, add_harvest):
+        add_harvest(date(2025, 9, 1), '1000', '600')
+        add_harvest(date(2024, 9, 1), '400', '250')
+        before = set(HarvestVintageSummary.objects.values_list(
+            'organization', 'vintage', 'harvest_count', 'total_quantity', 'total_juice_yield'
+        ))
+        HarvestVintageSummary.objects.all().delete()
+
+        assert HarvestVintageSummary.objects.rebuild() == 2
+        after = set(HarvestVintageSummary.objects.values_list(
+            'organization', 'vintage', 'harvest_count', 'total_quantity', 'total_juice_yield'
+        ))
+        assert after == before
+
+@pytest.mark.django_db
+class TestHarvestTags:
+    def test_totals_per_organization_and_vintage(self, organization, add_harvest):
+        add_harvest(date(2025, 9, 1), '1000', '600')
+        add_harvest(date(2024, 9, 1), '400', '250')
+        assert render(organization, 2025) == '1400.00|850.00|400.00|600.00'
+
+    def test_other_organizations_are_excluded(self, organization, add_harvest, create_user):
+        add_harvest(date(2025, 9, 1), '1000', '600')
+        other = Organization.objects.create(
+            name='Other Winery', slug='other-winery', address='Other Address', tax_number='98765432109',
+            contact_email='other@example.com', contact_phone='111111', created_by=organization.created_by
+        )
+        other_vineyard = Vineyard.objects.create(
+            name='Other Vineyard', location='Other Location', size=10, ownership_type='owned',
+            grape_variety='merlot', arkod_id='other', organization=other, created_by=organization.created_by
+        )
+        add_harvest(date(2025, 9, 1), '50', '30', vineyard=other_vineyard)
+
+        assert render(organization, 2025) == '1000.00|600.00|0|600.00'
+        assert render(other, 2025) == '50.00|30.00|0|30.00'
+
+    def test_without_organization(self, add_harvest):
+        add_harvest(date(2025, 9, 1), '1000', '600')
+        assert render(None, 2025) == '0|0|0|0'
+
+    def test_query_count_is_constant(self, organization, add_harvest):
+        for day in range(1, 21):
+            add_harvest(date(2025, 9, day), '100', '60')
+        with CaptureQueriesContext(connection) as queries:
+            assert render(organization, 2025) == '2000.00|1200.00|0|1200.00'
+        assert len(queries) == 1
+
+        with CaptureQueriesContext(connection) as queries:
+            render(organization)
+        assert len(queries) == 0
+
+    def test_cached_totals_follow_changes(self, organization, add_harvest):
+        add_harvest(date(2025, 9, 1), '1000', '600')
+        assert render(organization, 2025) == '1000.00|600.00|0|600.00'
+        add_harvest(date(2025, 9, 2), '500', '300')
+        assert render(organization, 2025) == '1500.00|900.00|0|900.00'
@@ -8,18 +8,20 @@ harvest status and managing the flow of juice through the production process.
 
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import ValidationError
-from django.http import JsonResponse, HttpResponseRedirect
+from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from django.urls import reverse, reverse_lazy
 from django.views.generic import (
-    ListView, DetailView, CreateView, UpdateView, DeleteView
+    ListView, DetailView, CreateView, UpdateView, DeleteView, View
 )
-from django.db.models import F, ExpressionWrapper, DecimalField, Q, Sum, Value, FloatField
-from django.db.models.functions import Coalesce
+from django.db.models import Q
 from core.utils.exceptions import log_error
+from core.utils.pagination import keyset_paginate
 from .models import Harvest, HarvestAllocation
-from .forms import HarvestForm, HarvestAllocationForm
+from .forms import HarvestForm, HarvestAllocationForm, HarvestAllocationSplitForm
+from .services import allocate_many, import_deliveries, parse_deliveries
 from django.contrib import messages
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -30,59 +32,83 @@ class HarvestListView(LoginRequiredMixin, ListView):
     
     Shows harvests with their key information including date, vineyard, quantity,
     and juice status. Provides search functionality across multiple fields.
+    Pages are keyset paginated on (date, created_at, id), so each page costs
+    the same index scan however much harvest history an organization has.
+    XHR callers get the page as JSON.
 
     Args:
         request: The HTTP request object
+        after: Optional cursor of the page to show
+        search: Optional search term
 
     Returns:
         Rendered template with context containing:
-        - harvests: QuerySet of filtered harvests
+        - harvests: Harvests on the current page
+        - next_cursor: Cursor of the next page, or None on the last page
         - search_query: Current search term if any
         - active_tab: Current active navigation tab
     """
     model = Harvest
     template_name = 'harvests/list_harvests.html'
     context_object_name = 'harvests'
-    ordering = ['-date']
+    ordering = ['-date', '-created_at', '-pk']
+    page_size = 50
 
     def get_queryset(self):
         try:
-            # Start with all harvests, ordered by date
-            queryset = super().get_queryset()
-            
-            # Calculate allocated volume for each harvest
-            allocated_volume = Coalesce(
-                Sum('allocations__allocated_volume', output_field=DecimalField()), 
-                Value(0, output_field=DecimalField())
-            )
-            
-            # Annotate the queryset with allocated volume and remaining juice
-            queryset = queryset.annotate(
-                allocated_volume=allocated_volume,
-                remaining_juice=ExpressionWrapper(
-                    F('quantity') - F('allocated_volume'),
-                    output_field=DecimalField()
-                )
-            )
+            # The organization's harvests (scoped by the tenant manager), annotated
+            # with their allocated juice so remaining_juice doesn't query per row
+            queryset = Harvest.objects.select_related('vineyard').with_allocation_totals()
             
             # Get search query from request parameters
             search_query = self.request.GET.get('search', '').strip()
             
             if search_query:
-                # Apply search filter across multiple fields
+                # Backed by trigram indexes on PostgreSQL; a LIKE scan elsewhere
                 queryset = queryset.filter(
                     Q(vineyard__name__icontains=search_query) |
                     Q(notes__icontains=search_query)
                 )
             
-            return queryset.order_by(self.ordering[0])
+            return queryset
         except Exception as e:
             log_error(e, self.request)
             raise
 
+    def get(self, request, *args, **kwargs):
+        try:
+            self.page = keyset_paginate(
+                self.get_queryset(),
+                self.ordering,
+                cursor=request.GET.get('after'),
+                page_size=self.page_size
+            )
+        except ValueError:
+            return HttpResponseBadRequest('Invalid page cursor')
+        self.object_list = self.page.items
+
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return JsonResponse({
+                'results': [
+                    {
+                        'id': harvest.pk,
+                        'date': harvest.date,
+                        'vineyard': harvest.vineyard.name,
+                        'quantity': harvest.quantity,
+                        'juice_yield': harvest.juice_yield,
+                        'allocated_juice': harvest.allocated_juice,
+                        'remaining_juice': harvest.remaining_juice,
+                    }
+                    for harvest in self.object_list
+                ],
+                'next': self.page.next_cursor,
+            })
+        return self.render_to_response(self.get_context_data())
+
     def get_context_data(self, **kwargs):
         try:
             context = super().get_context_data(**kwargs)
+            context['next_cursor'] = self.page.next_cursor
             context['search_query'] = self.request.GET.get('search', '')
             context['active_tab'] = 'harvests'
             return context
@@ -113,7 +139,7 @@ class HarvestDetailView(LoginRequiredMixin, DetailView):
         try:
             pk = self.kwargs.get(self.pk_url_kwarg)
             obj = get_object_or_404(
-                self.model.objects.select_related(
+                self.model.objects.with_allocation_totals().select_related(
                     'vineyard',
                     'created_by'
                 ).prefetch_related(
@@ -232,7 +258,7 @@ class HarvestUpdateView(LoginRequiredMixin, UpdateView):
         try:
             pk = self.kwargs.get(self.pk_url_kwarg)
             obj = get_object_or_404(
-                self.model.objects.select_related(
+                self.model.objects.with_allocation_totals().select_related(
                     'vineyard',
                     'created_by'
                 ).prefetch_related(
@@ -337,7 +363,10 @@ class HarvestAllocationCreateView(LoginRequiredMixin, CreateView):
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
-        self.harvest = get_object_or_404(Harvest, pk=self.kwargs.get('harvest_id'))
+        self.harvest = get_object_or_404(
+            Harvest.objects.with_allocation_totals().select_related('vineyard'),
+            pk=self.kwargs.get('harvest_id')
+        )
         kwargs['harvest'] = self.harvest
         return kwargs
 
@@ -386,6 +415,77 @@ class HarvestAllocationCreateView(LoginRequiredMixin, CreateView):
         return response
 
 
+class HarvestAllocationSplitView(LoginRequiredMixin, View):
+    """
+    Split a harvest's juice across several tanks in one submit.
+
+    Accepts a JSON body of the form
+    {"allocation_date": "2025-09-16", "allocations": [{"tank": 1, "volume": "500"}]}
+    or form data with an allocation_date and repeated tank and allocated_volume
+    fields. The allocations are validated together and saved in one transaction.
+
+    Args:
+        request: The HTTP request object
+        harvest_id: ID of the harvest to allocate from
+
+    Returns:
+        JSON: The created allocations, or the errors with status 400
+        Form data: Redirect to the harvest detail with a message
+    """
+    http_method_names = ['post']
+
+    def post(self, request, harvest_id):
+        harvest = get_object_or_404(Harvest, pk=harvest_id)
+
+        is_json = request.content_type == 'application/json'
+        try:
+            if is_json:
+                data = json.loads(request.body)
+                legs = [(item['tank'], item['volume']) for item in data.get('allocations', [])]
+            else:
+                data = request.POST
+                legs = list(zip(data.getlist('tank'), data.getlist('allocated_volume')))
+            legs = [(int(tank), volume) for tank, volume in legs]
+        except (ValueError, TypeError, KeyError, AttributeError):
+            return self.respond(harvest, is_json, errors=['Invalid allocations'])
+
+        form = HarvestAllocationSplitForm({'allocation_date': data.get('allocation_date')})
+        if not form.is_valid():
+            return self.respond(harvest, is_json, errors=form.errors['allocation_date'])
+
+        try:
+            created = allocate_many(harvest, legs, form.cleaned_data['allocation_date'], request.user)
+        except ValidationError as e:
+            return self.respond(harvest, is_json, errors=e.messages)
+        except Exception as e:
+            log_error(e, request)
+            raise
+
+        logger.info("Harvest juice split across tanks", extra={
+            'user': request.user.username,
+            'harvest_id': harvest.id,
+            'tanks': len({allocation.tank_id for allocation in created}),
+            'volume': sum(allocation.allocated_volume for allocation in created)
+        })
+        return self.respond(harvest, is_json, created=created)
+
+    def respond(self, harvest, is_json, created=None, errors=None):
+        if is_json or self.request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            if errors:
+                return JsonResponse({'errors': errors}, status=400)
+            return JsonResponse({'allocations': [
+                {'id': allocation.pk, 'tank': allocation.tank_id, 'volume': allocation.allocated_volume}
+                for allocation in created
+            ]}, status=201)
+
+        if errors:
+            for error in errors:
+                messages.error(self.request, error)
+        else:
+            messages.success(self.request, f'Juice allocated to {len(created)} tanks.')
+        return HttpResponseRedirect(reverse('harvests:harvest_detail', kwargs={'pk': harvest.pk}))
+
+
 class HarvestAllocationDetailView(LoginRequiredMixin, DetailView):
     """
     Display detailed information about a specific juice allocation.
@@ -442,6 +542,14 @@ class HarvestAllocationUpdateView(LoginRequiredMixin, UpdateView):
     def get_success_url(self):
         return reverse_lazy('harvests:harvest_detail', kwargs={'pk': self.object.harvest.pk})
 
+    def get_object(self, queryset=None):
+        allocation = super().get_object(queryset)
+        # Share one annotated harvest between the form, model validation and template
+        allocation.harvest = Harvest.objects.with_allocation_totals().select_related(
+            'vineyard'
+        ).get(pk=allocation.harvest_id)
+        return allocation
+
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         kwargs['harvest'] = self.object.harvest
@@ -520,37 +628,23 @@ class HarvestAllocationDeleteView(LoginRequiredMixin, DeleteView):
         """Return to the harvest detail page after deletion."""
         return reverse_lazy('harvests:harvest_detail', kwargs={'pk': self.object.harvest.pk})
 
-    def delete(self, request, *args, **kwargs):
-        """Delete the allocation and update the tank volume."""
-        from cellars.models import TankHistory
-        
-        self.object = self.get_object()
-        harvest_id = self.object.harvest.pk
-        
+    def form_valid(self, form):
+        """
+        Delete the allocation.
+
+        The pre_delete handler of HarvestAllocation takes the volume back out of
+        the tank and records the compensating history entry against the
+        allocation, so it is credited to the deleting user here.
+        """
+        harvest_id = self.object.harvest_id
         try:
-            # Remove the allocated volume from the tank
-            self.object.tank.update_volume(-float(self.object.allocated_volume))
-            
-            # Create history record for volume removal
-            TankHistory.objects.create(
-                tank=self.object.tank,
-                operation_type='allocation',
-                date=self.object.allocation_date,
-                volume=-float(self.object.allocated_volume),
-                harvest=self.object.harvest,
-                created_by=request.user,
-                notes=f"Deleted allocation of {self.object.allocated_volume}L"
-            )
-            
-            # Delete the allocation
+            self.object.updated_by = self.request.user
             self.object.delete()
-            
-            messages.success(request, 'Allocation deleted successfully.')
+            messages.success(self.request, 'Allocation deleted successfully.')
             return HttpResponseRedirect(self.get_success_url())
-            
         except Exception as e:
-            log_error(e, request)
-            messages.error(request, 'An error occurred while deleting the allocation.')
+            log_error(e, self.request)
+            messages.error(self.request, 'An error occurred while deleting the allocation.')
             return HttpResponseRedirect(reverse('harvests:harvest_detail', kwargs={'pk': harvest_id}))
 
 
@@ -563,3 +657,64 @@ class HarvestAllocationListView(LoginRequiredMixin, ListView):
     def get_queryset(self):
         """Return all harvest allocations."""
         return HarvestAllocation.objects.all().select_related('harvest', 'tank')
+
+
+class HarvestIntakeView(LoginRequiredMixin, View):
+    """
+    Record a weighbridge batch of grape deliveries as harvests.
+
+    Accepts a CSV or JSON batch either as the request body or as an uploaded
+    'file'. The format is taken from the 'format' parameter, the file extension
+    or the content type. Invalid rows are reported without aborting the batch.
+
+    Args:
+        request: The HTTP request object
+        format: Optional batch format, 'csv' or 'json'
+        chunk_size: Optional number of harvests per INSERT
+
+    Returns:
+        JSON response with the number of created harvests, their IDs and a list
+        of row errors, or a 400 response if the batch cannot be read
+    """
+    http_method_names = ['post']
+    default_chunk_size = 1000
+
+    def post(self, request, *args, **kwargs):
+        organization = getattr(request, 'organization', None)
+        if organization is None:
+            return JsonResponse({'error': 'No organization selected'}, status=400)
+
+        upload = request.FILES.get('file')
+        data = upload.read() if upload else request.body
+        data_format = request.GET.get('format') or request.POST.get('format')
+        if not data_format:
+            name = upload.name if upload else ''
+            content_type = upload.content_type if upload else request.content_type
+            data_format = 'csv' if name.endswith('.csv') or 'csv' in (content_type or '') else 'json'
+
+        try:
+            chunk_size = int(request.GET.get('chunk_size', self.default_chunk_size))
+            if chunk_size < 1:
+                raise ValueError
+        except ValueError:
+            return JsonResponse({'error': 'Invalid chunk size'}, status=400)
+
+        try:
+            rows = parse_deliveries(data, data_format)
+            result = import_deliveries(rows, organization, request.user, chunk_size=chunk_size)
+        except ValidationError as e:
+            return JsonResponse({'error': ' '.join(e.messages)}, status=400)
+        except Exception as e:
+            log_error(e, request)
+            raise
+
+        logger.info("Harvest batch imported", extra={
+            'user': request.user.username,
+            'imported': len(result.created),
+            'rejected': len(result.errors)
+        })
+        return JsonResponse({
+            'created': len(result.created),
+            'ids': [harvest.pk for harvest in result.created],
+            'errors': result.errors,
+        })
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from core.middleware.tenant_middleware import invalidate_tenant_cache
+from core.models import invalidate_primary_organization
+from .models import Organization, OrganizationUser
+
+@receiver([post_save, post_delete], sender=OrganizationUser)
+def invalidate_membership_cache(sender, instance, **kwargs):
+    """Forget the cached access and primary organization of a user whose membership changed."""
+    invalidate_tenant_cache([instance.user_id], instance.organization_id)
+    invalidate_primary_organization(instance.user_id)
+
+@receiver(post_save, sender=Organization)
+def invalidate_organization_cache(sender, instance, **kwargs):
+    """
+    Forget the cached access of all members of a changed organization.
+
+    Deleted organizations need no handler: their memberships are deleted with
+    them and invalidate themselves.
+    """
+    user_ids = OrganizationUser.objects.filter(organization=instance).values_list('user_id', flat=True)
+    invalidate_tenant_cache(user_ids, instance.pk)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Bottle, Label, Closure, Box
+from .models import Bottle, Label, Closure, Box, StockMovement
 
 @admin.register(Bottle)
 class BottleAdmin(admin.ModelAdmin):
@@ -48,3 +48,17 @@ class BoxAdmin(admin.ModelAdmin):
         if not change:
             obj.created_by = request.user
         super().save_model(request, obj, form, change)
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ('material_type', 'material_id', 'movement_type', 'quantity', 'bottling', 'created_at')
+    list_filter = ('material_type', 'movement_type')
+    search_fields = ('notes',)
+    readonly_fields = ('created_by', 'created_at')
+
+    def has_change_permission(self, request, obj=None):
+        # Stock is changed through the ledger, never by editing it
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
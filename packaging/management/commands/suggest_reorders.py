@@ -0,0 +1,70 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from core.models import tenant_context
+from organizations.models import Organization
+from packaging.services import compute_reorder_suggestions
+
+class Command(BaseCommand):
+    help = (
+        'Suggest reorders for the packaging materials below their minimum stock. '
+        'Meant to be run daily, e.g. from cron'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--organization',
+            type=int,
+            help='ID of the organization to check (default: all active organizations)',
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print the suggestions as JSON',
+        )
+
+    def handle(self, *args, **options):
+        organizations = Organization.objects.filter(is_active=True).order_by('pk')
+        if options['organization']:
+            organizations = Organization.objects.filter(pk=options['organization'])
+            if not organizations.exists():
+                raise CommandError(f"Organization {options['organization']} does not exist")
+
+        report = {}
+        for organization in organizations:
+            # Route the queries to the organization's database, as a request would
+            with tenant_context(organization):
+                report[organization] = compute_reorder_suggestions(organization)
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                str(organization.pk): [
+                    {
+                        'material_type': suggestion.material_type,
+                        'material_id': suggestion.material_id,
+                        'name': suggestion.name,
+                        'supplier': suggestion.supplier,
+                        'stock': suggestion.stock,
+                        'minimum_stock': suggestion.minimum_stock,
+                        'daily_usage': round(suggestion.daily_usage, 2),
+                        'stockout_date': suggestion.stockout_date and suggestion.stockout_date.isoformat(),
+                        'suggested_quantity': suggestion.suggested_quantity,
+                    }
+                    for suggestion in suggestions
+                ]
+                for organization, suggestions in report.items()
+            }, indent=2))
+            return
+
+        for organization, suggestions in report.items():
+            if not suggestions:
+                continue
+            self.stdout.write(self.style.MIGRATE_HEADING(organization.name))
+            for suggestion in suggestions:
+                runs_out = suggestion.stockout_date or 'no recent usage'
+                self.stdout.write(
+                    f'  Order {suggestion.suggested_quantity} x {suggestion.name} ({suggestion.material_type}'
+                    f"{', ' + suggestion.supplier if suggestion.supplier else ''}): "
+                    f'{suggestion.stock} in stock, minimum {suggestion.minimum_stock}, runs out {runs_out}'
+                )
+        total = sum(len(suggestions) for suggestions in report.values())
+        self.stdout.write(self.style.SUCCESS(f'{total} materials to reorder'))
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cellars', '0014_tenant_indexes'),
+        ('organizations', '0001_initial'),
+        ('packaging', '0004_bottle_organization_bottle_updated_by_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bottle',
+            index=models.Index(fields=['organization', 'name'], name='bottle_org_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bottling',
+            index=models.Index(fields=['organization', '-bottling_date'], name='bottling_org_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='box',
+            index=models.Index(fields=['organization', 'name'], name='box_org_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='closure',
+            index=models.Index(fields=['organization', 'name'], name='closure_org_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='label',
+            index=models.Index(fields=['organization', 'name'], name='label_org_name_idx'),
+        ),
+    ]
@@ -0,0 +1,136 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:34
+
+import django.db.models.deletion
+import logging
+from django.conf import settings
+from django.db import migrations, models
+
+logger = logging.getLogger('vinco')
+
+
+def clamp_negative_stock(apps, schema_editor):
+    """
+    Set negative stock to zero, which the new check constraints refuse, and
+    report each material that was changed.
+    """
+    for model_name in ('Bottle', 'Label', 'Closure', 'Box'):
+        model = apps.get_model('packaging', model_name)
+        for material in model.objects.filter(stock__lt=0):
+            logger.warning(
+                f"{model_name} #{material.pk} ({material.name}) had a stock of {material.stock}; set to 0"
+            )
+        model.objects.filter(stock__lt=0).update(stock=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0001_initial'),
+        ('packaging', '0005_tenant_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('material_type', models.CharField(choices=[('bottle', 'Bottle'), ('label', 'Label'), ('closure', 'Closure'), ('box', 'Box')], max_length=20)),
+                ('material_id', models.PositiveIntegerField()),
+                ('movement_type', models.CharField(choices=[('receipt', 'Receipt'), ('consumption', 'Consumption'), ('return', 'Return'), ('adjustment', 'Adjustment')], max_length=20)),
+                ('quantity', models.IntegerField(help_text='Change in stock, negative for stock taken out')),
+                ('notes', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Stock Movement',
+                'verbose_name_plural': 'Stock Movements',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('material_type', models.CharField(choices=[('bottle', 'Bottle'), ('label', 'Label'), ('closure', 'Closure'), ('box', 'Box')], max_length=20)),
+                ('material_id', models.PositiveIntegerField()),
+                ('quantity', models.PositiveIntegerField()),
+            ],
+            options={
+                'verbose_name': 'Stock Reservation',
+                'verbose_name_plural': 'Stock Reservations',
+            },
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='bottling',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='packaging.bottling'),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='created_by',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_created', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='organization',
+            field=models.ForeignKey(default=None, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='organizations.organization'),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='updated_by',
+            field=models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_updated', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='stockreservation',
+            name='bottling',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='packaging.bottling'),
+        ),
+        migrations.AddField(
+            model_name='stockreservation',
+            name='created_by',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_created', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='stockreservation',
+            name='organization',
+            field=models.ForeignKey(default=None, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='%(class)s_set', to='organizations.organization'),
+        ),
+        migrations.AddField(
+            model_name='stockreservation',
+            name='updated_by',
+            field=models.ForeignKey(blank=True, default=None, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='%(class)s_updated', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['organization', 'material_type', 'material_id', '-created_at'], name='stockmove_org_material_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockreservation',
+            index=models.Index(fields=['organization', 'material_type', 'material_id'], name='reservation_org_material_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='stockreservation',
+            constraint=models.UniqueConstraint(fields=('bottling', 'material_type'), name='reservation_bottling_material_uniq'),
+        ),
+        migrations.RunPython(clamp_negative_stock, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='bottle',
+            constraint=models.CheckConstraint(condition=models.Q(('stock__gte', 0)), name='bottle_stock_non_negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='box',
+            constraint=models.CheckConstraint(condition=models.Q(('stock__gte', 0)), name='box_stock_non_negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='closure',
+            constraint=models.CheckConstraint(condition=models.Q(('stock__gte', 0)), name='closure_stock_non_negative'),
+        ),
+        migrations.AddConstraint(
+            model_name='label',
+            constraint=models.CheckConstraint(condition=models.Q(('stock__gte', 0)), name='label_stock_non_negative'),
+        ),
+    ]
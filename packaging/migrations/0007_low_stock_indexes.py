@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:45
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0001_initial'),
+        ('packaging', '0006_stock_ledger'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bottle',
+            index=models.Index(condition=models.Q(('stock__lt', models.F('minimum_stock'))), fields=['organization'], name='bottle_low_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='box',
+            index=models.Index(condition=models.Q(('stock__lt', models.F('minimum_stock'))), fields=['organization'], name='box_low_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='closure',
+            index=models.Index(condition=models.Q(('stock__lt', models.F('minimum_stock'))), fields=['organization'], name='closure_low_stock_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='label',
+            index=models.Index(condition=models.Q(('stock__lt', models.F('minimum_stock'))), fields=['organization'], name='label_low_stock_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cellars', '0014_tenant_indexes'),
+        ('organizations', '0001_initial'),
+        ('packaging', '0007_low_stock_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bottling',
+            index=models.Index(fields=['organization', 'status', '-bottling_date'], name='bottling_org_status_date_idx'),
+        ),
+    ]
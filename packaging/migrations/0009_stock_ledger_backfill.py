@@ -0,0 +1,91 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:20
+
+import math
+
+from django.db import migrations
+from django.db.models import Sum
+
+
+MATERIAL_MODELS = {'bottle': 'Bottle', 'label': 'Label', 'closure': 'Closure', 'box': 'Box'}
+
+
+def bottling_requirements(bottling):
+    """
+    Return the materials a bottling uses, keyed by (material_type, material_id).
+
+    A frozen copy of packaging.services.bottling_requirements(), so the
+    migration keeps working when the service changes.
+    """
+    requirements = {('bottle', bottling.bottle_id): bottling.quantity}
+    if bottling.label_id:
+        requirements[('label', bottling.label_id)] = bottling.quantity
+    if bottling.closure_id:
+        requirements[('closure', bottling.closure_id)] = bottling.quantity
+    if bottling.box_id:
+        requirements[('box', bottling.box_id)] = math.ceil(bottling.quantity / bottling.box.bottle_capacity)
+    return requirements
+
+
+def reserve_unfinished_bottlings(apps, schema_editor):
+    """
+    Reserve the materials of unfinished bottlings planned before reservations
+    existed.
+    """
+    Bottling = apps.get_model('packaging', 'Bottling')
+    StockReservation = apps.get_model('packaging', 'StockReservation')
+
+    bottlings = Bottling.objects.filter(status='unfinished', reservations__isnull=True).select_related('box')
+    StockReservation.objects.bulk_create([
+        StockReservation(
+            organization_id=bottling.organization_id,
+            bottling_id=bottling.pk,
+            material_type=material_type,
+            material_id=material_id,
+            quantity=quantity,
+            created_by_id=bottling.created_by_id
+        )
+        for bottling in bottlings
+        for (material_type, material_id), quantity in bottling_requirements(bottling).items()
+    ], batch_size=1000)
+
+
+def record_opening_balances(apps, schema_editor):
+    """
+    Record the stock each material had before the ledger, so its movements add
+    up to its current stock.
+    """
+    StockMovement = apps.get_model('packaging', 'StockMovement')
+
+    totals = {
+        (row['material_type'], row['material_id']): row['total']
+        for row in StockMovement.objects.order_by().values('material_type', 'material_id').annotate(
+            total=Sum('quantity')
+        )
+    }
+    openings = []
+    for material_type, model_name in MATERIAL_MODELS.items():
+        for material in apps.get_model('packaging', model_name).objects.all():
+            difference = material.stock - totals.get((material_type, material.pk), 0)
+            if difference:
+                openings.append(StockMovement(
+                    organization_id=material.organization_id,
+                    material_type=material_type,
+                    material_id=material.pk,
+                    movement_type='receipt' if difference > 0 else 'adjustment',
+                    quantity=difference,
+                    notes='Opening balance',
+                    created_by_id=material.created_by_id
+                ))
+    StockMovement.objects.bulk_create(openings, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('packaging', '0008_bottling_status_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(reserve_unfinished_bottlings, migrations.RunPython.noop),
+        migrations.RunPython(record_opening_balances, migrations.RunPython.noop),
+    ]
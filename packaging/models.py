@@ -1,12 +1,82 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
-from core.models import TenantModel
+from core.db_routers import tenant_db
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from core.models import TenantManager, TenantModel, TenantQuerySet
 
 User = get_user_model()
 
-class Bottle(TenantModel):
+PACKAGING_MATERIALS = [
+    ('bottle', 'Bottle'),
+    ('label', 'Label'),
+    ('closure', 'Closure'),
+    ('box', 'Box'),
+]
+
+class PackagingMaterial(TenantModel):
+    """
+    Base class of the packaging materials kept in stock.
+
+    Stock is only ever changed with F() expression updates. Saving a material
+    doesn't write its stock column; a stock changed on the instance (e.g. in
+    the edit form) is applied as the difference to the value it was loaded
+    with and recorded as an adjustment, so concurrent bottlings aren't
+    overwritten.
+    """
+    material_type = None
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'stock' not in instance.get_deferred_fields():
+            instance._loaded_stock = instance.stock
+        return instance
+
+    def save(self, *args, **kwargs):
+        from .services import apply_stock_changes
+
+        loaded_stock = None if self._state.adding else getattr(self, '_loaded_stock', None)
+        if loaded_stock is None or kwargs.get('update_fields') is not None:
+            with transaction.atomic(using=tenant_db(self.organization_id)):
+                is_new = self._state.adding
+                super().save(*args, **kwargs)
+                if is_new and self.stock:
+                    StockMovement.objects.create(
+                        organization_id=self.organization_id,
+                        material_type=self.material_type,
+                        material_id=self.pk,
+                        movement_type='receipt',
+                        quantity=self.stock,
+                        created_by_id=self.created_by_id
+                    )
+            self._loaded_stock = self.stock
+            return
+
+        delta = self.stock - loaded_stock
+        kwargs['update_fields'] = [
+            field.name for field in self._meta.concrete_fields
+            if not field.primary_key and field.name != 'stock'
+        ]
+        with transaction.atomic(using=tenant_db(self.organization_id)):
+            super().save(*args, **kwargs)
+            if delta:
+                apply_stock_changes(
+                    {(self.material_type, self.pk): delta},
+                    user=self.updated_by or self.created_by,
+                    organization=self.organization_id,
+                    movement_type='adjustment'
+                )
+                self.refresh_from_db(fields=['stock'])
+        self._loaded_stock = self.stock
+
+class Bottle(PackagingMaterial):
     """Model for wine bottles."""
+    material_type = 'bottle'
     
     # Define choices for bottle types
     BOTTLE_TYPES = [
@@ -69,9 +139,22 @@ class Bottle(TenantModel):
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['organization', 'name'], name='bottle_org_name_idx'),
+            # Partial index of the materials below their reorder point
+            models.Index(
+                fields=['organization'],
+                condition=models.Q(stock__lt=models.F('minimum_stock')),
+                name='bottle_low_stock_idx'
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(stock__gte=0), name='bottle_stock_non_negative'),
+        ]
 
-class Label(TenantModel):
+class Label(PackagingMaterial):
     """Model for wine labels."""
+    material_type = 'label'
     
     # Define choices for label types
     LABEL_TYPES = [
@@ -126,9 +209,22 @@ class Label(TenantModel):
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['organization', 'name'], name='label_org_name_idx'),
+            # Partial index of the materials below their reorder point
+            models.Index(
+                fields=['organization'],
+                condition=models.Q(stock__lt=models.F('minimum_stock')),
+                name='label_low_stock_idx'
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(stock__gte=0), name='label_stock_non_negative'),
+        ]
 
-class Closure(TenantModel):
+class Closure(PackagingMaterial):
     """Model for bottle closures (caps, corks, etc.)."""
+    material_type = 'closure'
     
     # Define choices for closure types
     CLOSURE_TYPES = [
@@ -188,9 +284,22 @@ class Closure(TenantModel):
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['organization', 'name'], name='closure_org_name_idx'),
+            # Partial index of the materials below their reorder point
+            models.Index(
+                fields=['organization'],
+                condition=models.Q(stock__lt=models.F('minimum_stock')),
+                name='closure_low_stock_idx'
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(stock__gte=0), name='closure_stock_non_negative'),
+        ]
 
-class Box(TenantModel):
+class Box(PackagingMaterial):
     """Model for packaging boxes."""
+    material_type = 'box'
     
     # Define choices for box types
     BOX_TYPES = [
@@ -259,6 +368,31 @@ class Box(TenantModel):
     class Meta:
         ordering = ['name']
         verbose_name_plural = "boxes"
+        indexes = [
+            models.Index(fields=['organization', 'name'], name='box_org_name_idx'),
+            # Partial index of the materials below their reorder point
+            models.Index(
+                fields=['organization'],
+                condition=models.Q(stock__lt=models.F('minimum_stock')),
+                name='box_low_stock_idx'
+            ),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(stock__gte=0), name='box_stock_non_negative'),
+        ]
+
+class BottlingQuerySet(TenantQuerySet):
+    """Custom queryset for bottlings."""
+
+    def with_materials(self):
+        """Fetch the tank and all packaging materials in the same query."""
+        return self.select_related('tank', 'bottle', 'closure', 'label', 'box')
+
+    def finished(self):
+        return self.filter(status='finished')
+
+    def unfinished(self):
+        return self.filter(status='unfinished')
 
 class Bottling(TenantModel):
     """Model for tracking bottling operations."""
@@ -286,48 +420,59 @@ class Bottling(TenantModel):
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey('auth.User', on_delete=models.PROTECT, related_name='bottlings_created')
 
+    objects = TenantManager.from_queryset(BottlingQuerySet)()
+
     def __str__(self):
-        return f"{self.tank.wine_type} - {self.quantity} bottles ({self.get_status_display()})"
+        return f"{self.tank.name} - {self.quantity} bottles ({self.get_status_display()})"
 
     class Meta:
         ordering = ['-bottling_date']
         verbose_name = 'Bottling'
         verbose_name_plural = 'Bottlings'
+        indexes = [
+            models.Index(fields=['organization', '-bottling_date'], name='bottling_org_date_idx'),
+            models.Index(fields=['organization', 'status', '-bottling_date'], name='bottling_org_status_date_idx'),
+        ]
+
+    # Fields whose changes take wine or materials, so only
+    # packaging.services.record_bottling() may save them
+    BOOKED_FIELDS = {'tank', 'bottle', 'closure', 'label', 'box', 'quantity', 'status'}
 
     def save(self, *args, **kwargs):
-        is_new = self.pk is None
-        old_quantity = None if is_new else Bottling.objects.get(pk=self.pk).quantity
-        
-        # Only set status automatically if it wasn't explicitly set
-        if not self.status:
-            if self.closure and self.label and self.box:
-                self.status = 'finished'
-            else:
-                self.status = 'unfinished'
-            
-        # Calculate volume change in liters
-        if is_new:
-            volume_change = -(self.quantity * self.bottle.volume / 1000)  # Convert ml to L
-        else:
-            # If quantity changed, adjust the volume change
-            volume_change = -((self.quantity - old_quantity) * self.bottle.volume / 1000)
-            
-        if volume_change != 0:
-            # Update tank volume
-            self.tank.update_volume(volume_change)
-            
-            # Create tank history entry
-            from cellars.models import TankHistory
-            TankHistory.objects.create(
-                tank=self.tank,
-                operation_type='bottling',
-                date=self.bottling_date,
-                volume=volume_change,
-                notes=f"Bottled {abs(volume_change)}L ({self.quantity} bottles)",
-                created_by=self.created_by
-            )
-            
-        super().save(*args, **kwargs)
+        """
+        Save the bottling through packaging.services.record_bottling().
+
+        The service writes the row together with the wine taken from the tank,
+        the material stock and reservations, and the tank history in one
+        transaction, booked as the bottling's updated_by or created_by user.
+        Views call the service with the request's user instead.
+
+        A save with update_fields only writes those fields, which must not
+        include any of BOOKED_FIELDS.
+        """
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            booked = {name.removesuffix('_id') for name in update_fields} & self.BOOKED_FIELDS
+            if booked:
+                raise ValueError(
+                    f"{', '.join(sorted(booked))} can only be saved through record_bottling()"
+                )
+            super().save(*args, **kwargs)
+            return
+
+        from .services import record_bottling
+        record_bottling(self, self.updated_by or self.created_by)
+
+    def delete(self, *args, **kwargs):
+        """
+        Delete the bottling through packaging.services.delete_bottling(),
+        which puts back its wine and materials, booked as the bottling's
+        updated_by or created_by user.
+        """
+        if getattr(self, '_returned', False):
+            return super().delete(*args, **kwargs)
+        from .services import delete_bottling
+        return delete_bottling(self, self.updated_by or self.created_by)
 
     @property
     def is_finished(self):
@@ -343,3 +488,85 @@ class Bottling(TenantModel):
         if not self.box:
             missing.append('Box')
         return missing
+
+@receiver(post_delete, sender=Bottling)
+def return_bottling_stock(sender, instance, **kwargs):
+    """
+    Put back the wine and materials of a bottling deleted in bulk, e.g. by a
+    queryset delete(), within the delete's transaction.
+
+    Bottlings deleted through packaging.services.delete_bottling() have
+    already been booked.
+    """
+    if getattr(instance, '_returned', False):
+        return
+    from .services import return_bottling
+    return_bottling(instance, instance.updated_by or instance.created_by)
+
+class StockMovement(TenantModel):
+    """
+    Ledger entry of a change to the stock of a packaging material.
+
+    Shared by bottles, labels, closures and boxes, which are referenced by
+    material_type and material_id. Quantities are signed: receipts and returns
+    are positive, consumption is negative.
+    """
+    MOVEMENT_TYPES = [
+        ('receipt', 'Receipt'),
+        ('consumption', 'Consumption'),
+        ('return', 'Return'),
+        ('adjustment', 'Adjustment'),
+    ]
+
+    material_type = models.CharField(max_length=20, choices=PACKAGING_MATERIALS)
+    material_id = models.PositiveIntegerField()
+    movement_type = models.CharField(max_length=20, choices=MOVEMENT_TYPES)
+    quantity = models.IntegerField(help_text="Change in stock, negative for stock taken out")
+    bottling = models.ForeignKey(
+        Bottling,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='stock_movements'
+    )
+    notes = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.get_movement_type_display()} of {self.quantity} {self.material_type} #{self.material_id}"
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Stock Movement'
+        verbose_name_plural = 'Stock Movements'
+        indexes = [
+            models.Index(
+                fields=['organization', 'material_type', 'material_id', '-created_at'],
+                name='stockmove_org_material_idx'
+            ),
+        ]
+
+class StockReservation(TenantModel):
+    """
+    Materials set aside for a planned (unfinished) bottling.
+
+    Reservations don't change stock; they are subtracted from it to give the
+    quantity available to promise to further bottlings. They are replaced
+    whenever their bottling is saved and removed once it is finished.
+    """
+    bottling = models.ForeignKey(Bottling, on_delete=models.CASCADE, related_name='reservations')
+    material_type = models.CharField(max_length=20, choices=PACKAGING_MATERIALS)
+    material_id = models.PositiveIntegerField()
+    quantity = models.PositiveIntegerField()
+
+    def __str__(self):
+        return f"{self.quantity} {self.material_type} #{self.material_id} for bottling {self.bottling_id}"
+
+    class Meta:
+        verbose_name = 'Stock Reservation'
+        verbose_name_plural = 'Stock Reservations'
+        constraints = [
+            models.UniqueConstraint(fields=['bottling', 'material_type'], name='reservation_bottling_material_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['organization', 'material_type', 'material_id'], name='reservation_org_material_idx'),
+        ]
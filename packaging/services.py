@@ -0,0 +1,797 @@
+"""
+Services for packaging material stock.
+
+Stock is changed with conditional F() expression updates, one UPDATE per
+material model, so a shortage fails the whole change in a single statement
+without locking anything beyond the rows being updated. Every change is
+recorded in the StockMovement ledger. Planned bottlings reserve their
+materials with StockReservation rows, and the quantity available to promise
+is the stock minus those reservations.
+
+The material requirements of the planned bottlings are netted against stock
+and reservations by compute_material_shortages(), and materials below their
+minimum stock get reorder suggestions from compute_reorder_suggestions().
+
+Bottling runs are written by record_bottlings(), which takes the wine out of
+the tanks and books the materials in the same transaction, and removed by
+delete_bottling(), which puts them back with return_bottling().
+"""
+
+import math
+from dataclasses import dataclass
+from datetime import date, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Optional
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Case, CharField, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Ceil, Coalesce
+from django.utils import timezone
+from cellars.models import TankHistory
+from cellars.services import lock_tanks, update_tank_volumes
+from core.cache import get_or_set, invalidate
+from core.db_routers import tenant_db
+from .models import Bottle, Bottling, Box, Closure, Label, StockMovement, StockReservation
+
+MATERIAL_MODELS = {
+    'bottle': Bottle,
+    'label': Label,
+    'closure': Closure,
+    'box': Box,
+}
+
+def bottling_requirements(bottling, box_capacity=None):
+    """
+    Return the materials a bottling uses.
+
+    Args:
+        bottling: Bottling instance
+        box_capacity: Bottle capacity of the bottling's box; read from
+            bottling.box if omitted
+
+    Returns:
+        dict: Quantity keyed by (material_type, material_id); boxes are
+            rounded up to whole boxes
+    """
+    requirements = {('bottle', bottling.bottle_id): bottling.quantity}
+    if bottling.label_id:
+        requirements[('label', bottling.label_id)] = bottling.quantity
+    if bottling.closure_id:
+        requirements[('closure', bottling.closure_id)] = bottling.quantity
+    if bottling.box_id:
+        if box_capacity is None:
+            box_capacity = bottling.box.bottle_capacity
+        requirements[('box', bottling.box_id)] = math.ceil(bottling.quantity / box_capacity)
+    return requirements
+
+def apply_stock_changes(changes, user, organization, bottling=None, movement_type=None, notes=''):
+    """
+    Apply stock changes to packaging materials and record them in the ledger.
+
+    The materials of each model are updated with one UPDATE whose WHERE clause
+    requires enough stock for every decrease, so a shortage updates fewer rows
+    than expected and the whole change is rolled back.
+
+    Args:
+        changes: Signed change in stock keyed by (material_type, material_id)
+        user: User making the change
+        organization: Organization instance or ID of the materials
+        bottling: Optional bottling the change belongs to
+        movement_type: Type of the ledger entries; 'return' for increases and
+            'consumption' for decreases if omitted
+        notes: Optional notes stored on the ledger entries
+
+    Returns:
+        list: The created StockMovement entries
+
+    Raises:
+        ValidationError: If a material has too little stock or doesn't exist
+    """
+    changes = {key: delta for key, delta in changes.items() if delta}
+    if not changes:
+        return []
+    organization_id = getattr(organization, 'pk', organization)
+
+    try:
+        with transaction.atomic(using=tenant_db(organization_id)):
+            _update_stock(changes, organization_id)
+            return StockMovement.objects.bulk_create([
+                StockMovement(
+                    organization_id=organization_id,
+                    material_type=material_type,
+                    material_id=material_id,
+                    movement_type=movement_type or ('return' if delta > 0 else 'consumption'),
+                    quantity=delta,
+                    bottling=bottling,
+                    notes=notes,
+                    created_by=user
+                )
+                for (material_type, material_id), delta in changes.items()
+            ])
+    except IntegrityError as e:
+        # The stock CHECK constraints are the last line of defence
+        raise ValidationError(f"Stock change would make stock negative: {e}")
+
+def _update_stock(changes, organization_id):
+    """
+    Apply non-zero stock changes with one conditional UPDATE per material model.
+
+    Must be called inside a transaction, which a shortage rolls back.
+
+    Args:
+        changes: Signed change in stock keyed by (material_type, material_id)
+        organization_id: ID of the organization of the materials
+
+    Raises:
+        ValidationError: If a material has too little stock or doesn't exist
+    """
+    by_type = {}
+    for (material_type, material_id), delta in changes.items():
+        by_type.setdefault(material_type, {})[material_id] = delta
+
+    for material_type, deltas in by_type.items():
+        model = MATERIAL_MODELS[material_type]
+        condition = Q()
+        for pk, delta in deltas.items():
+            condition |= Q(pk=pk, stock__gte=-delta) if delta < 0 else Q(pk=pk)
+        updated = model.all_objects.filter(condition, organization_id=organization_id).update(
+            stock=F('stock') + Case(
+                *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+                output_field=IntegerField()
+            ),
+            updated_at=timezone.now()
+        )
+        if updated != len(deltas):
+            raise ValidationError(_shortage_errors(model, deltas, organization_id))
+        invalidate(model, organization_id)
+
+def _shortage_errors(model, deltas, organization_id):
+    """Describe why a conditional stock update didn't update every material."""
+    stock = dict(model.all_objects.filter(pk__in=deltas, organization_id=organization_id).values_list('pk', 'stock'))
+    errors = []
+    for pk, delta in deltas.items():
+        name = model._meta.verbose_name
+        if pk not in stock:
+            errors.append(f"{name.capitalize()} {pk} not found")
+        elif stock[pk] + delta < 0:
+            errors.append(f"Not enough {model._meta.verbose_name_plural} in stock. Need {-delta} but only {stock[pk]} available.")
+    return errors or [f"{model._meta.verbose_name_plural.capitalize()} changed, please try again"]
+
+BOTTLING_FIELDS = [
+    'tank', 'bottle', 'closure', 'label', 'box', 'bottling_date', 'quantity', 'status', 'notes',
+    'updated_at', 'updated_by'
+]
+
+def bottled_litres(quantity, bottle_volume):
+    """
+    Return the wine in a number of bottles in litres.
+
+    Args:
+        quantity: Number of bottles
+        bottle_volume: Bottle volume in milliliters
+
+    Returns:
+        Decimal: The volume rounded half up to the 0.01 L tanks are kept in
+    """
+    litres = Decimal(quantity) * Decimal(str(bottle_volume)) / 1000
+    return litres.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+def record_bottling(bottling, user):
+    """
+    Save a bottling run, or a change to one, with the wine and materials it takes.
+
+    Args:
+        bottling: New or changed Bottling instance
+        user: User recording the bottling
+
+    Returns:
+        Bottling: The saved bottling
+
+    Raises:
+        ValidationError: If the tank holds too little wine, a material has too
+            little stock, or the tank or a material belongs to another organization
+    """
+    return record_bottlings([bottling], user)[0]
+
+def record_bottlings(bottlings, user, bottling_date=None):
+    """
+    Save several bottling runs, e.g. a full day's shifts, in one operation.
+
+    The changed bottlings, their tanks and their materials are locked once, in
+    primary key order, and every run is validated against that snapshot before
+    anything is written. Wine is converted to exact Decimal litres. The writes
+    are one INSERT for the new bottlings, one UPDATE for the changed ones, one
+    UPDATE ... CASE for the tanks, one conditional UPDATE per material model,
+    and one INSERT each for the stock ledger, reservations and tank history, all
+    in a single transaction, so the query count doesn't grow with the number of
+    runs.
+
+    Changed bottlings are booked as the difference to their saved state: the
+    wine and consumed materials of the old version are put back and those of
+    the new version taken out. Finished bottlings consume their materials,
+    unfinished ones reserve them.
+
+    Args:
+        bottlings: New or changed Bottling instances of one organization
+        user: User recording the bottlings
+        bottling_date: Optional date set on every bottling
+
+    Returns:
+        list: The saved bottlings
+
+    Raises:
+        ValidationError: If a quantity is not positive, a tank holds too little
+            wine, a material has too little stock, or a tank or material belongs
+            to another organization
+    """
+    bottlings = list(bottlings)
+    if not bottlings:
+        raise ValidationError("At least one bottling is required")
+    for bottling in bottlings:
+        if not bottling.quantity or bottling.quantity <= 0:
+            raise ValidationError("Bottle quantity must be greater than 0")
+        if bottling_date is not None:
+            bottling.bottling_date = bottling_date
+        if not bottling.status:
+            finished = bottling.closure_id and bottling.label_id and bottling.box_id
+            bottling.status = 'finished' if finished else 'unfinished'
+        if bottling.created_by_id is None:
+            bottling.created_by = user
+        if bottling.pk is not None:
+            bottling.updated_by = user
+    Bottling.fill_organizations(bottlings)
+    organization_ids = {bottling.organization_id for bottling in bottlings}
+    if len(organization_ids) != 1:
+        raise ValidationError("All bottlings must belong to the same organization")
+    organization_id = organization_ids.pop()
+
+    try:
+        with transaction.atomic(using=tenant_db(organization_id)):
+            saved_pks = {bottling.pk for bottling in bottlings if bottling.pk is not None}
+            previous = {
+                old.pk: old
+                for old in Bottling.all_objects.select_for_update().filter(
+                    pk__in=saved_pks, organization_id=organization_id
+                ).order_by('pk')
+            }
+            if len(previous) != len(saved_pks):
+                raise ValidationError("Bottling not found")
+            runs = [(bottling, previous.get(bottling.pk)) for bottling in bottlings]
+            versions = [version for run in runs for version in run if version is not None]
+
+            tanks = lock_tanks({version.tank_id for version in versions})
+            materials = _lock_materials(versions)
+            deltas, changes = _bottling_deltas(runs, materials)
+            errors = _bottling_errors(organization_id, tanks, deltas, materials, changes)
+            if errors:
+                raise ValidationError(errors)
+
+            now = timezone.now()
+            new = [bottling for bottling, old in runs if old is None]
+            changed = [bottling for bottling, old in runs if old is not None]
+            Bottling.objects.bulk_create(new)
+            if changed:
+                for bottling in changed:
+                    bottling.updated_at = now
+                Bottling.all_objects.bulk_update(changed, BOTTLING_FIELDS)
+                invalidate(Bottling, organization_id)
+
+            update_tank_volumes(tanks, deltas, user)
+            _update_stock({key: delta for key, delta in changes.items() if delta}, organization_id)
+            StockMovement.objects.bulk_create([
+                StockMovement(
+                    organization_id=organization_id,
+                    material_type=material_type,
+                    material_id=material_id,
+                    movement_type='return' if delta > 0 else 'consumption',
+                    quantity=delta,
+                    bottling=bottling,
+                    created_by=user
+                )
+                for bottling, old in runs
+                for (material_type, material_id), delta in _consumption_changes(bottling, old, materials).items()
+            ])
+            StockReservation.objects.filter(bottling_id__in=saved_pks).delete()
+            StockReservation.objects.bulk_create([
+                StockReservation(
+                    organization_id=organization_id,
+                    bottling=bottling,
+                    material_type=material_type,
+                    material_id=material_id,
+                    quantity=quantity,
+                    created_by=user
+                )
+                for bottling in bottlings if bottling.status == 'unfinished'
+                for (material_type, material_id), quantity in _requirements(bottling, materials).items()
+            ])
+            TankHistory.objects.append(
+                entry for bottling, old in runs for entry in _bottling_history(bottling, old, materials, user)
+            )
+    except IntegrityError as e:
+        # The tank volume and stock CHECK constraints are the last line of defence
+        raise ValidationError(f"Bottling would violate tank volume or stock limits: {e}")
+
+    # Keep the caller's tank instances in step with the database
+    for bottling in bottlings:
+        if Bottling.tank.is_cached(bottling):
+            tank = bottling.tank
+            tank.current_volume = tanks[tank.pk].current_volume + deltas.get(tank.pk, 0)
+            tank._rollup_state = tank._get_rollup_state()
+    return bottlings
+
+def delete_bottling(bottling, user):
+    """
+    Delete a bottling run and put back the wine and materials it took.
+
+    The bottling is locked and booked by return_bottling() before the row is
+    deleted, in one transaction. The reservations of an unfinished run are
+    deleted with it.
+
+    Args:
+        bottling: Saved Bottling instance
+        user: User deleting the bottling
+
+    Returns:
+        tuple: The result of Model.delete()
+
+    Raises:
+        ValidationError: If the bottling no longer exists or its tank has no
+            room for the wine
+    """
+    organization_id = bottling.organization_id
+    with transaction.atomic(using=tenant_db(organization_id)):
+        old = Bottling.all_objects.select_for_update().filter(
+            pk=bottling.pk, organization_id=organization_id
+        ).first()
+        if old is None:
+            raise ValidationError("Bottling not found")
+        return_bottling(old, user)
+        # Booked above, so neither Bottling.delete() nor the post_delete
+        # receiver books it again
+        old._returned = True
+        return old.delete()
+
+def return_bottling(bottling, user):
+    """
+    Put back the wine and materials of a bottling run that is being deleted.
+
+    The tank and materials are locked, the wine is returned to the tank and
+    the consumed materials of a finished run to stock, and both are recorded
+    in the ledgers. Called by delete_bottling(), and by the post_delete
+    receiver for bottlings deleted in bulk, e.g. by a queryset delete().
+
+    Args:
+        bottling: The Bottling as it was before the delete
+        user: User deleting the bottling
+
+    Raises:
+        ValidationError: If the tank has no room for the wine
+    """
+    organization_id = bottling.organization_id
+    try:
+        with transaction.atomic(using=tenant_db(organization_id)):
+            tanks = lock_tanks([bottling.tank_id])
+            materials = _lock_materials([bottling])
+            litres = _litres(bottling, materials)
+            deltas = {bottling.tank_id: litres}
+            changes = _requirements(bottling, materials) if bottling.status == 'finished' else {}
+            errors = _bottling_errors(organization_id, tanks, deltas, materials, changes)
+            if errors:
+                raise ValidationError(errors)
+
+            update_tank_volumes(tanks, deltas, user)
+            _update_stock(changes, organization_id)
+            StockMovement.objects.bulk_create([
+                StockMovement(
+                    organization_id=organization_id,
+                    material_type=material_type,
+                    material_id=material_id,
+                    movement_type='return',
+                    quantity=quantity,
+                    notes=f"Bottling #{bottling.pk} deleted",
+                    created_by=user
+                )
+                for (material_type, material_id), quantity in changes.items()
+            ])
+            TankHistory.objects.append([TankHistory(
+                organization_id=organization_id,
+                tank_id=bottling.tank_id,
+                operation_type='bottling',
+                date=timezone.now().date(),
+                volume=litres,
+                notes=f"Returned {litres}L of a deleted bottling ({bottling.quantity} bottles)",
+                created_by=user
+            )])
+    except IntegrityError as e:
+        raise ValidationError(f"Deleting the bottling would violate tank volume or stock limits: {e}")
+
+def _lock_materials(bottlings):
+    """
+    Lock the materials of the bottlings for update, one query per material model.
+
+    Returns:
+        dict: Dicts with name, organization_id, stock and the bottle volume or
+            box capacity keyed by (material_type, material_id)
+    """
+    ids = {}
+    for bottling in bottlings:
+        for material_type in MATERIAL_MODELS:
+            material_id = getattr(bottling, f'{material_type}_id')
+            if material_id is not None:
+                ids.setdefault(material_type, set()).add(material_id)
+
+    extra = {'bottle': 'volume', 'box': 'bottle_capacity'}
+    locked = {}
+    for material_type, material_ids in ids.items():
+        fields = ['pk', 'name', 'organization_id', 'stock'] + ([extra[material_type]] if material_type in extra else [])
+        rows = MATERIAL_MODELS[material_type].all_objects.select_for_update().filter(
+            pk__in=material_ids
+        ).order_by('pk').values(*fields)
+        for row in rows:
+            locked[(material_type, row.pop('pk'))] = row
+        missing = material_ids - {pk for kind, pk in locked if kind == material_type}
+        if missing:
+            raise ValidationError(
+                f"{MATERIAL_MODELS[material_type]._meta.verbose_name_plural.capitalize()} not found: "
+                f"{', '.join(str(pk) for pk in sorted(missing))}"
+            )
+    return locked
+
+def _requirements(bottling, materials):
+    """Return the materials a bottling uses, with box capacities from the locked materials."""
+    box_capacity = materials[('box', bottling.box_id)]['bottle_capacity'] if bottling.box_id else None
+    return bottling_requirements(bottling, box_capacity)
+
+def _litres(bottling, materials):
+    """Return the wine a bottling takes from its tank in litres."""
+    return bottled_litres(bottling.quantity, materials[('bottle', bottling.bottle_id)]['volume'])
+
+def _consumption_changes(bottling, old, materials):
+    """Return the non-zero stock changes of replacing the old version of a bottling."""
+    before = _requirements(old, materials) if old is not None and old.status == 'finished' else {}
+    now = _requirements(bottling, materials) if bottling.status == 'finished' else {}
+    changes = {key: before.get(key, 0) - now.get(key, 0) for key in before.keys() | now.keys()}
+    return {key: delta for key, delta in changes.items() if delta}
+
+def _bottling_deltas(runs, materials):
+    """
+    Sum up the tank volume and stock changes of bottling runs.
+
+    Returns:
+        tuple: Volume change in litres keyed by tank ID and stock change keyed
+            by (material_type, material_id)
+    """
+    deltas = {}
+    changes = {}
+    for bottling, old in runs:
+        deltas[bottling.tank_id] = deltas.get(bottling.tank_id, 0) - _litres(bottling, materials)
+        if old is not None:
+            deltas[old.tank_id] = deltas.get(old.tank_id, 0) + _litres(old, materials)
+        for key, delta in _consumption_changes(bottling, old, materials).items():
+            changes[key] = changes.get(key, 0) + delta
+    return deltas, changes
+
+def _bottling_errors(organization_id, tanks, deltas, materials, changes):
+    """Check the bottling runs against the locked tanks and materials."""
+    errors = []
+    for pk, delta in deltas.items():
+        tank = tanks[pk]
+        if tank.organization_id != organization_id:
+            errors.append(f"Tank {tank.name} must belong to the same organization")
+        elif tank.current_volume + delta < 0:
+            errors.append(
+                f"Not enough wine in tank {tank.name}. Need {-delta}L but only {tank.current_volume}L available."
+            )
+        elif tank.current_volume + delta > tank.capacity:
+            errors.append(
+                f"Returning {delta}L would exceed tank {tank.name}'s capacity. "
+                f"Available space: {tank.capacity - tank.current_volume:.2f}L"
+            )
+    for (material_type, material_id), material in materials.items():
+        delta = changes.get((material_type, material_id), 0)
+        if material['organization_id'] != organization_id:
+            errors.append(f"{material['name']} must belong to the same organization")
+        elif material['stock'] + delta < 0:
+            errors.append(
+                f"Not enough {MATERIAL_MODELS[material_type]._meta.verbose_name_plural} in stock. "
+                f"Need {-delta} but only {material['stock']} available."
+            )
+    return errors
+
+def _bottling_history(bottling, old, materials, user):
+    """Return the unsaved tank history entries of saving a bottling run."""
+    litres = _litres(bottling, materials)
+    if old is None:
+        changes = [(bottling.tank_id, -litres, f"Bottled {litres}L ({bottling.quantity} bottles)")]
+    elif old.tank_id == bottling.tank_id:
+        changes = [(bottling.tank_id, _litres(old, materials) - litres,
+                    f"Bottling changed to {litres}L ({bottling.quantity} bottles)")]
+    else:
+        old_litres = _litres(old, materials)
+        changes = [
+            (old.tank_id, old_litres, f"Returned {old_litres}L of a bottling moved to another tank"),
+            (bottling.tank_id, -litres, f"Bottled {litres}L ({bottling.quantity} bottles)"),
+        ]
+    return [
+        TankHistory(
+            organization_id=bottling.organization_id,
+            tank_id=tank_id,
+            operation_type='bottling',
+            date=bottling.bottling_date,
+            volume=volume,
+            notes=notes,
+            created_by=user
+        )
+        for tank_id, volume, notes in changes
+        if volume
+    ]
+
+def get_available_to_promise(organization):
+    """
+    Return the stock, reservations and quantity available to promise of every
+    packaging material of an organization.
+
+    All four material tables are read in one UNION query, each with the
+    reservations of its materials summed in a grouped subquery.
+
+    Args:
+        organization: Organization instance or ID
+
+    Returns:
+        dict: Dicts with name, stock, reserved and available keyed by
+            (material_type, material_id)
+    """
+    organization_id = getattr(organization, 'pk', organization)
+    querysets = []
+    for material_type, model in MATERIAL_MODELS.items():
+        reserved = StockReservation.all_objects.filter(
+            material_type=material_type, material_id=OuterRef('pk')
+        ).order_by().values('material_id').annotate(total=Sum('quantity')).values('total')
+        querysets.append(
+            model.all_objects.filter(organization_id=organization_id).order_by().annotate(
+                kind=Value(material_type, output_field=CharField()),
+                reserved=Coalesce(Subquery(reserved, output_field=IntegerField()), Value(0)),
+                available=F('stock') - F('reserved'),
+            ).values_list('kind', 'pk', 'name', 'stock', 'reserved', 'available')
+        )
+    rows = querysets[0].union(*querysets[1:], all=True).using(tenant_db(organization_id))
+    return {
+        (kind, pk): {'name': name, 'stock': stock, 'reserved': reserved, 'available': available}
+        for kind, pk, name, stock, reserved, available in rows
+    }
+
+@dataclass
+class MaterialShortage:
+    """A packaging material the planned bottlings need more of than there is."""
+    material_type: str
+    material_id: int
+    name: str
+    required: int
+    stock: int
+    reserved: int
+    available: int
+    shortage: int
+    first_blocked_date: Optional[date]
+
+def _material_usage(bottlings, *group_by):
+    """
+    Sum the materials used by bottlings per material in one UNION query.
+
+    Args:
+        bottlings: Bottling queryset of one organization
+        *group_by: Further fields to group by, e.g. 'bottling_date'
+
+    Returns:
+        QuerySet: (material_type, material_id, *group_by, quantity) rows, with
+            boxes rounded up per bottling
+    """
+    bottlings = bottlings.order_by()
+    boxes = Ceil(Cast('quantity', FloatField()) / Cast('box__bottle_capacity', FloatField()))
+    querysets = []
+    for material_type, quantity in (
+        ('bottle', Sum('quantity')),
+        ('label', Sum('quantity')),
+        ('closure', Sum('quantity')),
+        ('box', Sum(boxes, output_field=IntegerField())),
+    ):
+        querysets.append(
+            bottlings.exclude(**{material_type: None}).values(material_type, *group_by).annotate(
+                kind=Value(material_type, output_field=CharField()),
+                quantity=quantity,
+            ).values_list('kind', material_type, *group_by, 'quantity')
+        )
+    return querysets[0].union(*querysets[1:], all=True).using(bottlings.db)
+
+def _planned_requirements(organization_id):
+    """
+    Return the materials needed by the unfinished bottlings of an organization.
+
+    Returns:
+        QuerySet: (material_type, material_id, bottling_date, required) rows
+    """
+    planned = Bottling.all_objects.using(tenant_db(organization_id)).filter(
+        organization_id=organization_id, status='unfinished'
+    )
+    return _material_usage(planned, 'bottling_date')
+
+def compute_material_shortages(organization):
+    """
+    Net the material requirements of all unfinished bottlings against stock.
+
+    Runs two queries, whatever the number of bottlings: one for the
+    requirements per material and date, and one for stock and reservations.
+    Reservations held for the planned bottlings themselves are not counted
+    twice, so a material is short when the plan needs more than its stock
+    minus the reservations of other bottlings. Walking the bottling dates in
+    order, the first date at which the running requirement exceeds that is
+    the first one the shortage blocks.
+
+    Args:
+        organization: Organization instance or ID
+
+    Returns:
+        list: MaterialShortage per short material, earliest blocked date first
+    """
+    organization_id = getattr(organization, 'pk', organization)
+    per_date = {}
+    for material_type, material_id, bottling_date, required in _planned_requirements(organization_id):
+        per_date.setdefault((material_type, material_id), []).append((bottling_date, int(required)))
+    if not per_date:
+        return []
+    stock = get_available_to_promise(organization_id)
+
+    shortages = []
+    for key, dates in per_date.items():
+        material = stock.get(key)
+        if material is None:
+            continue
+        dates.sort()
+        required = sum(quantity for _, quantity in dates)
+        other_reserved = max(material['reserved'] - required, 0)
+        usable = material['stock'] - other_reserved
+        if required <= usable:
+            continue
+        running = 0
+        for bottling_date, quantity in dates:
+            running += quantity
+            if running > usable:
+                break
+        shortages.append(MaterialShortage(
+            material_type=key[0],
+            material_id=key[1],
+            name=material['name'],
+            required=required,
+            stock=material['stock'],
+            reserved=material['reserved'],
+            available=material['available'],
+            shortage=required - usable,
+            first_blocked_date=bottling_date,
+        ))
+    shortages.sort(key=lambda shortage: (shortage.first_blocked_date, shortage.material_type, shortage.name))
+    return shortages
+
+def get_material_shortages(organization):
+    """
+    Return the cached material shortages of an organization.
+
+    Args:
+        organization: Organization instance or ID
+
+    Returns:
+        list: The MaterialShortage list of compute_material_shortages()
+    """
+    return get_or_set(
+        'material_shortages', lambda: compute_material_shortages(organization),
+        organization=organization,
+        depends_on=(Bottling, Bottle, Label, Closure, Box, StockReservation)
+    )
+
+@dataclass
+class ReorderSuggestion:
+    """A packaging material below its minimum stock and how much to order."""
+    material_type: str
+    material_id: int
+    name: str
+    supplier: Optional[str]
+    stock: int
+    minimum_stock: int
+    daily_usage: float
+    stockout_date: Optional[date]
+    suggested_quantity: int
+
+def _low_stock_materials(organization_id):
+    """
+    Return the materials of an organization below their minimum stock.
+
+    All four material tables are read in one UNION query; each part is served
+    by the material's partial low stock index.
+
+    Returns:
+        QuerySet: (material_type, material_id, name, supplier, stock,
+            minimum_stock) rows
+    """
+    querysets = [
+        model.all_objects.filter(organization_id=organization_id, stock__lt=F('minimum_stock')).order_by().annotate(
+            kind=Value(material_type, output_field=CharField())
+        ).values_list('kind', 'pk', 'name', 'supplier', 'stock', 'minimum_stock')
+        for material_type, model in MATERIAL_MODELS.items()
+    ]
+    return querysets[0].union(*querysets[1:], all=True).using(tenant_db(organization_id))
+
+def compute_reorder_suggestions(organization, today=None):
+    """
+    Suggest reorders for the packaging materials below their minimum stock.
+
+    The daily usage of each material is its use by the finished bottlings of
+    the last PACKAGING_USAGE_WINDOW_DAYS days, from which the date it runs
+    out is projected. The suggested quantity brings the stock back to the
+    minimum plus PACKAGING_REORDER_COVER_DAYS days of usage. Runs two
+    queries, whatever the number of materials.
+
+    Args:
+        organization: Organization instance or ID
+        today: Date to project from, today if omitted
+
+    Returns:
+        list: ReorderSuggestion per material below its minimum, the ones
+            running out first first
+    """
+    organization_id = getattr(organization, 'pk', organization)
+    today = today or timezone.localdate()
+    low_stock = list(_low_stock_materials(organization_id))
+    if not low_stock:
+        return []
+
+    window = getattr(settings, 'PACKAGING_USAGE_WINDOW_DAYS', 90)
+    cover_days = getattr(settings, 'PACKAGING_REORDER_COVER_DAYS', 30)
+    history = Bottling.all_objects.using(tenant_db(organization_id)).filter(
+        organization_id=organization_id,
+        status='finished',
+        bottling_date__gt=today - timedelta(days=window),
+        bottling_date__lte=today
+    )
+    used = {(kind, pk): quantity for kind, pk, quantity in _material_usage(history)}
+
+    suggestions = []
+    for material_type, material_id, name, supplier, stock, minimum_stock in low_stock:
+        daily_usage = (used.get((material_type, material_id)) or 0) / window
+        if stock <= 0:
+            stockout_date = today
+        elif daily_usage:
+            stockout_date = today + timedelta(days=int(stock / daily_usage))
+        else:
+            stockout_date = None
+        suggestions.append(ReorderSuggestion(
+            material_type=material_type,
+            material_id=material_id,
+            name=name,
+            supplier=supplier,
+            stock=stock,
+            minimum_stock=minimum_stock,
+            daily_usage=daily_usage,
+            stockout_date=stockout_date,
+            suggested_quantity=minimum_stock + math.ceil(daily_usage * cover_days) - stock,
+        ))
+    suggestions.sort(key=lambda suggestion: (
+        suggestion.stockout_date is None, suggestion.stockout_date or today, suggestion.material_type,
+        suggestion.name
+    ))
+    return suggestions
+
+def get_reorder_suggestions(organization):
+    """
+    Return the cached reorder suggestions of an organization.
+
+    Args:
+        organization: Organization instance or ID
+
+    Returns:
+        list: The ReorderSuggestion list of compute_reorder_suggestions()
+    """
+    return get_or_set(
+        'reorder_suggestions', lambda: compute_reorder_suggestions(organization),
+        timezone.localdate(),
+        organization=organization,
+        depends_on=(StockMovement, Bottling, Bottle, Label, Closure, Box)
+    )
@@ -0,0 +1,79 @@
+"""
+Fixtures shared by the packaging stock and bottling tests.
+"""
+
+import pytest
+from decimal import Decimal
+from cellars.models import Cellar, Tank
+from packaging.models import Bottle, Box, Closure, Label
+
+@pytest.fixture
+def user(create_user):
+    return create_user()
+
+@pytest.fixture
+def cellar(organization, user):
+    return Cellar.objects.create(
+        name='Test Cellar', location='Test Location', organization=organization, created_by=user
+    )
+
+@pytest.fixture
+def make_tank(cellar):
+    """Return a factory for stainless steel tanks in the test cellar."""
+    def make(name='Tank 1', volume='1000', capacity='5000'):
+        return Tank.objects.create(
+            name=name, tank_type='stainless_steel', capacity=Decimal(capacity), current_volume=Decimal(volume),
+            cellar=cellar, organization=cellar.organization, created_by=cellar.created_by
+        )
+    return make
+
+@pytest.fixture
+def make_materials(organization, user):
+    """
+    Return a factory for a bottle, label, closure and box.
+
+    The factory takes the stock and minimum stock per material type, e.g.
+    stock={'box': 0}, and further fields per material type, e.g.
+    bottle={'volume': 375}. Unless given, there are 1000 bottles, labels and
+    closures, 100 boxes of six, and no minimum stock.
+
+    Returns:
+        dict: The materials keyed by material type
+    """
+    def make(stock=None, minimum_stock=None, **fields):
+        stock = {'bottle': 1000, 'label': 1000, 'closure': 1000, 'box': 100, **(stock or {})}
+        minimum_stock = minimum_stock or {}
+        defaults = {
+            'bottle': (Bottle, {
+                'name': 'Bordeaux 0.75', 'bottle_type': 'bordeaux', 'volume': 750, 'glass_color': 'green',
+                'height': 300, 'diameter': 80, 'weight': 500,
+            }),
+            'label': (Label, {
+                'name': 'Front', 'label_type': 'front', 'material': 'paper', 'width': 100, 'height': 80,
+            }),
+            'closure': (Closure, {
+                'name': 'Cork', 'closure_type': 'cork_natural', 'material': 'cork', 'color': 'Natural',
+                'diameter': 24, 'height': 44,
+            }),
+            'box': (Box, {
+                'name': 'Six', 'box_type': 'six_pack', 'material': 'cardboard', 'bottle_capacity': 6,
+                'length': 300, 'width': 200, 'height': 320, 'weight': 400,
+            }),
+        }
+        return {
+            material_type: model.objects.create(**{
+                **values,
+                'stock': stock[material_type],
+                'minimum_stock': minimum_stock.get(material_type, 0),
+                'organization': organization,
+                'created_by': user,
+                **fields.get(material_type, {}),
+            })
+            for material_type, (model, values) in defaults.items()
+        }
+    return make
+
+@pytest.fixture
+def materials(make_materials):
+    """A bottle, label, closure and box with the default stock."""
+    return make_materials()
@@ -0,0 +1,126 @@
+"""
+Tests for the paginated bottling lists.
+"""
+
+import itertools
+import pytest
+from datetime import date, timedelta
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from cellars.models import Cellar, Tank
+from packaging.models import Bottle, Bottling, Box, Closure, Label
+
+@pytest.fixture
+def add_bottlings(tenant_client, organization):
+    """Return a helper that creates bottlings, each with its own tank and materials."""
+    _, user = tenant_client
+    common = {'organization': organization, 'created_by': user}
+    cellar = Cellar.objects.create(name='Test Cellar', location='Test Location', **common)
+    numbers = itertools.count()
+
+    def add(count, status='unfinished', start=date(2025, 1, 1)):
+        created = []
+        for day in range(count):
+            i = next(numbers)
+            finished = status == 'finished'
+            created.append(Bottling(
+                tank=Tank.objects.create(
+                    name=f'Tank {status} {i}', tank_type='stainless_steel', capacity=Decimal('1000'),
+                    cellar=cellar, **common
+                ),
+                bottle=Bottle.objects.create(
+                    name=f'Bottle {i}', bottle_type='bordeaux', volume=750, glass_color='green',
+                    height=300, diameter=80, weight=500, **common
+                ),
+                label=Label.objects.create(
+                    name=f'Label {i}', label_type='front', material='paper', width=100, height=80, **common
+                ) if finished else None,
+                closure=Closure.objects.create(
+                    name=f'Closure {i}', closure_type='screw_cap', material='aluminum', color='Silver',
+                    diameter=30, height=60, **common
+                ),
+                box=Box.objects.create(
+                    name=f'Box {i}', box_type='six_pack', material='cardboard', bottle_capacity=6,
+                    length=300, width=200, height=320, weight=400, **common
+                ) if finished else None,
+                bottling_date=start + timedelta(days=day // 3),
+                quantity=100,
+                status=status,
+                **common
+            ))
+        # bulk_create skips the tank volume and stock bookkeeping of Bottling.save
+        return Bottling.objects.bulk_create(created)
+    return add
+
+def count_queries(client, url, **headers):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(url, **headers)
+    assert response.status_code == 200
+    return len(queries), response
+
+@pytest.mark.django_db
+class TestBottlingLists:
+    @pytest.mark.parametrize('url_name', ['list_bottlings', 'list_unfinished_bottlings', 'list_finished_bottlings'])
+    def test_constant_queries_per_page(self, tenant_client, add_bottlings, url_name):
+        client, _ = tenant_client
+        url = reverse(f'packaging:{url_name}')
+        add_bottlings(2, 'unfinished')
+        add_bottlings(2, 'finished')
+        # Warm up the organization and material shortage caches first
+        client.get(url)
+        few, _ = count_queries(client, url)
+
+        add_bottlings(60, 'unfinished', start=date(2025, 2, 1))
+        add_bottlings(60, 'finished', start=date(2025, 2, 1))
+        client.get(url)
+        many, response = count_queries(client, url)
+
+        assert many == few
+        assert len(response.context['bottlings']) == 50
+        assert response.context['next_cursor']
+
+    def test_pages_by_status(self, tenant_client, add_bottlings):
+        client, _ = tenant_client
+        unfinished = add_bottlings(55, 'unfinished')
+        finished = add_bottlings(3, 'finished')
+
+        response = client.get(reverse('packaging:list_unfinished_bottlings'))
+        first_page = response.context['bottlings']
+        response = client.get(
+            reverse('packaging:list_unfinished_bottlings'), {'after': response.context['next_cursor']}
+        )
+        second_page = response.context['bottlings']
+
+        assert response.context['next_cursor'] is None
+        assert {b.pk for b in first_page} | {b.pk for b in second_page} == {b.pk for b in unfinished}
+        assert not {b.pk for b in first_page} & {b.pk for b in second_page}
+        # Newest first
+        assert first_page[0].bottling_date >= first_page[-1].bottling_date >= second_page[0].bottling_date
+
+        response = client.get(reverse('packaging:list_finished_bottlings'))
+        assert [b.pk for b in response.context['bottlings']] == [b.pk for b in reversed(finished)]
+
+    def test_json_page(self, tenant_client, add_bottlings):
+        client, _ = tenant_client
+        add_bottlings(2, 'unfinished')
+
+        _, response = count_queries(
+            client, reverse('packaging:list_unfinished_bottlings'), HTTP_X_REQUESTED_WITH='XMLHttpRequest'
+        )
+
+        data = response.json()
+        assert data['next'] is None
+        assert [row['tank'] for row in data['results']] == ['Tank unfinished 1', 'Tank unfinished 0']
+        assert data['results'][0]['missing_materials'] == ['Label', 'Box']
+        assert data['results'][0]['box'] is None
+
+    def test_invalid_cursor(self, tenant_client):
+        client, _ = tenant_client
+        response = client.get(reverse('packaging:list_bottlings'), {'after': 'garbage'})
+        assert response.status_code == 400
+
+    def test_str(self, add_bottlings):
+        [bottling] = add_bottlings(1, 'finished')
+        assert str(bottling) == 'Tank finished 0 - 100 bottles (Finished)'
@@ -0,0 +1,118 @@
+"""
+Tests for the material requirements of unfinished bottlings.
+"""
+
+import pytest
+import time
+from datetime import date, timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from packaging.models import Bottling
+from packaging.services import compute_material_shortages, get_material_shortages
+
+@pytest.fixture
+def tank(make_tank):
+    return make_tank(volume='40000', capacity='50000')
+
+@pytest.fixture
+def materials(make_materials):
+    return make_materials(stock={'label': 150, 'box': 30})
+
+@pytest.fixture
+def bottle(materials):
+    return materials['bottle']
+
+@pytest.fixture
+def label(materials):
+    return materials['label']
+
+@pytest.fixture
+def box(materials):
+    return materials['box']
+
+@pytest.fixture
+def plan(tank, bottle, user):
+    def add(day, quantity, **materials):
+        return Bottling.objects.create(
+            tank=tank, bottle=bottle, bottling_date=day, quantity=quantity, status='unfinished',
+            organization=tank.organization, created_by=user, **materials
+        )
+    return add
+
+@pytest.mark.django_db
+class TestMaterialShortages:
+    def test_nothing_planned(self, organization):
+        assert compute_material_shortages(organization) == []
+
+    def test_shortages_with_first_blocked_date(self, organization, plan, label, box):
+        plan(date(2025, 3, 1), 100, label=label, box=box)
+        plan(date(2025, 3, 3), 100, label=label, box=box)
+        plan(date(2025, 3, 5), 50, box=box)
+
+        shortages = {s.material_type: s for s in compute_material_shortages(organization)}
+
+        assert set(shortages) == {'label', 'box'}
+        assert shortages['label'].required == 200
+        assert shortages['label'].shortage == 50
+        assert shortages['label'].first_blocked_date == date(2025, 3, 3)
+        # 17 + 17 + 9 boxes, rounded up per bottling
+        assert shortages['box'].required == 43
+        assert shortages['box'].shortage == 13
+        assert shortages['box'].first_blocked_date == date(2025, 3, 3)
+
+    def test_reservations_of_other_bottlings_are_netted(self, organization, plan, label, tank, bottle, user):
+        plan(date(2025, 3, 10), 100, label=label)
+        # A reservation that isn't part of the unfinished plan, e.g. kept by a
+        # bottling whose reservations were not released yet
+        other = plan(date(2025, 3, 1), 80, label=label)
+        Bottling.objects.filter(pk=other.pk).update(status='finished')
+
+        [shortage] = compute_material_shortages(organization)
+
+        assert shortage.material_type == 'label'
+        assert shortage.reserved == 180
+        assert shortage.shortage == 30
+        assert shortage.first_blocked_date == date(2025, 3, 10)
+
+    def test_other_organizations_are_ignored(self, organization, plan, label, create_user):
+        from organizations.models import Organization
+        plan(date(2025, 3, 1), 200, label=label)
+        other = Organization.objects.create(
+            name='Other Winery', slug='other-winery', address='Other Address', tax_number='98765432109',
+            contact_email='other@example.com', contact_phone='111111', created_by=organization.created_by
+        )
+
+        assert compute_material_shortages(other) == []
+        assert len(compute_material_shortages(organization)) == 1
+
+    def test_fixed_query_count_for_large_plan(self, organization, tank, bottle, label, box, user):
+        start = date(2025, 1, 1)
+        Bottling.objects.bulk_create([
+            Bottling(
+                tank=tank, bottle=bottle, label=label, box=box, bottling_date=start + timedelta(days=i % 200),
+                quantity=10 + i % 7, status='unfinished', organization=organization, created_by=user
+            )
+            for i in range(3000)
+        ])
+
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            shortages = compute_material_shortages(organization)
+            elapsed = time.perf_counter() - started
+
+        assert len(queries) == 2
+        assert {s.material_type for s in shortages} == {'bottle', 'label', 'box'}
+        assert all(s.first_blocked_date <= start + timedelta(days=20) for s in shortages)
+        # Generous bound for slow CI machines; typically well under 100 ms
+        assert elapsed < 1
+
+    def test_cached_until_plan_changes(self, organization, plan, label):
+        plan(date(2025, 3, 1), 100, label=label)
+        assert get_material_shortages(organization) == []
+
+        with CaptureQueriesContext(connection) as queries:
+            get_material_shortages(organization)
+        assert len(queries) == 0
+
+        plan(date(2025, 3, 2), 100, label=label)
+        assert [s.shortage for s in get_material_shortages(organization)] == [50]
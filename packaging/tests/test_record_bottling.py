@@ -0,0 +1,240 @@
+"""
+Tests for recording bottling runs with their wine and materials.
+"""
+
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from cellars.models import Tank, TankHistory
+from packaging.models import Bottling, Box, StockMovement, StockReservation
+from packaging.services import bottled_litres, delete_bottling, record_bottling, record_bottlings
+
+@pytest.fixture
+def materials(make_materials):
+    return make_materials(bottle={'name': 'Bordeaux 0.375', 'volume': 375})
+
+@pytest.fixture
+def run(materials, user):
+    def make(tank, quantity, finished=True, **overrides):
+        return Bottling(**{
+            'tank': tank,
+            'bottle': materials['bottle'],
+            'label': materials['label'] if finished else None,
+            'closure': materials['closure'],
+            'box': materials['box'] if finished else None,
+            'bottling_date': date(2025, 3, 1),
+            'quantity': quantity,
+            'status': 'finished' if finished else 'unfinished',
+            'created_by': user,
+            **overrides,
+        })
+    return make
+
+def volume(tank):
+    return Tank.objects.get(pk=tank.pk).current_volume
+
+def stock(materials):
+    return {name: type(material).objects.get(pk=material.pk).stock for name, material in materials.items()}
+
+@pytest.mark.django_db
+class TestRecordBottling:
+    def test_exact_decimal_litres(self):
+        assert bottled_litres(3, 375) == Decimal('1.13')
+        assert bottled_litres(1000, 750.0) == Decimal('750.00')
+        # 0.1 + 0.2 style float errors don't leak into the litres
+        assert bottled_litres(3, 100.1) == Decimal('0.30')
+
+    def test_books_wine_materials_and_history(self, make_tank, run, materials, user):
+        tank = make_tank('Tank 1')
+
+        bottling = record_bottling(run(tank, 100), user)
+
+        assert bottling.pk is not None
+        assert volume(tank) == Decimal('962.50')
+        # The caller's tank follows the database
+        assert tank.current_volume == Decimal('962.50')
+        assert stock(materials) == {'bottle': 900, 'label': 900, 'closure': 900, 'box': 83}
+        history = TankHistory.objects.get(tank=tank, operation_type='bottling')
+        assert history.volume == Decimal('-37.50')
+        assert history.notes == 'Bottled 37.50L (100 bottles)'
+        assert StockMovement.objects.filter(bottling=bottling, movement_type='consumption').count() == 4
+
+    def test_change_applies_difference(self, make_tank, run, materials, user):
+        tank = make_tank('Tank 1')
+        bottling = record_bottling(run(tank, 100), user)
+
+        bottling.quantity = 60
+        record_bottling(bottling, user)
+
+        assert volume(tank) == Decimal('977.50')
+        assert stock(materials) == {'bottle': 940, 'label': 940, 'closure': 940, 'box': 90}
+        assert list(
+            TankHistory.objects.filter(tank=tank).order_by('sequence').values_list('volume', flat=True)
+        ) == [Decimal('-37.50'), Decimal('15.00')]
+
+    def test_moving_to_another_tank(self, make_tank, run, user):
+        first, second = make_tank('Tank 1'), make_tank('Tank 2')
+        bottling = record_bottling(run(first, 100), user)
+
+        bottling.tank = second
+        record_bottling(bottling, user)
+
+        assert volume(first) == Decimal('1000.00')
+        assert volume(second) == Decimal('962.50')
+
+    def test_unfinished_run_reserves(self, make_tank, run, materials, user):
+        tank = make_tank('Tank 1')
+
+        bottling = record_bottling(run(tank, 100, finished=False), user)
+
+        assert volume(tank) == Decimal('962.50')
+        assert stock(materials) == {'bottle': 1000, 'label': 1000, 'closure': 1000, 'box': 100}
+        assert sorted(bottling.reservations.values_list('material_type', 'quantity')) == [
+            ('bottle', 100), ('closure', 100)
+        ]
+
+    def test_not_enough_wine_changes_nothing(self, make_tank, run, materials, user):
+        tank = make_tank('Tank 1', volume='10')
+
+        with pytest.raises(ValidationError, match='Not enough wine in tank Tank 1'):
+            record_bottling(run(tank, 100), user)
+
+        assert volume(tank) == Decimal('10')
+        assert stock(materials)['bottle'] == 1000
+        assert not Bottling.objects.exists()
+        assert not TankHistory.objects.filter(operation_type='bottling').exists()
+
+    def test_save_goes_through_the_service(self, make_tank, run, materials):
+        tank = make_tank('Tank 1')
+
+        run(tank, 8).save()
+
+        assert volume(tank) == Decimal('997.00')
+        assert stock(materials)['box'] == 98
+
+    def test_update_fields_save_does_not_book(self, make_tank, run, materials, user):
+        tank = make_tank('Tank 1')
+        bottling = record_bottling(run(tank, 100), user)
+
+        bottling.notes = 'Labels smudged'
+        bottling.save(update_fields=['notes'])
+
+        assert Bottling.objects.get(pk=bottling.pk).notes == 'Labels smudged'
+        assert volume(tank) == Decimal('962.50')
+        assert TankHistory.objects.filter(tank=tank).count() == 1
+        with pytest.raises(ValueError, match='quantity, tank can only be saved through record_bottling'):
+            bottling.save(update_fields=['quantity', 'tank_id'])
+
+    def test_views_book_as_the_request_user(self, tenant_client, make_tank, run, materials, user):
+        client, member = tenant_client
+        tank = make_tank('Tank 1')
+        bottling = record_bottling(run(tank, 100, finished=False), user)
+
+        response = client.post(reverse('packaging:update_bottling', kwargs={'pk': bottling.pk}), {
+            'tank': tank.pk, 'bottle': materials['bottle'].pk, 'closure': materials['closure'].pk,
+            'bottling_date': '2025-03-01', 'quantity': 60,
+        })
+
+        assert response.status_code == 302
+        assert volume(tank) == Decimal('977.50')
+        change = TankHistory.objects.filter(tank=tank).order_by('-sequence').first()
+        assert (change.volume, change.created_by) == (Decimal('15.00'), member)
+
+@pytest.mark.django_db
+class TestDeleteBottling:
+    def test_returns_wine_and_materials(self, make_tank, run, materials, user):
+        tank = make_tank('Tank 1')
+        bottling = record_bottling(run(tank, 100), user)
+
+        delete_bottling(bottling, user)
+
+        assert not Bottling.objects.exists()
+        assert volume(tank) == Decimal('1000.00')
+        assert stock(materials) == {'bottle': 1000, 'label': 1000, 'closure': 1000, 'box': 100}
+        returned = TankHistory.objects.filter(tank=tank).order_by('-sequence').first()
+        assert (returned.volume, returned.notes) == (Decimal('37.50'), 'Returned 37.50L of a deleted bottling (100 bottles)')
+        assert sorted(StockMovement.objects.filter(movement_type='return').values_list('material_type', 'quantity')) == [
+            ('bottle', 100), ('box', 17), ('closure', 100), ('label', 100)
+        ]
+        # The bottling stays in the ledger, cancelled by the return
+        assert list(
+            TankHistory.objects.filter(tank=tank).order_by('sequence').values_list('volume', flat=True)
+        ) == [Decimal('-37.50'), Decimal('37.50')]
+
+    def test_unfinished_run_releases_reservations(self, make_tank, run, materials, user):
+        tank = make_tank('Tank 1')
+        bottling = record_bottling(run(tank, 100, finished=False), user)
+
+        delete_bottling(bottling, user)
+
+        assert volume(tank) == Decimal('1000.00')
+        assert not StockReservation.objects.exists()
+        assert not StockMovement.objects.filter(movement_type='return').exists()
+
+    def test_full_tank_keeps_the_bottling(self, make_tank, run, materials, user):
+        tank = make_tank('Tank 1')
+        bottling = record_bottling(run(tank, 100), user)
+        Tank.objects.filter(pk=tank.pk).update(current_volume=Decimal('4990'))
+
+        with pytest.raises(ValidationError, match="exceed tank Tank 1's capacity"):
+            delete_bottling(bottling, user)
+
+        assert Bottling.objects.filter(pk=bottling.pk).exists()
+        assert volume(tank) == Decimal('4990.00')
+        assert stock(materials)['bottle'] == 900
+
+    def test_view_deletes_as_the_request_user(self, tenant_client, make_tank, run, materials, user):
+        client, member = tenant_client
+        tank = make_tank('Tank 1')
+        bottling = record_bottling(run(tank, 100), user)
+
+        response = client.post(reverse('packaging:delete_bottling', kwargs={'pk': bottling.pk}))
+
+        assert response.status_code == 302
+        assert not Bottling.objects.exists()
+        assert volume(tank) == Decimal('1000.00')
+        assert TankHistory.objects.filter(tank=tank).order_by('-sequence').first().created_by == member
+        assert set(StockMovement.objects.filter(movement_type='return').values_list('created_by', flat=True)) == {
+            member.pk
+        }
+
+@pytest.mark.django_db
+class TestRecordBottlings:
+    def test_days_shifts_in_fixed_queries(self, make_tank, run, materials, user):
+        tanks = [make_tank(f'Tank {i}') for i in range(2)]
+        record_bottlings([run(tanks[0], 10)], user)
+
+        with CaptureQueriesContext(connection) as queries:
+            record_bottlings([run(tanks[0], 10)], user)
+        few = len(queries)
+
+        shifts = [run(tanks[i % 2], 10 + i, finished=i % 3 != 0) for i in range(12)]
+        with CaptureQueriesContext(connection) as queries:
+            recorded = record_bottlings(shifts, user, bottling_date=date(2025, 3, 2))
+        many = len(queries)
+
+        # The unfinished runs add one insert for their reservations
+        assert many == few + 1
+        assert {b.bottling_date for b in recorded} == {date(2025, 3, 2)}
+        assert Bottling.objects.count() == 14
+        assert TankHistory.objects.filter(operation_type='bottling').count() == 14
+        assert StockReservation.objects.count() == 4 * 2
+
+    def test_shortage_in_one_shift_rolls_back_all(self, make_tank, run, materials, user):
+        tank = make_tank('Tank 1')
+        Box.objects.filter(pk=materials['box'].pk).update(stock=20)
+
+        with pytest.raises(ValidationError, match='Not enough boxes'):
+            record_bottlings([run(tank, 60), run(tank, 70)], user)
+
+        assert volume(tank) == Decimal('1000')
+        assert stock(materials) == {'bottle': 1000, 'label': 1000, 'closure': 1000, 'box': 20}
+        assert not Bottling.objects.exists()
+
+    def test_rejects_empty_batch(self, user):
+        with pytest.raises(ValidationError, match='At least one bottling'):
+            record_bottlings([], user)
@@ -0,0 +1,114 @@
+"""
+Tests for the packaging reorder suggestions and the suggest_reorders command.
+"""
+
+import json
+import pytest
+from datetime import date, timedelta
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from packaging.models import Bottling
+from packaging.services import apply_stock_changes, compute_reorder_suggestions, get_reorder_suggestions
+
+TODAY = date(2025, 6, 30)
+
+@pytest.fixture
+def materials(make_materials):
+    return make_materials(
+        stock={'bottle': 900, 'label': 5000, 'closure': 50, 'box': 0},
+        minimum_stock={'bottle': 1000, 'label': 100, 'closure': 200, 'box': 10},
+        bottle={'supplier': 'Glassworks'}
+    )
+
+@pytest.fixture
+def history(organization, user, materials, make_tank):
+    """Record 900 bottles with labels and closures bottled over the last 90 days."""
+    tank = make_tank()
+    # bulk_create skips Bottling.save, so stock stays as set up above
+    Bottling.objects.bulk_create([
+        Bottling(
+            tank=tank, bottle=materials['bottle'], label=materials['label'], closure=materials['closure'],
+            bottling_date=TODAY - timedelta(days=days_ago), quantity=300, status='finished',
+            organization=organization, created_by=user
+        )
+        for days_ago in (1, 30, 60)
+    ] + [
+        Bottling(
+            tank=tank, bottle=materials['bottle'], bottling_date=TODAY - timedelta(days=200), quantity=5000,
+            status='finished', organization=organization, created_by=user
+        ),
+        Bottling(
+            tank=tank, bottle=materials['bottle'], bottling_date=TODAY, quantity=5000,
+            status='unfinished', organization=organization, created_by=user
+        ),
+    ])
+
+@pytest.mark.django_db
+class TestReorderSuggestions:
+    def test_suggestions_for_materials_below_minimum(self, organization, materials, history, settings):
+        settings.PACKAGING_USAGE_WINDOW_DAYS = 90
+        settings.PACKAGING_REORDER_COVER_DAYS = 30
+
+        with CaptureQueriesContext(connection) as queries:
+            suggestions = compute_reorder_suggestions(organization, today=TODAY)
+        assert len(queries) == 2
+
+        assert [s.material_type for s in suggestions] == ['box', 'closure', 'bottle']
+        box, closure, bottle = suggestions
+        # Out of stock and never used
+        assert box.stockout_date == TODAY
+        assert box.suggested_quantity == 10
+        # 900 used in 90 days is 10 a day
+        assert closure.daily_usage == 10
+        assert closure.stockout_date == TODAY + timedelta(days=5)
+        assert closure.suggested_quantity == 200 + 300 - 50
+        assert bottle.stockout_date == TODAY + timedelta(days=90)
+        assert bottle.supplier == 'Glassworks'
+
+    def test_no_materials_below_minimum(self, organization, materials):
+        for material in materials.values():
+            type(material).objects.filter(pk=material.pk).update(minimum_stock=0)
+
+        with CaptureQueriesContext(connection) as queries:
+            assert compute_reorder_suggestions(organization, today=TODAY) == []
+        assert len(queries) == 1
+
+    def test_cache_follows_stock_movements(self, organization, materials, user):
+        assert len(get_reorder_suggestions(organization)) == 3
+
+        with CaptureQueriesContext(connection) as queries:
+            get_reorder_suggestions(organization)
+        assert len(queries) == 0
+
+        apply_stock_changes({('closure', materials['closure'].pk): 1000}, user, organization, movement_type='receipt')
+        assert {s.material_type for s in get_reorder_suggestions(organization)} == {'bottle', 'box'}
+
+    def test_unfinished_list_shows_suggestions(self, tenant_client, materials):
+        client, _ = tenant_client
+
+        response = client.get(reverse('packaging:list_unfinished_bottlings'))
+
+        assert response.status_code == 200
+        assert [s.material_type for s in response.context['reorder_suggestions']] == ['box', 'bottle', 'closure']
+        assert 'Reorder Suggestions' in response.content.decode()
+
+@pytest.mark.django_db
+class TestSuggestReordersCommand:
+    def test_prints_suggestions(self, organization, materials):
+        out = StringIO()
+        call_command('suggest_reorders', stdout=out)
+
+        assert 'Order 10 x Six (box)' in out.getvalue()
+        assert 'Order 100 x Bordeaux 0.75 (bottle, Glassworks)' in out.getvalue()
+        assert '3 materials to reorder' in out.getvalue()
+
+    def test_json_for_one_organization(self, organization, materials):
+        out = StringIO()
+        call_command('suggest_reorders', '--organization', str(organization.pk), '--json', stdout=out)
+
+        report = json.loads(out.getvalue())
+        assert [s['material_type'] for s in report[str(organization.pk)]] == ['box', 'bottle', 'closure']
+        assert report[str(organization.pk)][0]['stockout_date'] is not None
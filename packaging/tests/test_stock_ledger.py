@@ -0,0 +1,194 @@
+"""
+Tests for the packaging stock ledger, reservations and available to promise.
+"""
+
+import importlib
+import pytest
+from decimal import Decimal
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.db.models import Sum
+from django.forms.models import model_to_dict
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from cellars.models import Tank
+from packaging.forms import BottleForm
+from packaging.models import Bottle, Bottling, Box, StockMovement, StockReservation
+from packaging.services import apply_stock_changes, get_available_to_promise
+
+@pytest.fixture
+def tank(make_tank):
+    return make_tank(volume='3000')
+
+@pytest.fixture
+def bottle_run(tank, materials, user):
+    def create(quantity, status, **overrides):
+        return Bottling.objects.create(**{
+            'tank': tank,
+            'bottle': materials['bottle'],
+            'label': materials['label'],
+            'closure': materials['closure'],
+            'box': materials['box'],
+            'bottling_date': '2025-03-01',
+            'quantity': quantity,
+            'status': status,
+            'organization': tank.organization,
+            'created_by': user,
+            **overrides,
+        })
+    return create
+
+def stock(materials):
+    return {name: type(material).objects.get(pk=material.pk).stock for name, material in materials.items()}
+
+@pytest.mark.django_db
+class TestStockLedger:
+    def test_finished_bottling_consumes_materials(self, bottle_run, materials):
+        bottling = bottle_run(100, 'finished')
+
+        assert stock(materials) == {'bottle': 900, 'label': 900, 'closure': 900, 'box': 83}
+        movements = StockMovement.objects.filter(bottling=bottling, movement_type='consumption')
+        assert sorted(movements.values_list('material_type', 'quantity')) == [
+            ('bottle', -100), ('box', -17), ('closure', -100), ('label', -100)
+        ]
+        assert not StockReservation.objects.exists()
+
+    def test_unfinished_bottling_reserves_materials(self, bottle_run, materials, organization):
+        bottle_run(100, 'unfinished', closure=None)
+
+        assert stock(materials) == {'bottle': 1000, 'label': 1000, 'closure': 1000, 'box': 100}
+        available = get_available_to_promise(organization)
+        assert available[('bottle', materials['bottle'].pk)] == {
+            'name': 'Bordeaux 0.75', 'stock': 1000, 'reserved': 100, 'available': 900
+        }
+        assert available[('box', materials['box'].pk)]['reserved'] == 17
+        assert available[('closure', materials['closure'].pk)]['reserved'] == 0
+
+    def test_finishing_consumes_and_releases_reservations(self, bottle_run, materials):
+        bottling = bottle_run(60, 'unfinished')
+        bottling.status = 'finished'
+        bottling.save()
+
+        assert stock(materials) == {'bottle': 940, 'label': 940, 'closure': 940, 'box': 90}
+        assert not StockReservation.objects.exists()
+
+    def test_quantity_change_applies_difference(self, bottle_run, materials):
+        bottling = bottle_run(60, 'finished')
+        bottling.quantity = 50
+        bottling.save()
+
+        assert stock(materials) == {'bottle': 950, 'label': 950, 'closure': 950, 'box': 91}
+
+    def test_shortage_fails_without_changes(self, bottle_run, materials):
+        Box.objects.filter(pk=materials['box'].pk).update(stock=5)
+
+        with pytest.raises(ValidationError, match='Not enough boxes'):
+            bottle_run(100, 'finished')
+
+        assert stock(materials) == {'bottle': 1000, 'label': 1000, 'closure': 1000, 'box': 5}
+        assert not Bottling.objects.exists()
+        assert not StockMovement.objects.filter(movement_type='consumption').exists()
+
+    def test_deleting_finished_bottling_returns_wine_and_materials(self, bottle_run, materials, tank):
+        bottling = bottle_run(100, 'finished')
+        assert Tank.objects.get(pk=tank.pk).current_volume == Decimal('2925.00')
+
+        bottling.delete()
+
+        assert Tank.objects.get(pk=tank.pk).current_volume == Decimal('3000.00')
+        assert stock(materials) == {'bottle': 1000, 'label': 1000, 'closure': 1000, 'box': 100}
+        assert StockMovement.objects.filter(movement_type='return').count() == 4
+        assert tank.history.filter(volume=Decimal('75.00')).count() == 1
+
+    def test_queryset_delete_returns_wine_and_materials(self, bottle_run, materials, tank):
+        bottle_run(40, 'finished')
+        bottle_run(20, 'unfinished')
+
+        Bottling.objects.all().delete()
+
+        assert Tank.objects.get(pk=tank.pk).current_volume == Decimal('3000.00')
+        assert stock(materials) == {'bottle': 1000, 'label': 1000, 'closure': 1000, 'box': 100}
+        assert not StockReservation.objects.exists()
+        assert sorted(tank.history.values_list('volume', flat=True)) == [
+            Decimal('-30.00'), Decimal('-15.00'), Decimal('15.00'), Decimal('30.00')
+        ]
+
+    def test_edited_stock_is_applied_as_difference(self, materials, user, organization):
+        bottle = Bottle.objects.get(pk=materials['bottle'].pk)
+        # A bottling line takes bottles while the form is being edited
+        apply_stock_changes({('bottle', bottle.pk): -10}, user, organization)
+
+        bottle.stock += 5
+        bottle.save()
+
+        assert bottle.stock == 995
+        assert stock(materials)['bottle'] == 995
+        assert StockMovement.objects.filter(movement_type='adjustment').get().quantity == 5
+
+    def test_stock_edited_in_the_form_is_booked_to_the_editor(self, tenant_client, materials):
+        client, editor = tenant_client
+        bottle = materials['bottle']
+        data = {
+            name: value for name, value in model_to_dict(bottle, fields=BottleForm.Meta.fields).items()
+            if value is not None
+        }
+
+        response = client.post(reverse('packaging:update_bottle', args=[bottle.pk]), {**data, 'stock': 1200})
+
+        assert response.status_code == 302
+        adjustment = StockMovement.objects.get(movement_type='adjustment')
+        assert (adjustment.quantity, adjustment.created_by) == (200, editor)
+
+    def test_saving_material_keeps_concurrent_stock_changes(self, materials, user, organization):
+        bottle = Bottle.objects.get(pk=materials['bottle'].pk)
+        apply_stock_changes({('bottle', bottle.pk): -10}, user, organization)
+
+        bottle.notes = 'New supplier'
+        bottle.save()
+
+        assert stock(materials)['bottle'] == 990
+
+    def test_available_to_promise_is_one_query(self, bottle_run, materials, organization):
+        bottle_run(10, 'unfinished')
+        bottle_run(20, 'unfinished')
+
+        with CaptureQueriesContext(connection) as queries:
+            available = get_available_to_promise(organization)
+
+        assert len(queries) == 1
+        assert len(available) == 4
+        assert available[('label', materials['label'].pk)]['available'] == 970
+
+@pytest.mark.django_db
+class TestStockLedgerBackfill:
+    def test_migration_reserves_and_records_opening_balances(self, bottle_run, materials):
+        migration = importlib.import_module('packaging.migrations.0009_stock_ledger_backfill')
+        bottling = bottle_run(50, 'unfinished')
+        # As before the ledger: stock without movements, no reservations
+        StockReservation.objects.all().delete()
+        StockMovement.objects.all().delete()
+        Bottle.objects.filter(pk=materials['bottle'].pk).update(stock=700)
+
+        migration.reserve_unfinished_bottlings(apps, None)
+        migration.record_opening_balances(apps, None)
+
+        assert sorted(bottling.reservations.values_list('material_type', 'quantity')) == [
+            ('bottle', 50), ('box', 9), ('closure', 50), ('label', 50)
+        ]
+        totals = dict(
+            StockMovement.objects.order_by().values_list('material_type').annotate(total=Sum('quantity'))
+        )
+        assert totals == stock(materials) == {'bottle': 700, 'label': 1000, 'closure': 1000, 'box': 100}
+        assert set(StockMovement.objects.values_list('movement_type', 'notes')) == {('receipt', 'Opening balance')}
+
+    def test_migration_is_a_no_op_for_ledgered_materials(self, bottle_run, materials):
+        migration = importlib.import_module('packaging.migrations.0009_stock_ledger_backfill')
+        bottle_run(50, 'unfinished')
+        bottle_run(30, 'finished')
+        movements, reservations = StockMovement.objects.count(), StockReservation.objects.count()
+
+        migration.reserve_unfinished_bottlings(apps, None)
+        migration.record_opening_balances(apps, None)
+
+        assert (StockMovement.objects.count(), StockReservation.objects.count()) == (movements, reservations)
@@ -35,4 +35,5 @@ urlpatterns = [
     path('bottlings/<int:pk>/edit/', views.BottlingUpdateView.as_view(), name='update_bottling'),
     path('bottlings/<int:pk>/delete/', views.delete_bottling, name='delete_bottling'),
     path('bottlings/unfinished/', views.list_unfinished_bottlings, name='list_unfinished_bottlings'),
+    path('bottlings/finished/', views.list_finished_bottlings, name='list_finished_bottlings'),
 ]
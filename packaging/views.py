@@ -7,13 +7,14 @@ functionality for monitoring packaging efficiency and material usage.
 """
 
 import logging
-import math
+from django.http import HttpResponseBadRequest, HttpResponseNotAllowed, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.db.models import Q, F
 from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.views.generic import ListView, DetailView, CreateView, UpdateView
 from core.utils.exceptions import (
     handle_view_exception,
@@ -24,7 +25,14 @@ from core.utils.exceptions import (
 )
 from .models import Bottle, Label, Closure, Box, Bottling
 from .forms import BottleForm, LabelForm, ClosureForm, BoxForm, BottlingForm
+from .services import (
+    delete_bottling as delete_bottling_run,
+    get_material_shortages,
+    get_reorder_suggestions,
+    record_bottling
+)
 from cellars.models import Tank
+from core.utils.pagination import keyset_paginate
 from core.views import TenantViewMixin
 
 logger = logging.getLogger('vinco')
@@ -44,7 +52,7 @@ class BottleCreateView(TenantViewMixin, CreateView):
     model = Bottle
     form_class = BottleForm
     template_name = 'packaging/bottle_form.html'
-    success_url = reverse_lazy('packaging:bottle-list')
+    success_url = reverse_lazy('packaging:list_bottles')
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -55,13 +63,18 @@ class BottleUpdateView(TenantViewMixin, UpdateView):
     model = Bottle
     form_class = BottleForm
     template_name = 'packaging/bottle_form.html'
-    success_url = reverse_lazy('packaging:bottle-list')
+    success_url = reverse_lazy('packaging:list_bottles')
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         kwargs['organization'] = self.request.organization
         return kwargs
 
+    def form_valid(self, form):
+        # Stock adjustments made through the form are booked to the editor
+        form.instance.updated_by = self.request.user
+        return super().form_valid(form)
+
 # Label Views
 class LabelListView(TenantViewMixin, ListView):
     model = Label
@@ -77,7 +90,7 @@ class LabelCreateView(TenantViewMixin, CreateView):
     model = Label
     form_class = LabelForm
     template_name = 'packaging/label_form.html'
-    success_url = reverse_lazy('packaging:label-list')
+    success_url = reverse_lazy('packaging:list_labels')
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -88,13 +101,17 @@ class LabelUpdateView(TenantViewMixin, UpdateView):
     model = Label
     form_class = LabelForm
     template_name = 'packaging/label_form.html'
-    success_url = reverse_lazy('packaging:label-list')
+    success_url = reverse_lazy('packaging:list_labels')
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         kwargs['organization'] = self.request.organization
         return kwargs
 
+    def form_valid(self, form):
+        form.instance.updated_by = self.request.user
+        return super().form_valid(form)
+
 # Closure Views
 class ClosureListView(TenantViewMixin, ListView):
     model = Closure
@@ -110,7 +127,7 @@ class ClosureCreateView(TenantViewMixin, CreateView):
     model = Closure
     form_class = ClosureForm
     template_name = 'packaging/closure_form.html'
-    success_url = reverse_lazy('packaging:closure-list')
+    success_url = reverse_lazy('packaging:list_closures')
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -121,13 +138,17 @@ class ClosureUpdateView(TenantViewMixin, UpdateView):
     model = Closure
     form_class = ClosureForm
     template_name = 'packaging/closure_form.html'
-    success_url = reverse_lazy('packaging:closure-list')
+    success_url = reverse_lazy('packaging:list_closures')
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         kwargs['organization'] = self.request.organization
         return kwargs
 
+    def form_valid(self, form):
+        form.instance.updated_by = self.request.user
+        return super().form_valid(form)
+
 # Box Views
 class BoxListView(TenantViewMixin, ListView):
     model = Box
@@ -143,7 +164,7 @@ class BoxCreateView(TenantViewMixin, CreateView):
     model = Box
     form_class = BoxForm
     template_name = 'packaging/box_form.html'
-    success_url = reverse_lazy('packaging:box-list')
+    success_url = reverse_lazy('packaging:list_boxes')
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
@@ -154,45 +175,124 @@ class BoxUpdateView(TenantViewMixin, UpdateView):
     model = Box
     form_class = BoxForm
     template_name = 'packaging/box_form.html'
-    success_url = reverse_lazy('packaging:box-list')
+    success_url = reverse_lazy('packaging:list_boxes')
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         kwargs['organization'] = self.request.organization
         return kwargs
 
+    def form_valid(self, form):
+        form.instance.updated_by = self.request.user
+        return super().form_valid(form)
+
 # Bottling Views
+BOTTLING_ORDERING = ['-bottling_date', '-pk']
+BOTTLING_PAGE_SIZE = 50
+
+def _bottling_json(bottling):
+    """Return the JSON representation of a bottling on a list page."""
+    return {
+        'id': bottling.pk,
+        'bottling_date': bottling.bottling_date,
+        'status': bottling.status,
+        'quantity': bottling.quantity,
+        'tank': bottling.tank.name,
+        'bottle': bottling.bottle.name,
+        'closure': bottling.closure.name if bottling.closure else None,
+        'label': bottling.label.name if bottling.label else None,
+        'box': bottling.box.name if bottling.box else None,
+        'missing_materials': bottling.missing_materials,
+    }
+
+def render_bottling_page(request, queryset, template_name, context=None):
+    """
+    Render one keyset paginated page of bottlings as HTML, or as JSON for XHR callers.
+
+    Pages are ordered by (bottling_date, id), newest first, and fetched with
+    the tank and all packaging materials, so every page costs the same
+    number of queries however many bottlings there are.
+
+    Args:
+        request: The HTTP request object, with an optional 'after' cursor
+        queryset: Bottlings to list
+        template_name: Template of the HTML page
+        context: Further template context
+
+    Returns:
+        HttpResponse: The page, or 400 for an invalid cursor
+    """
+    try:
+        page = keyset_paginate(
+            queryset.with_materials(),
+            BOTTLING_ORDERING,
+            cursor=request.GET.get('after'),
+            page_size=BOTTLING_PAGE_SIZE
+        )
+    except ValueError:
+        return HttpResponseBadRequest('Invalid page cursor')
+
+    if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return JsonResponse({
+            'results': [_bottling_json(bottling) for bottling in page.items],
+            'next': page.next_cursor,
+        })
+    return render(request, template_name, {
+        **(context or {}),
+        'bottlings': page.items,
+        'next_cursor': page.next_cursor,
+    })
+
 class BottlingListView(TenantViewMixin, ListView):
+    """
+    Display all bottlings of the organization, keyset paginated.
+
+    Returns:
+        Rendered template with context containing:
+        - bottlings: Bottlings on the current page
+        - next_cursor: Cursor of the next page, or None on the last page
+    """
     model = Bottling
     template_name = 'packaging/list_bottlings.html'
-    context_object_name = 'bottlings'
+
+    def get(self, request, *args, **kwargs):
+        return render_bottling_page(
+            request, Bottling.objects.all(), self.template_name, {'title': 'Bottlings'}
+        )
 
 class BottlingDetailView(TenantViewMixin, DetailView):
     model = Bottling
     template_name = 'packaging/bottling_detail.html'
     context_object_name = 'bottling'
 
-class BottlingCreateView(TenantViewMixin, CreateView):
+class BottlingFormMixin:
+    """
+    Save bottling forms through record_bottling() as the requesting user.
+    """
     model = Bottling
     form_class = BottlingForm
     template_name = 'packaging/bottling_form.html'
-    success_url = reverse_lazy('packaging:bottling-list')
+    success_url = reverse_lazy('packaging:list_bottlings')
 
     def get_form_kwargs(self):
         kwargs = super().get_form_kwargs()
         kwargs['organization'] = self.request.organization
         return kwargs
 
-class BottlingUpdateView(TenantViewMixin, UpdateView):
-    model = Bottling
-    form_class = BottlingForm
-    template_name = 'packaging/bottling_form.html'
-    success_url = reverse_lazy('packaging:bottling-list')
+    def form_valid(self, form):
+        form.instance.organization = self.request.organization
+        try:
+            self.object = record_bottling(form.instance, self.request.user)
+        except DjangoValidationError as e:
+            form.add_error(None, e)
+            return self.form_invalid(form)
+        return redirect(self.get_success_url())
 
-    def get_form_kwargs(self):
-        kwargs = super().get_form_kwargs()
-        kwargs['organization'] = self.request.organization
-        return kwargs
+class BottlingCreateView(TenantViewMixin, BottlingFormMixin, CreateView):
+    pass
+
+class BottlingUpdateView(TenantViewMixin, BottlingFormMixin, UpdateView):
+    pass
 
 @login_required
 @handle_view_exception
@@ -203,21 +303,30 @@ def list_unfinished_bottlings(request):
     Shows bottlings with their key information including date, bottle, and quantity.
     Provides search functionality across multiple fields.
 
+    Pages are keyset paginated as described in render_bottling_page(), and
+    XHR callers get the page as JSON.
+
     Args:
         request: The HTTP request object
+        after: Optional cursor of the page to show
 
     Returns:
         Rendered template with context containing:
-        - bottlings: QuerySet of filtered bottlings
+        - bottlings: Bottlings on the current page
+        - next_cursor: Cursor of the next page, or None on the last page
+        - shortages: Materials the unfinished bottlings need more of than
+          is in stock, with the first date each one blocks
+        - reorder_suggestions: Materials below their minimum stock and how
+          much of each to order
         - title: Page title
     """
     try:
-        bottlings = Bottling.objects.filter(status='unfinished').order_by('-bottling_date')
-        context = {
-            'bottlings': bottlings,
+        organization = getattr(request, 'organization', None)
+        return render_bottling_page(request, Bottling.objects.unfinished(), 'packaging/list_unfinished.html', {
+            'shortages': get_material_shortages(organization) if organization else [],
+            'reorder_suggestions': get_reorder_suggestions(organization) if organization else [],
             'title': 'Unfinished Bottlings'
-        }
-        return render(request, 'packaging/list_unfinished.html', context)
+        })
     except Exception as e:
         log_error(e, request)
         raise
@@ -231,23 +340,23 @@ def list_finished_bottlings(request):
     Shows bottlings with their key information including date, bottle, and quantity.
     Provides search functionality across multiple fields.
 
+    Pages are keyset paginated as described in render_bottling_page(), and
+    XHR callers get the page as JSON.
+
     Args:
         request: The HTTP request object
+        after: Optional cursor of the page to show
 
     Returns:
         Rendered template with context containing:
-        - bottlings: QuerySet of filtered bottlings
+        - bottlings: Bottlings on the current page
+        - next_cursor: Cursor of the next page, or None on the last page
         - title: Page title
     """
     try:
-        bottlings = Bottling.objects.exclude(
-            Q(closure__isnull=True) | Q(label__isnull=True) | Q(box__isnull=True)
-        ).order_by('-bottling_date')
-        context = {
-            'bottlings': bottlings,
+        return render_bottling_page(request, Bottling.objects.finished(), 'packaging/list_finished.html', {
             'title': 'Finished Bottlings'
-        }
-        return render(request, 'packaging/list_finished.html', context)
+        })
     except Exception as e:
         log_error(e, request)
         raise
@@ -259,7 +368,9 @@ def delete_bottling(request, pk):
     Delete a bottling record.
     
     Handles POST requests to delete a bottling record.
-    Returns inventory to stock.
+    The wine is returned to its tank, the materials of a finished bottling
+    are returned to stock and the reservations of an unfinished one are
+    released, all by delete_bottling().
 
     Args:
         request: The HTTP request object
@@ -273,29 +384,15 @@ def delete_bottling(request, pk):
             return HttpResponseNotAllowed(['POST'])
             
         bottling = get_object_or_404(Bottling, pk=pk)
-        
-        # Return inventory to stock
-        if bottling.bottle:
-            bottling.bottle.stock += bottling.quantity
-            bottling.bottle.save()
-            
-        if bottling.label:
-            bottling.label.stock += bottling.quantity
-            bottling.label.save()
-            
-        if bottling.closure:
-            bottling.closure.stock += bottling.quantity
-            bottling.closure.save()
-            
-        if bottling.box:
-            bottling.box.stock += math.ceil(bottling.quantity / bottling.box.bottle_capacity)
-            bottling.box.save()
-            
-        # Delete the bottling
-        bottling.delete()
-        
+
+        try:
+            delete_bottling_run(bottling, request.user)
+        except DjangoValidationError as e:
+            messages.error(request, ' '.join(e.messages))
+            return redirect('packaging:detail_bottling', pk=pk)
+
         messages.success(request, 'Bottling deleted successfully.')
-        return redirect('packaging:list_unfinished')
+        return redirect('packaging:list_unfinished_bottlings')
     except Exception as e:
         log_error(e, request)
         raise
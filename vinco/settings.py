@@ -54,6 +54,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'core.middleware.db_routing.ReplicaStickinessMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
@@ -163,25 +164,77 @@ CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
         'LOCATION': 'unique-vinco',
-    }
+    },
+    # For data that must be invalidated everywhere at once, so it has to be
+    # shared by all workers. Its counters are bumped with incr(), which must be
+    # atomic, so file-based and database caches are refused at startup
+    # (core.checks). LocMemCache only works for a single process, as in
+    # development, and is warned about when DEBUG is off; in production use
+    # 'BACKEND': 'django.core.cache.backends.redis.RedisCache' with a redis://
+    # LOCATION
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'vinco-shared',
+    },
 }
 
 # Cache timeouts
 CACHE_MIDDLEWARE_SECONDS = 300  # 5 minutes
 CACHE_MIDDLEWARE_KEY_PREFIX = 'vinco'
-
-# Rate limiting settings
+TENANT_CACHE_TIMEOUT = 60  # How long a user's organization access is cached
+TENANT_CACHE_ALIAS = 'shared'  # Cache of core.cache, keyed per organization
+TENANT_DATA_CACHE_TIMEOUT = 300  # How long core.cache keeps a value
+CACHE_METRICS_HOOK = None  # Dotted path of a callable(name, hit) to report cache hits to
+
+# Rate limiting settings. The limits only apply once
+# 'core.middleware.rate_limiting.RateLimitMiddleware' is added to the end of
+# MIDDLEWARE; size them for the deployment's cellar workflows first.
 RATELIMIT_ENABLE = True
-RATELIMIT_VIEW_LIMIT = "100/h"  # 100 requests per hour per IP per view
+RATELIMIT_VIEW_LIMIT = "100/h"  # 100 requests per hour per user (or IP) per view
 RATELIMIT_LOGIN_LIMIT = "5/h"   # 5 login attempts per hour per IP
+# Per-view limits of single routes, overriding RATELIMIT_VIEW_LIMIT; None
+# exempts a route. The dashboard polls its statistics every minute from every
+# open tab, and the keyset-paginated lists take a request per page; both are
+# still counted against RATELIMIT_TENANT_LIMIT.
+RATELIMIT_ROUTE_LIMITS = {
+    'core:dashboard_stats': None,
+    'harvests:list_harvests': None,
+    'packaging:list_bottlings': None,
+    'packaging:list_unfinished_bottlings': None,
+    'packaging:list_finished_bottlings': None,
+}
+RATELIMIT_TENANT_LIMIT = None   # Requests per organization across all views, e.g. "10000/h"
+RATELIMIT_BACKEND = 'core.middleware.rate_limiting.SlidingWindowBackend'
+# Cache holding the counters. LocMemCache counts per process; point this at a
+# shared cache to limit across workers, e.g. a 'ratelimit' entry in CACHES with
+# 'BACKEND': 'django.core.cache.backends.redis.RedisCache'
+RATELIMIT_CACHE = 'default'
 
 # Database router settings
 DATABASE_ROUTERS = ['core.db_routers.TenantRouter']
 
+# Database alias of organizations with a database of their own, keyed by
+# organization ID or slug; all other organizations use 'default'
+TENANT_DATABASES = {}
+# Read replicas keyed by the alias of their primary database
+TENANT_DATABASE_REPLICAS = {}
+# Seconds that reads stay on the primary after a write, to cover replication lag
+TENANT_REPLICA_LAG = 5
+# Apps whose tables are shared by all organizations and kept in 'default'
+TENANT_SHARED_APPS = ['admin', 'auth', 'contenttypes', 'sessions', 'messages', 'organizations']
+
 # Tenant settings
 TENANT_MODEL = 'organizations.Organization'
 TENANT_FIELD = 'organization'
 
+# Tried in order; the first one that finds an organization identifier decides
+TENANT_RESOLVERS = [
+    'core.middleware.tenant_middleware.HeaderTenantResolver',
+    'core.middleware.tenant_middleware.SessionTenantResolver',
+]
+# Base domain for core.middleware.tenant_middleware.SubdomainTenantResolver
+TENANT_BASE_DOMAIN = None
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -0,0 +1,45 @@
+"""
+Local settings with a tenant database and read replicas on SQLite.
+
+Organization 'large-winery' gets a database of its own. The replicas point at
+the same files as their primaries (TEST MIRROR), so routing can be tried out
+without running replication. Create the schema of every primary with:
+
+    python manage.py migrate --settings=vinco.sharded_settings
+    python manage.py migrate --database=tenant_large --settings=vinco.sharded_settings
+
+Users and organizations created from then on are mirrored into tenant_large
+automatically. Copy the ones that already existed, e.g. when a tenant database
+is added to an existing installation, with:
+
+    python manage.py mirror_shared_rows --database=tenant_large --settings=vinco.sharded_settings
+"""
+
+from .settings import *
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    },
+    'default_replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+    'tenant_large': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_tenant_large.sqlite3',
+    },
+    'tenant_large_replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db_tenant_large.sqlite3',
+        'TEST': {'MIRROR': 'tenant_large'},
+    },
+}
+
+TENANT_DATABASES = {'large-winery': 'tenant_large'}
+TENANT_DATABASE_REPLICAS = {
+    'default': ['default_replica'],
+    'tenant_large': ['tenant_large_replica'],
+}
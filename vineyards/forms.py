@@ -1,4 +1,5 @@
 from django import forms
+from core.forms import TenantFormMixin
 from django.core.validators import RegexValidator, MinValueValidator, MaxValueValidator
 from .models import Vineyard, Supplier, GrapeVariety
 from cellars.models import Cellar, Tank
@@ -18,7 +19,7 @@ class GrapeVarietyChoiceField(forms.ModelChoiceField):
         except (ValueError, TypeError):
             return value
 
-class VineyardForm(forms.ModelForm):
+class VineyardForm(TenantFormMixin, forms.ModelForm):
     name = forms.CharField(
         max_length=100,
         validators=[
@@ -167,7 +168,7 @@ class TankForm(forms.ModelForm):
         model = Tank
         fields = ['name', 'tank_type', 'capacity', 'notes']
 
-class TankTransferForm(forms.Form):
+class TankTransferForm(TenantFormMixin, forms.Form):
     source_tank = forms.ModelChoiceField(
         queryset=Tank.objects.all(),
         label="From Tank",
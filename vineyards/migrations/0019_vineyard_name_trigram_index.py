@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:45
+
+from django.db import migrations
+
+
+def add_name_trigram_index(apps, schema_editor):
+    """
+    Index vineyard names for icontains searches, such as the harvest list's.
+
+    Only PostgreSQL has trigram indexes; other databases keep the LIKE scan.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS vineyard_name_trgm_idx '
+        'ON vineyards_vineyard USING gin ((UPPER(name::text)) gin_trgm_ops)'
+    )
+
+
+def remove_name_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS vineyard_name_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vineyards', '0018_load_initial_grape_varieties'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_name_trigram_index, remove_name_trigram_index),
+    ]
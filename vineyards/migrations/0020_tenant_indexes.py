@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0001_initial'),
+        ('vineyards', '0019_vineyard_name_trigram_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='grapevariety',
+            index=models.Index(fields=['organization', 'name'], name='variety_org_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['organization', 'name'], name='supplier_org_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vineyard',
+            index=models.Index(fields=['organization', 'name'], name='vineyard_org_name_idx'),
+        ),
+    ]
@@ -51,6 +51,7 @@ class Supplier(TenantModel):
             ("view_supplier_analytics", "Can view supplier analytics"),
         ]
         indexes = [
+            models.Index(fields=['organization', 'name'], name='supplier_org_name_idx'),
             models.Index(fields=['name'], name='supplier_name_idx'),
             models.Index(fields=['oib'], name='supplier_oib_idx'),
             models.Index(fields=['created_at'], name='supplier_created_at_idx'),
@@ -106,6 +107,7 @@ class GrapeVariety(TenantModel):
         verbose_name_plural = "grape varieties"
         ordering = ['name']
         indexes = [
+            models.Index(fields=['organization', 'name'], name='variety_org_name_idx'),
             models.Index(fields=['code'], name='variety_code_idx'),
             models.Index(fields=['system_code'], name='variety_system_code_idx'),
             models.Index(fields=['type'], name='variety_type_idx'),
@@ -320,6 +322,7 @@ class Vineyard(TenantModel):
             ("view_vineyard_analytics", "Can view vineyard analytics"),
         ]
         indexes = [
+            models.Index(fields=['organization', 'name'], name='vineyard_org_name_idx'),
             models.Index(fields=['name'], name='vineyard_name_idx'),
             models.Index(fields=['location'], name='vineyard_location_idx'),
             models.Index(fields=['grape_variety'], name='vineyard_grape_var_idx'),
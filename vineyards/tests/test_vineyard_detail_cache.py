@@ -0,0 +1,86 @@
+"""
+Tests for the cached vineyard detail page.
+"""
+
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.contrib.auth.models import Permission
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from core.cache import get_cache_stats, reset_cache_stats
+from harvests.models import Harvest
+from organizations.models import OrganizationUser
+from vineyards.models import Vineyard
+
+@pytest.fixture
+def vineyard(tenant_client, organization):
+    _, user = tenant_client
+    return Vineyard.objects.create(
+        name='Test Vineyard', location='Test Location', size=10, ownership_type='owned',
+        grape_variety='merlot', organization=organization, created_by=user
+    )
+
+def detail(client, vineyard):
+    return client.get(reverse('vineyards:vineyard_detail', kwargs={'vineyard_id': vineyard.pk}))
+
+@pytest.mark.django_db
+class TestVineyardDetailCache:
+    """Test cases for caching the vineyard detail page."""
+
+    def test_warm_page_skips_vineyard_and_harvest_queries(self, tenant_client, vineyard, organization):
+        client, user = tenant_client
+        Harvest.objects.create(vineyard=vineyard, date=date(2025, 9, 1), quantity=Decimal('1000'),
+                               organization=organization, created_by=user)
+        detail(client, vineyard)
+        reset_cache_stats()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = detail(client, vineyard)
+
+        # Only the session, user and permission lookups remain
+        tables = ('vineyards_vineyard', 'harvests_harvest')
+        assert not [query for query in queries.captured_queries if any(t in query['sql'] for t in tables)]
+
+        assert response.status_code == 200
+        assert response.context['vineyard']['name'] == 'Test Vineyard'
+        assert b'1000' in response.content
+        stats = get_cache_stats()
+        assert stats['vineyard_detail']['hits'] == 1
+        assert stats['vineyard_harvests']['hits'] == 1
+
+    def test_edits_invalidate_data_and_fragment(self, tenant_client, vineyard, organization):
+        client, user = tenant_client
+        detail(client, vineyard)
+
+        vineyard.name = 'Renamed Vineyard'
+        vineyard.save()
+        Harvest.objects.create(vineyard=vineyard, date=date(2025, 9, 2), quantity=Decimal('1234'),
+                               organization=organization, created_by=user)
+
+        response = detail(client, vineyard)
+        assert response.context['vineyard']['name'] == 'Renamed Vineyard'
+        assert b'1234' in response.content
+
+    def test_cache_is_shared_but_permissions_are_checked(self, tenant_client, vineyard, organization,
+                                                         create_user, test_password):
+        owner_client, _ = tenant_client
+        detail(owner_client, vineyard)
+
+        other = create_user(username='colleague', email='colleague@example.com')
+        OrganizationUser.objects.create(organization=organization, user=other, role='member', created_by=other)
+        client = Client()
+        client.login(username='colleague', password=test_password)
+        session = client.session
+        session['organization_id'] = organization.pk
+        session.save()
+        reset_cache_stats()
+
+        assert detail(client, vineyard).status_code == 302
+
+        other.user_permissions.add(Permission.objects.get(codename='view_all_vineyards'))
+        response = detail(client, vineyard)
+        assert response.status_code == 200
+        assert get_cache_stats()['vineyard_detail']['hits'] == 2
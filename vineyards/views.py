@@ -6,6 +6,7 @@ and suppliers. It includes functionality for searching and filtering vineyards b
 various criteria.
 """
 
+import hashlib
 import logging
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required, permission_required
@@ -17,7 +18,7 @@ from django.db.models import Q, Count, Prefetch, F, Value, Sum
 from django.db.models.functions import Coalesce
 from django.views.decorators.cache import cache_page
 from django.utils.cache import get_cache_key
-from django.core.cache import cache
+from core.cache import get_or_set
 from core.utils.exceptions import (
     handle_view_exception,
     InvalidOperationError,
@@ -25,6 +26,7 @@ from core.utils.exceptions import (
     ValidationError,
     log_error
 )
+from harvests.models import Harvest
 from .models import Vineyard, Supplier
 from .forms import VineyardForm, SupplierForm
 
@@ -82,6 +84,14 @@ def list_vineyards(request):
         
         # Paginate results
         paginator = Paginator(vineyards, 20)  # Show 20 vineyards per page
+        # Counting the matches is the costly part of a page, so the count is
+        # cached until the organization's vineyards or suppliers change
+        scope = 'all' if request.user.has_perm('vineyards.view_all_vineyards') else f'user{request.user.pk}'
+        paginator.count = get_or_set(
+            'vineyard_count', vineyards.count, scope,
+            hashlib.md5(search_query.encode()).hexdigest(),
+            depends_on=(Vineyard, Supplier)
+        )
         try:
             vineyards_page = paginator.page(page)
         except PageNotAnInteger:
@@ -227,15 +237,51 @@ def edit_vineyard(request, vineyard_id):
         messages.error(request, str(e))
         return redirect('vineyards:list_vineyards')
 
+def get_vineyard_detail_data(vineyard_id):
+    """
+    Return the data shown on a vineyard's detail page.
+
+    Plain values rather than a Vineyard instance are cached, once per vineyard
+    for all users of the organization, until the organization's vineyards or
+    suppliers change.
+
+    Args:
+        vineyard_id: ID of the vineyard
+
+    Returns:
+        dict: Values of the vineyard, its supplier and grape variety name
+
+    Raises:
+        Http404: If the vineyard doesn't exist in the organization
+    """
+    def compute():
+        vineyard = get_object_or_404(Vineyard.objects.select_related('supplier'), id=vineyard_id)
+        return {
+            'id': vineyard.id,
+            'name': vineyard.name,
+            'location': vineyard.location,
+            'size': vineyard.size,
+            'grape_variety_display': vineyard.get_grape_variety_display(),
+            'planting_year': vineyard.planting_year,
+            'cadastral_parcel': vineyard.cadastral_parcel,
+            'cadastral_county': vineyard.cadastral_county,
+            'arkod_id': vineyard.arkod_id,
+            'supplier_id': vineyard.supplier_id,
+            'supplier_name': vineyard.supplier.name if vineyard.supplier else None,
+            'created_by_id': vineyard.created_by_id,
+        }
+    return get_or_set('vineyard_detail', compute, vineyard_id, depends_on=(Vineyard, Supplier))
+
 @login_required
 @handle_view_exception
 def vineyard_detail(request, vineyard_id):
     """
     Display detailed information about a specific vineyard.
     
-    Shows all vineyard information including associated data.
-    Uses select_related and prefetch_related to optimize database queries.
-    Implements caching for better performance.
+    Shows all vineyard information including associated data. The vineyard's
+    data comes from the organization's cache and its harvest table is a cached
+    template fragment, so a warm page costs no vineyard or harvest queries.
+    Permissions are checked on every request, cached or not.
     
     Args:
         request: The HTTP request object
@@ -245,45 +291,23 @@ def vineyard_detail(request, vineyard_id):
         Rendered template with detailed vineyard information
     """
     try:
-        # Generate cache key
-        cache_key = f'vineyard_detail:{vineyard_id}:{request.user.id}'
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            context = cached_data
-            # Update dynamic data that shouldn't be cached
-            context.update({
-                'active_tab': 'vineyards',
-                'can_manage': request.user.has_perm('vineyards.manage_vineyards'),
-                'can_export': request.user.has_perm('vineyards.export_vineyard_data'),
-                'can_view_analytics': request.user.has_perm('vineyards.view_vineyard_analytics'),
-            })
-            return render(request, 'vineyards/vineyard_detail.html', context)
-        
-        # Fetch vineyard with optimized queries
-        vineyard = get_object_or_404(
-            Vineyard.objects.select_related(
-                'supplier',
-                'created_by'
-            ),
-            id=vineyard_id
-        )
+        vineyard = get_vineyard_detail_data(vineyard_id)
         
         # Check permissions
-        if not request.user.has_perm('vineyards.view_all_vineyards') and vineyard.created_by != request.user:
+        if (not request.user.has_perm('vineyards.view_all_vineyards')
+                and vineyard['created_by_id'] != request.user.id):
             raise PermissionDenied
         
         context = {
             'vineyard': vineyard,
+            # Only evaluated when the harvest table fragment isn't cached
+            'harvests': Harvest.objects.filter(vineyard_id=vineyard_id).with_allocation_totals().order_by('-date'),
             'active_tab': 'vineyards',
             'can_manage': request.user.has_perm('vineyards.manage_vineyards'),
             'can_export': request.user.has_perm('vineyards.export_vineyard_data'),
             'can_view_analytics': request.user.has_perm('vineyards.view_vineyard_analytics'),
         }
         
-        # Cache the results for 5 minutes
-        cache.set(cache_key, context, 300)
-        
         return render(request, 'vineyards/vineyard_detail.html', context)
         
     except Exception as e: